@@ -20,6 +20,9 @@ logger = log.logger_from_configs(name = __name__,
 # ~~~~~ IMPORT PACKAGES ~~~~~ #
 import os
 import sys
+import shutil
+import tempfile
+import multiprocessing
 import find
 import tools
 import vcf
@@ -33,19 +36,51 @@ ANNOVAR_db_dir = os.path.join(ANNOVAR_bin_dir, "db")
 ANNOVAR_protocol = "cytoBand,refGene"
 ANNOVAR_operation = "r,g"
 ANNOVAR_buildver = genome
+# number of threads for ANNOVAR to use per invocation
+ANNOVAR_thread = multiprocessing.cpu_count()
+# maximum number of seconds to wait for each file to be annotated by the process pool
+ANNOVAR_timeout = 24 * 60 * 60
 
 configs = {
 'ANNOVAR_bin_dir': ANNOVAR_bin_dir,
 'ANNOVAR_db_dir': ANNOVAR_db_dir,
 'ANNOVAR_protocol': ANNOVAR_protocol,
 'ANNOVAR_operation': ANNOVAR_operation,
-'ANNOVAR_buildver': ANNOVAR_buildver
+'ANNOVAR_buildver': ANNOVAR_buildver,
+'ANNOVAR_thread': ANNOVAR_thread
 }
 
 
 
+_bin_path_cache = {}
+"""
+cache of the paths to the ANNOVAR scripts returned by `_bin_path`, in the format `{(bin_dir, name): path}`
+"""
+
+_installed_items = set()
+"""
+paths to ANNOVAR installation files and directories that have already been found to exist by `_check_installed_item`
+"""
+
 
 # ~~~~~ FUNCTIONS ~~~~~ #
+def _bin_path(bin_dir, name):
+    """
+    Gets the path to an ANNOVAR script in the installation directory. Paths are cached since they are looked up for every file that gets annotated
+    """
+    key = (bin_dir, name)
+    if key not in _bin_path_cache:
+        _bin_path_cache[key] = os.path.join(bin_dir, name)
+    return(_bin_path_cache[key])
+
+def _check_installed_item(item):
+    """
+    Kills the program if a file or directory from the ANNOVAR installation does not exist. Paths that have already been found to exist are not checked again, since the installation is not expected to change while the program is running
+    """
+    if item not in _installed_items:
+        tools.missing_item_kill(item = item, logger = logger)
+        _installed_items.add(item)
+
 def vcf2annovar(vcf_file, **kwargs):
     """
     Converts a .vcf file to ANNOVAR .avinput format, using ANNOVAR ``convert2annovar.pl``
@@ -64,10 +99,12 @@ def vcf2annovar(vcf_file, **kwargs):
 
     Notes
     -----
-    Generates and executes a shell command in the format::
+    Runs a command in the format::
 
         annovar/convert2annovar.pl -format vcf4old /data/output/169.duplications.vcf -includeinfo > /data/output/169.duplications.avinput
 
+    The command is run directly without a shell, with its stdout written to the output file.
+
     Returns
     -------
     str
@@ -81,21 +118,16 @@ def vcf2annovar(vcf_file, **kwargs):
     tools.missing_item_kill(item = vcf_file, logger = logger)
 
     # path to binary to use
-    convert_bin = os.path.join(bin_dir, 'convert2annovar.pl')
-    tools.missing_item_kill(item = convert_bin, logger = logger)
-
-    # shell command to run
-    convert_command = '''
-"{0}" -format vcf4old "{1}" -includeinfo > "{2}"
-    '''.format(
-    convert_bin, # 0
-    vcf_file, # 1
-    output_file # 2
-    )
+    convert_bin = _bin_path(bin_dir = bin_dir, name = 'convert2annovar.pl')
+    _check_installed_item(item = convert_bin)
+
+    # command to run
+    convert_command = [convert_bin, '-format', 'vcf4old', vcf_file, '-includeinfo']
 
     # run
-    logger.debug(convert_command)
-    run_cmd = tools.SubprocessCmd(command = convert_command).run()
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug('%s > %s', tools.shell_join(convert_command), tools.quote(output_file))
+    run_cmd = tools.SubprocessCmd(command = convert_command, stdout_file = output_file).run()
     logger.debug(run_cmd.proc_stdout)
     logger.debug(run_cmd.proc_stderr)
 
@@ -124,23 +156,28 @@ def table_annovar(avinput_file, **kwargs):
         path to the ANNOVAR database directory
     buildver: str
         the build version to use, e.g. "hg19"
+    thread: int
+        the number of threads for ANNOVAR to use; ``--thread`` is only passed to ANNOVAR when this is >1
 
     Notes
     -----
-    Generates and executes a shell command in the format::
+    Runs a command in the format::
 
-        perl "/annovar/table_annovar.pl" "example-data/Sample1.avinput" "/annovar/db" --outfile "example-data/Sample1" --buildver "hg19" --protocol "cytoBand,refGene" --operation "r,g" --nastring "." --remove
+        perl "/annovar/table_annovar.pl" "example-data/Sample1.avinput" "/annovar/db" --outfile "example-data/Sample1" --buildver "hg19" --protocol "cytoBand,refGene" --operation "r,g" --nastring "." --remove --thread "4"
 
     Returns
     -------
+    str
+        the path to the annotated ``multianno`` output file
     """
     # get keyword arguments
     bin_dir = kwargs.pop('bin_dir', configs['ANNOVAR_bin_dir'])
     db_dir = kwargs.pop('db_dir', configs['ANNOVAR_db_dir'])
-    buildver = kwargs.pop('db_dir', configs['ANNOVAR_buildver'])
+    buildver = kwargs.pop('buildver', configs['ANNOVAR_buildver'])
     protocol = kwargs.pop('protocol', configs['ANNOVAR_protocol'])
     operation = kwargs.pop('operation', configs['ANNOVAR_operation'])
-    output_file_base = kwargs.pop('operation', os.path.splitext(avinput_file)[0])
+    output_file_base = kwargs.pop('output_file_base', os.path.splitext(avinput_file)[0])
+    thread = kwargs.pop('thread', configs['ANNOVAR_thread'])
 
     # make sure input file exists
     tools.missing_item_kill(item = avinput_file, logger = logger)
@@ -149,21 +186,26 @@ def table_annovar(avinput_file, **kwargs):
     output_suffix = '.{0}_multianno.txt'.format(buildver)
     multianno_output = output_file_base + output_suffix
 
-    table_annovar_bin = os.path.join(bin_dir, 'table_annovar.pl')
-
-    table_annovar_command = '''
-"{0}" "{1}" "{2}" --outfile "{3}" --buildver "{4}" --protocol "{5}" --operation "{6}" --nastring "." --remove
-    '''.format(
-    table_annovar_bin, # 0
-    avinput_file, # 1
-    db_dir, # 2
-    output_file_base, # 3
-    buildver, # 4
-    protocol, # 5
-    operation # 6
-    )
-
-    logger.debug(table_annovar_command)
+    table_annovar_bin = _bin_path(bin_dir = bin_dir, name = 'table_annovar.pl')
+
+    table_annovar_command = [
+    table_annovar_bin,
+    avinput_file,
+    db_dir,
+    '--outfile', output_file_base,
+    '--buildver', buildver,
+    '--protocol', protocol,
+    '--operation', operation,
+    '--nastring', '.',
+    '--remove'
+    ]
+
+    # only use ANNOVAR multithreading if more than one thread was requested
+    if thread and int(thread) > 1:
+        table_annovar_command.extend(['--thread', str(thread)])
+
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(tools.shell_join(table_annovar_command))
     run_cmd = tools.SubprocessCmd(command = table_annovar_command).run()
     logger.debug(run_cmd.proc_stdout)
     logger.debug(run_cmd.proc_stderr)
@@ -173,7 +215,7 @@ def table_annovar(avinput_file, **kwargs):
 
     return(multianno_output)
 
-def filetype_validation(input_file):
+def filetype_validation(input_file, num_entries = None):
     """
     Runs specific validation steps for certain file types
 
@@ -181,6 +223,8 @@ def filetype_validation(input_file):
     ----------
     input_file: str
         the path to a file to be validated.
+    num_entries: int
+        the number of entries in the file if they have already been counted, otherwise ``None``
 
     Returns
     -------
@@ -191,7 +235,8 @@ def filetype_validation(input_file):
     filetype = os.path.splitext(input_file)[1]
     if filetype == '.vcf':
         # make sure the .vcf has at least 1 entry
-        num_entries = vcf.num_entries(vcf_file = input_file)
+        if num_entries is None:
+            num_entries = vcf.num_entries(vcf_file = input_file)
         if not num_entries > 0:
             logger.warning('VCF file has {0} lines and will not be annotated: {1}'.format(num_entries, input_file))
             return(False)
@@ -231,14 +276,18 @@ def validate(input_file):
         logger.warning('File does not exist and will not be annotated: {0}'.format(input_file))
         return(False)
 
-    # check number if lines
-    num_lines = tools.num_lines(input_file)
+    # check number if lines; .vcf files get their lines and entries counted in a single read
+    num_entries = None
+    if os.path.splitext(input_file)[1] == '.vcf':
+        num_lines, num_entries = vcf.count_lines_entries(vcf_file = input_file)
+    else:
+        num_lines = tools.num_lines(input_file)
     if not num_lines > 0:
         logger.warning('File has {0} lines and will not be annotated: {1}'.format(num_lines, input_file))
         return(False)
 
     # return the boolean value from the filetype specific validations
-    return(filetype_validation(input_file))
+    return(filetype_validation(input_file, num_entries = num_entries))
 
 def validate_ANNOVAR(**kwargs):
     """
@@ -266,7 +315,7 @@ def validate_ANNOVAR(**kwargs):
     ]
 
     # get the full paths to the bins
-    annovar_bin_paths = [os.path.join(bin_dir, b) for b in annovar_bins]
+    annovar_bin_paths = [_bin_path(bin_dir = bin_dir, name = b) for b in annovar_bins]
 
     # add to required paths
     required_paths.append(bin_dir)
@@ -274,16 +323,174 @@ def validate_ANNOVAR(**kwargs):
     for annovar_bin_path in annovar_bin_paths:
         required_paths.append(annovar_bin_path)
 
-    # make sure they all exist
+    # make sure they all exist; paths that were already checked are skipped
     for required_path in required_paths:
-        tools.missing_item_kill(item = required_path, logger = logger)
+        _check_installed_item(item = required_path)
     logger.debug(required_paths)
 
 
-def main(input_dir):
+def _annotate_one(input_file, thread = None):
+    """
+    Converts a single file to ANNOVAR format and annotates it. Used as the per-file worker for the process pool in ``main``
+
+    Parameters
+    ----------
+    input_file: str
+        the path to a validated file to be annotated
+    thread: int
+        the number of threads for ``table_annovar`` to use, or ``None`` to use the internally set default
+
+    Returns
+    -------
+    dict
+        a dictionary with the paths to the input file, the ``.avinput`` file, and the annotated output file
+
+    Raises
+    ------
+    RuntimeError
+        if the file could not be annotated. ``vcf2annovar`` and ``table_annovar`` call ``sys.exit()`` when an expected file is missing; a ``SystemExit`` in a pool worker is never passed back to the parent process, which would then wait for the result forever, so it is raised as an ordinary exception instead
+    """
+    annotated_file = {'file': input_file}
+    try:
+        # convert file to .avinput format
+        logger.debug('Converting file to ANNOVAR format: %s', input_file)
+        annotated_file['avinput'] = vcf2annovar(vcf_file = input_file)
+
+        # annotate the file
+        logger.debug('Annotating file with ANNOVAR: %s', annotated_file['avinput'])
+        table_annovar_kwargs = {}
+        if thread:
+            table_annovar_kwargs['thread'] = thread
+        annotated_file['multianno_output'] = table_annovar(avinput_file = annotated_file['avinput'], **table_annovar_kwargs)
+    except (SystemExit, Exception) as e:
+        raise RuntimeError('Annotation failed for file {0}: {1!r}'.format(input_file, e))
+
+    return(annotated_file)
+
+def _annotate_files(input_files, processes = None, timeout = None):
+    """
+    Annotates a list of files in parallel with a pool of processes, using ``_annotate_one``
+
+    Parameters
+    ----------
+    input_files: list
+        a list of paths to validated files to be annotated
+    processes: int
+        the number of files to annotate in parallel, defaults to the number of CPUs on the system
+    timeout: int
+        the maximum number of seconds to wait for each file, defaults to ``ANNOVAR_timeout``
+
+    Returns
+    -------
+    list
+        a list of dicts describing each annotated file, as returned by ``_annotate_one``, in the same order as ``input_files``
+
+    Notes
+    -----
+    If any file fails to be annotated or times out, the other workers are stopped and the program exits, in the same way as when a file is missing in a single process
+    """
+    if not input_files:
+        return([])
+    if not processes:
+        processes = multiprocessing.cpu_count()
+    if not timeout:
+        timeout = ANNOVAR_timeout
+    processes = min(processes, len(input_files))
+    # split the ANNOVAR threads between the processes to avoid oversubscribing the CPUs
+    thread = max(1, int(configs['ANNOVAR_thread']) // processes)
+    logger.debug('Annotating %s files with %s processes, %s threads each', len(input_files), processes, thread)
+    pool = multiprocessing.Pool(processes = processes)
+    try:
+        results = [pool.apply_async(_annotate_one, (f,), {'thread': thread}) for f in input_files]
+        annotated_files = [result.get(timeout) for result in results]
+    except RuntimeError as e:
+        # stop the other workers instead of waiting for them
+        pool.terminate()
+        logger.error(e)
+        sys.exit()
+    except multiprocessing.TimeoutError:
+        pool.terminate()
+        logger.error('Annotation did not finish within %s seconds', timeout)
+        sys.exit()
+    finally:
+        pool.close()
+        pool.join()
+    return(annotated_files)
+
+def merge_multianno(input_files, output_file):
+    """
+    Concatenates ANNOVAR ``multianno`` output files into a single file, keeping only the header line from the first file
+
+    Parameters
+    ----------
+    input_files: list
+        a list of paths to ``multianno`` files, in the order they should be merged
+    output_file: str
+        the path to the merged output file
+    """
+    with open(output_file, 'w') as fout:
+        for i, input_file in enumerate(input_files):
+            with open(input_file) as fin:
+                header = fin.readline()
+                if i == 0:
+                    fout.write(header)
+                shutil.copyfileobj(fin, fout)
+
+def annotate_chunks(input_file, num_chunks = None, processes = None):
+    """
+    Annotates a single large .vcf file by splitting it into chunks, annotating the chunks in parallel, and merging the annotated outputs
+
+    Parameters
+    ----------
+    input_file: str
+        the path to a validated .vcf file to be annotated
+    num_chunks: int
+        the number of chunks to split the file into, defaults to the number of processes
+    processes: int
+        the number of chunks to annotate in parallel, defaults to the number of CPUs on the system
+
+    Returns
+    -------
+    dict
+        a dictionary with the paths to the input file and the merged annotated output file
+
+    Notes
+    -----
+    The chunks are written to a temporary directory next to the input file, which is removed once the outputs have been merged. The merged output is saved to the same path that ``table_annovar`` would have used for the un-split file.
+    """
+    if not processes:
+        processes = multiprocessing.cpu_count()
+    if not num_chunks:
+        num_chunks = processes
+    output_file = '{0}.{1}_multianno.txt'.format(os.path.splitext(input_file)[0], configs['ANNOVAR_buildver'])
+    chunk_dir = tempfile.mkdtemp(prefix = '.chunks.', dir = os.path.dirname(os.path.abspath(input_file)))
+    try:
+        chunk_files = vcf.split_vcf(vcf_file = input_file, num_chunks = num_chunks, output_dir = chunk_dir)
+        logger.debug('Split file %s into %s chunks', input_file, len(chunk_files))
+        annotated_chunks = _annotate_files(input_files = chunk_files, processes = processes)
+        merge_multianno(input_files = [chunk['multianno_output'] for chunk in annotated_chunks], output_file = output_file)
+    finally:
+        shutil.rmtree(chunk_dir)
+    return({'file': input_file, 'multianno_output': output_file})
+
+def main(input_dir, processes = None, num_chunks = None):
     """
     Runs annotation on a directory if the module was called as a script
 
+    Parameters
+    ----------
+    input_dir: str
+        path to the directory to search for files to annotate
+    processes: int
+        the number of files to annotate in parallel, defaults to the number of CPUs on the system
+    num_chunks: int
+        if set, each file is split into this many chunks which are annotated in parallel, instead of annotating the files in parallel. Use this for a small number of large files
+
+    Returns
+    -------
+    list
+        a list of dicts describing each annotated file, as returned by ``_annotate_one``
+
     Todo
     ----
     Need to add checking for more invalid vcf inputs !!!
@@ -294,11 +501,11 @@ def main(input_dir):
 
     # find all vcf files in the supplied input_dir
     inclusion_pattern = '*.vcf'
-    logger.debug('Annotating with configs:\n{0}'.format(configs))
+    logger.debug('Annotating with configs:\n%s', configs)
 
     # find the .vcf files
     files = find.find(search_dir = input_dir, inclusion_patterns = (inclusion_pattern,), search_type = 'file')
-    logger.debug('found {0} files of type {1}'.format(len(files), inclusion_pattern))
+    logger.debug('found %s files of type %s', len(files), inclusion_pattern)
 
     # expand real full paths
     files = [tools.fullpath(f) for f in files]
@@ -306,20 +513,22 @@ def main(input_dir):
     # validate files
     validated_files = [{'file': f, 'is_valid': validate(f)} for f in files]
 
+    valid_files = []
     for validated_file in validated_files:
         logger.debug(validated_file)
         if validated_file['is_valid']:
+            valid_files.append(validated_file['file'])
+        else:
+            logger.debug('file is not valid and will not be annotated: %s', validated_file['file'])
 
-            # convert file to .avinput format
-            logger.debug('Converting file to ANNOVAR format: {0}'.format(validated_file['file']))
-            validated_file['avinput'] = vcf2annovar(vcf_file = validated_file['file'])
-
-            # annotate the file
-            logger.debug('Annotating file with ANNOVAR: {0}'.format(validated_file['avinput']))
-            validated_file['multianno_output'] = table_annovar(avinput_file = validated_file['avinput'], output_file_base = None)
+    if num_chunks:
+        # split each file and annotate its chunks in parallel
+        annotated_files = [annotate_chunks(input_file = f, num_chunks = num_chunks, processes = processes) for f in valid_files]
+    else:
+        # each file is converted & annotated independently, so run them in parallel
+        annotated_files = _annotate_files(input_files = valid_files, processes = processes)
 
-        else:
-            logger.debug('file is not valid and will not be annotated: {0}'.format(validated_file['file']))
+    return(annotated_files)
 
 
 def parse():
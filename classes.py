@@ -5,14 +5,21 @@
 General utility classes for the program
 """
 import os
-import sys
-import csv
 from collections import defaultdict
 
-import find
 import log
-import tools as t
-import config
+
+# ~~~~ CUSTOM FUNCTIONS ~~~~~~ #
+def _abspath(path, cwd = None):
+    """
+    Returns the absolute path, the same as ``os.path.abspath``, but does not look up the current working directory for paths that are already absolute. Pass ``cwd`` to reuse a single lookup of the current working directory for many paths.
+    """
+    if os.path.isabs(path):
+        return(os.path.normpath(path))
+    if cwd is None:
+        cwd = os.getcwd()
+    return(os.path.normpath(os.path.join(cwd, path)))
+
 
 # ~~~~ CUSTOM CLASSES ~~~~~~ #
 class LoggedObject(object):
@@ -91,9 +98,10 @@ class AnalysisItem(LoggedObject):
         path = dict value
         """
         if isinstance(path, str):
-            self.dirs[name] = [os.path.abspath(path)]
+            self.dirs[name] = [_abspath(path)]
         else:
-            self.dirs[name] = [os.path.abspath(p) for p in path]
+            cwd = os.getcwd()
+            self.dirs[name] = [_abspath(p, cwd = cwd) for p in path]
 
     def set_dirs(self, name, paths_list):
         """
@@ -110,9 +118,10 @@ class AnalysisItem(LoggedObject):
         path = dict value
         """
         if isinstance(path, str):
-            self.files[name] = [os.path.abspath(path)]
+            self.files[name] = [_abspath(path)]
         else:
-            self.files[name] = [os.path.abspath(p) for p in path]
+            cwd = os.getcwd()
+            self.files[name] = [_abspath(p, cwd = cwd) for p in path]
 
     def set_files(self, name, paths_list):
         """
@@ -129,7 +138,7 @@ class AnalysisItem(LoggedObject):
         name = dict key
         paths_list = list of file paths
         """
-        self.files[name].append(os.path.abspath(path))
+        self.files[name].append(_abspath(path))
 
 
     def add_files(self, name, paths_list):
@@ -138,8 +147,8 @@ class AnalysisItem(LoggedObject):
         name = dict key
         paths_list = list of file paths
         """
-        for path in paths_list:
-            self.files[name].append(os.path.abspath(path))
+        cwd = os.getcwd()
+        self.files[name].extend(_abspath(path, cwd = cwd) for path in paths_list)
 
     def get_files(self, name):
         """
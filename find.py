@@ -10,6 +10,7 @@ logger = logging.getLogger("find")
 logger.debug("loading find module")
 
 import os
+import re
 import sys
 import itertools
 import fnmatch
@@ -41,19 +42,13 @@ def find(search_dir, inclusion_patterns = ('*',), exclusion_patterns = (), searc
     list
         a list of matching file or directory paths
     """
-    import sys
-    import itertools
+    matches = find_gen(search_dir = search_dir, inclusion_patterns = inclusion_patterns, exclusion_patterns = exclusion_patterns, search_type = search_type, level_limit = level_limit, match_mode = match_mode)
+    # stop searching as soon as enough matches have been found
     if num_limit != None:
-        matches = []
-        for item in find_gen(search_dir = search_dir, inclusion_patterns = inclusion_patterns, exclusion_patterns = exclusion_patterns, search_type = search_type, level_limit = level_limit, match_mode = match_mode):
-            if len(matches) < int(num_limit):
-                matches.append(item)
-        # logger.debug("Matches found: {0}".format(matches))
-        return(matches)
-    else:
-        matches = [item for item in find_gen(search_dir = search_dir, inclusion_patterns = inclusion_patterns, exclusion_patterns = exclusion_patterns, search_type = search_type, level_limit = level_limit, match_mode = match_mode)]
-        # logger.debug("Matches found: {0}".format(matches))
-        return(matches)
+        matches = itertools.islice(matches, int(num_limit))
+    matches = [item for item in matches]
+    logger.debug("Matches found: %d", len(matches))
+    return(matches)
 
 def find_gen(search_dir, inclusion_patterns = ('*',), exclusion_patterns = (), search_type = 'all', level_limit = None, match_mode = "any"):
     """
@@ -74,14 +69,17 @@ def find_gen(search_dir, inclusion_patterns = ('*',), exclusion_patterns = (), s
     search_type:
         'all', 'file', or 'dir'; type of items to find
     """
-    import os
-    import sys
-    import fnmatch
     search_dir = search_dir.rstrip(os.path.sep)
     # assert os.path.isdir(search_dir)
-    num_sep = search_dir.count(os.path.sep)
+    # patterns need to be hashable to look up their compiled regexes
+    if not isinstance(inclusion_patterns, str):
+        inclusion_patterns = tuple(inclusion_patterns)
+    if not isinstance(exclusion_patterns, str):
+        exclusion_patterns = tuple(exclusion_patterns)
+    if level_limit != None:
+        level_limit = int(level_limit)
     # logger.debug("Searching {0} for {1} matching {2}, level limit: {3}".format(search_dir, search_type, inclusion_patterns, level_limit))
-    for root, dirs, files in os.walk(search_dir):
+    for root, dirs, files in _walk(search_dir, level_limit = level_limit):
         # choose which items to search
         if search_type == 'all':
             items = dirs + files
@@ -95,11 +93,38 @@ def find_gen(search_dir, inclusion_patterns = ('*',), exclusion_patterns = (), s
         # yeild the results
         for item in super_filter(names = items, inclusion_patterns = inclusion_patterns, exclusion_patterns = exclusion_patterns, match_mode = match_mode):
             yield(os.path.join(root, item))
-        # check for a level limit
-        if level_limit != None:
-            num_sep_this = root.count(os.path.sep)
-            if num_sep + int(level_limit) <= num_sep_this:
-                del dirs[:]
+
+def _walk(search_dir, level_limit = None):
+    """
+    Generator function that walks a directory tree top-down with ``os.walk``, yielding its ``(root, dirs, files)`` tuples, and stops recursing at the level limit. Used internally by `find_gen` and `walklevel`
+
+    Parameters
+    ----------
+    search_dir: str
+        path to the directory to walk, without a trailing separator
+    level_limit: int
+        the number of directory levels to recurse; 0 is ``search_dir`` only, ``None`` for no limit
+
+    Notes
+    -----
+    ``os.walk`` already lists the directories with ``os.scandir`` on Python 3.5+. It only recurses into the dirs left in its ``dirs`` list, so the list is emptied at the level limit; the dirs are still yielded. The level of each dir is kept in a dict as it is listed, instead of being worked out from its path
+    """
+    if level_limit == None:
+        for item in os.walk(search_dir):
+            yield(item)
+        return
+    levels = {search_dir: 0}
+    for root, dirs, files in os.walk(search_dir):
+        level = levels.pop(root)
+        if level >= level_limit:
+            pruned = dirs[:]
+            del dirs[:]
+            yield((root, pruned, files))
+        else:
+            yield((root, dirs, files))
+            # os.walk recurses into the dirs that are left after the caller is done with them
+            for dir in dirs:
+                levels[os.path.join(root, dir)] = level + 1
 
 
 def super_filter(names, inclusion_patterns = ('*',), exclusion_patterns = (), match_mode = "any"):
@@ -112,37 +137,74 @@ def super_filter(names, inclusion_patterns = ('*',), exclusion_patterns = (), ma
     Adapted from:
     https://codereview.stackexchange.com/questions/74713/filtering-with-multiple-inclusion-and-exclusion-patterns
     """
-    included = multi_filter(names, patterns = inclusion_patterns, match_mode = match_mode)
-    excluded = multi_filter(names, patterns = exclusion_patterns, match_mode = match_mode)
-    for item in set(included) - set(excluded):
-        yield(item)
+    inclusion_regexes = _compile_patterns(inclusion_patterns, match_mode = match_mode)
+    exclusion_regexes = _compile_patterns(exclusion_patterns, match_mode = match_mode)
+    if inclusion_regexes is None:
+        return
+    # stream the names in a single pass, preserving their order
+    for name in names:
+        basename = os.path.basename(name)
+        if inclusion_regexes and not all(regex.match(basename) for regex in inclusion_regexes):
+            continue
+        if exclusion_regexes is not None and all(regex.match(basename) for regex in exclusion_regexes):
+            continue
+        yield(name)
+
+_pattern_cache = {}
+"""
+cache of compiled regexes used by `multi_filter`, in the format `{(patterns, match_mode): [regex, ...]}`
+"""
+
+def _compile_patterns(patterns, match_mode = "any"):
+    """
+    Translates fnmatch-style patterns into compiled regexes. Results are cached so that repeated searches with the same patterns do not re-compile them.
+
+    Parameters
+    ----------
+    patterns: str, list, or tuple
+        a single pattern, or a list or tuple of patterns
+    match_mode:
+        'any' or 'all'; for 'any', the patterns are combined into a single regex
+
+    Returns
+    -------
+    list or None
+        a list of compiled regexes; all of them must match for a name to be considered a match. An empty list is returned when every name will match, e.g. for the pattern '*', so the caller can skip the check. ``None`` is returned if no patterns were given, or the match_mode is not valid
+    """
+    # in case a single string was passed as a pattern; its always matched on its own
+    if isinstance(patterns, str):
+        patterns = (patterns,)
+        match_mode = 'any'
+    # patterns is an empty list, or the match_mode is not valid
+    if not patterns or match_mode not in ('any', 'all'):
+        return(None)
+    key = (tuple(patterns), match_mode)
+    if key not in _pattern_cache:
+        if match_mode == 'any' and '*' in key[0]:
+            # any name matches
+            regexes = []
+        else:
+            # '*' always matches so it does not need to be checked
+            regexes = [fnmatch.translate(pattern) for pattern in key[0] if pattern != '*']
+        if match_mode == 'any' and regexes:
+            regexes = ['|'.join('(?:{0})'.format(regex) for regex in regexes)]
+        _pattern_cache[key] = [re.compile(regex) for regex in regexes]
+    return(_pattern_cache[key])
 
 def multi_filter(names, patterns, match_mode = "any"):
     """
     Generator function which yields the names that match one or more of the patterns.
     """
     # logger.debug("Filtering {0} against {1}; match_mode: {2}".format(names, patterns, match_mode))
+    regexes = _compile_patterns(patterns, match_mode = match_mode)
+    if regexes is None:
+        return
     for name in names:
         basename = os.path.basename(name)
         # logger.debug("item: {0}".format(basename))
-        # in case a single string was passed as a pattern
-        if isinstance(patterns, str):
-            if fnmatch.fnmatch(basename, patterns):
-                yield(name)
-        # patterns is not an empty list
-        elif patterns:
-            if match_mode == 'any':
-                if any(fnmatch.fnmatch(basename, pattern) for pattern in patterns):
-                    # logger.debug("match found")
-                    yield(name)
-            elif match_mode == 'all':
-                if all(fnmatch.fnmatch(basename, pattern) for pattern in patterns):
-                    # logger.debug("match found")
-                    yield(name)
-            #
-            # for pattern in patterns:
-            #     if fnmatch.fnmatch(name, pattern):
-            #         yield name
+        if all(regex.match(basename) for regex in regexes):
+            # logger.debug("match found")
+            yield(name)
 
 
 
@@ -153,14 +215,14 @@ def find_files(search_dir, search_filename):
     deprecated function that returns the paths to all files matching the supplied filename in the search dir
     """
     import os
-    logger.debug('Now searching for file "{0}" in directory {1}'.format(search_filename, search_dir))
+    logger.debug('Now searching for file "%s" in directory %s', search_filename, search_dir)
     file_list = []
     for root, dirs, files in os.walk(search_dir):
         for file in files:
             if file == search_filename:
                 found_file = os.path.join(root, file)
                 file_list.append(found_file)
-    logger.debug('Found {0} matches'.format(len(file_list)))
+    logger.debug('Found %s matches', len(file_list))
     return(file_list)
 
 def walklevel(some_dir, level=1):
@@ -176,16 +238,11 @@ def walklevel(some_dir, level=1):
             if (item.endswith('my_file.txt') and os.path.isfile(item) ):
                 file_list.append(item)
     """
-    import os
     some_dir = some_dir.rstrip(os.path.sep)
     assert os.path.isdir(some_dir)
-    num_sep = some_dir.count(os.path.sep)
-    for root, dirs, files in os.walk(some_dir):
+    for root, dirs, files in _walk(some_dir, level_limit = level):
         # yield root, dirs, files
         for dir in dirs:
             yield os.path.join(root, dir)
         for file in files:
             yield os.path.join(root, file)
-        num_sep_this = root.count(os.path.sep)
-        if num_sep + level <= num_sep_this:
-            del dirs[:]
@@ -4,7 +4,6 @@
 Access data in a samtools flagstat output txt file
 """
 import sys
-import re
 
 class Flagstat(object):
     """
@@ -30,21 +29,23 @@ class Flagstat(object):
         self.parse()
 
     def parse(self):
-        with open(self.file) as f:
-            lines = f.readlines()
-        lines = [ l.strip() for l in lines ]
-
-        # total number of alignments
-        TotalMappedReads_line = [x for x in lines if re.search('mapped \(', x)][0]
-        TotalMappedReads = int(TotalMappedReads_line.split(' ')[0])
+        TotalMappedReads = None
+        SequencedPairedReads = None
+        ProperlyPairedReads = None
 
-        # the read is paired in sequencing, no matter whether it is mapped in a pair
-        SequencedPairedReads_line = [x for x in lines if re.search(' paired in sequencing', x)][0]
-        SequencedPairedReads = int(SequencedPairedReads_line.split(' ')[0])
-
-        # the read is mapped in a proper pair
-        ProperlyPairedReads_line = [x for x in lines if re.search(' properly paired \(', x)][0]
-        ProperlyPairedReads = int(ProperlyPairedReads_line.split(' ')[0])
+        # single pass over the file, streaming one line at a time; each line starts with the QC-passed count
+        with open(self.file) as f:
+            for line in f:
+                line = line.strip()
+                if ' properly paired (' in line:
+                    # the read is mapped in a proper pair
+                    ProperlyPairedReads = int(line.partition(' ')[0])
+                elif ' paired in sequencing' in line:
+                    # the read is paired in sequencing, no matter whether it is mapped in a pair
+                    SequencedPairedReads = int(line.partition(' ')[0])
+                elif TotalMappedReads is None and 'mapped (' in line:
+                    # total number of alignments
+                    TotalMappedReads = int(line.partition(' ')[0])
 
         ProperlyPairedPcnt = float(ProperlyPairedReads) / float(SequencedPairedReads)
 
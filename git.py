@@ -23,26 +23,50 @@ def init(dir = '.', add_all = False):
             sh.git.add('.')
             sh.git.commit('-m', 'first commit')
 
+_parse_git_cache = {}
+"""
+cache of the values returned by `parse_git`, in the format `{attribute: value}`; these do not change while the program is running
+"""
+
+def _git_output(command):
+    """
+    Runs a git command and returns its stripped stdout, exiting the program if it fails
+    """
+    try:
+        # universal_newlines=True returns str for Python 2 3 compatibility
+        return(subprocess.check_output(command, universal_newlines = True).strip()) # python 2.7+
+    except subprocess.CalledProcessError:
+        logger.error('Git branch is not configured. Exiting script.')
+        sys.exit()
+
 def parse_git(attribute):
     """
     Check the current git repo for one of the following items
     attribute = "hash"
     attribute = "hash_short"
     attribute = "branch"
+
+    The value for each attribute is only looked up once and then cached for the rest of the program run. The "hash" and "branch" are looked up together with a single ``git rev-parse`` call; ``--short`` makes ``git rev-parse`` only accept a single revision, so "hash_short" needs its own call.
     """
-    command = None
-    if attribute == "hash":
-        command = ['git', 'rev-parse', 'HEAD']
+    if attribute in _parse_git_cache:
+        return(_parse_git_cache[attribute])
+    if attribute in ("hash", "branch"):
+        hash, branch = _git_output(['git', 'rev-parse', 'HEAD', '--abbrev-ref', 'HEAD']).split('\n')
+        _parse_git_cache.update({"hash": hash, "branch": branch})
     elif attribute == "hash_short":
-        command = ['git', 'rev-parse', '--short', 'HEAD']
-    elif attribute == "branch":
-        command = ['git', 'rev-parse', '--abbrev-ref', 'HEAD']
-    if command != None:
-        try:
-            return(subprocess.check_output(command).strip()) # python 2.7+
-        except subprocess.CalledProcessError:
-            logger.error('Git branch is not configured. Exiting script.')
-            sys.exit()
+        _parse_git_cache[attribute] = _git_output(['git', 'rev-parse', '--short', 'HEAD'])
+    return(_parse_git_cache.get(attribute))
+
+def parse_git_all():
+    """
+    Gets all of the items that `parse_git` can check for the current git repo
+
+    Returns
+    -------
+    dict
+        a dictionary in the format ``{'hash': ..., 'hash_short': ..., 'branch': ...}``
+    """
+    return(dict((attribute, parse_git(attribute = attribute)) for attribute in ("hash", "hash_short", "branch")))
 
 def print_iter(iterable):
     """
@@ -51,14 +75,15 @@ def print_iter(iterable):
     for item in iterable: logger.debug(item)
 
 def validate_branch(allowed = ('master', 'production')):
-    try:
-        current_branch = parse_git(attribute = "branch")
-        if current_branch not in allowed:
-            logger.error("Current branch is not allowed! Branch is: {0}.".format(current_branch))
-            logger.error("Allowed branches are:")
-            for item in iterable: logger.error(item)
-            logger.error("Exiting...")
-            sys.exit()
-    except subprocess.CalledProcessError:
-        logger.error('Git branch is not configured. Exiting script.')
+    """
+    Exits the program if the current git branch is not one of the allowed branches
+
+    `parse_git` already exits the program if the branch cannot be found
+    """
+    current_branch = parse_git(attribute = "branch")
+    if current_branch not in allowed:
+        logger.error("Current branch is not allowed! Branch is: {0}.".format(current_branch))
+        logger.error("Allowed branches are:")
+        for item in allowed: logger.error(item)
+        logger.error("Exiting...")
         sys.exit()
@@ -4,25 +4,188 @@
 Functions & items to set up the program loggers
 """
 
-import yaml
 import logging
-import logging.config
-import datetime
+from datetime import datetime as _datetime
 import os
+import copy
+import time
+import json
+import weakref
+import atexit
+try:
+    from logging.handlers import QueueHandler, QueueListener # Python 3.2+
+except ImportError:
+    QueueHandler = None
+    QueueListener = None
+try:
+    from queue import SimpleQueue as Queue # Python 3.7+
+except ImportError:
+    try:
+        from queue import Queue
+    except ImportError:
+        from Queue import Queue
+
+
+# ~~~~~ GLOBALS ~~~~~ #
+_timestamp_format = '%Y-%m-%d-%H-%M-%S'
+"""
+the format used by `timestamp`
+"""
+
+_timestamp2_format = '%Y-%m-%d_%H-%M-%S'
+"""
+the format used by `timestamp2`
+"""
+
+_timestamp_cache = {}
+"""
+the most recent timestamp string made for each format by `_cached_timestamp`, in the format `{format: (second, timestamp)}`
+"""
+
+_formatter_cache = {}
+"""
+cache of the Formatters returned by `get_formatter`, in the format `{(log_format, datefmt): formatter}`
+"""
+
+_config_cache = {}
+"""
+cache of the parsed YAML configs loaded by `log_setup`, in the format `{(path, mtime, size): config}`
+"""
+
+_buffered_handlers = weakref.WeakSet()
+"""
+the open `BufferedFileHandler` objects, which are flushed before the process forks
+"""
+
+
+# ~~~~~ CLASSES ~~~~~ #
+class BufferedFileHandler(logging.FileHandler):
+    """
+    A ``logging.FileHandler`` that writes to the log file through a buffer, instead of flushing the file after every log record
+
+    The buffer is flushed when a record at ``flush_level`` or higher is logged, after every ``flush_records`` records, on the first record logged more than ``flush_interval`` seconds after the last flush, before the process forks (Python 3.7+), and when the handler is closed; ``logging`` closes all handlers when the program exits. No threads are used
+
+    Records that are still in the buffer are lost if the process is killed, so this is opt-in; see `create_main_filehandler`
+
+    Examples
+    --------
+    Example usage::
+
+        handler = BufferedFileHandler('main.log', flush_records = 50)
+        logger.addHandler(handler)
+
+    """
+    def __init__(self, filename, mode = 'a', encoding = None, delay = False, buffer_size = 1 << 16, flush_level = logging.ERROR, flush_records = 100, flush_interval = 30):
+        self.buffer_size = buffer_size
+        self.flush_level = flush_level
+        self.flush_records = flush_records
+        self.flush_interval = flush_interval
+        self._in_emit = False
+        self._num_buffered = 0
+        self._last_flush = time.time()
+        logging.FileHandler.__init__(self, filename, mode = mode, encoding = encoding, delay = delay)
+        _buffered_handlers.add(self)
+
+    def _open(self):
+        """
+        Opens the log file with a large write buffer
+        """
+        if self.encoding is None:
+            return(open(self.baseFilename, self.mode, self.buffer_size))
+        return(logging.FileHandler._open(self))
+
+    def emit(self, record):
+        """
+        Writes the record to the buffer, and only flushes the buffer when one of the flush conditions is met
+        """
+        self._in_emit = True
+        try:
+            logging.FileHandler.emit(self, record)
+        finally:
+            self._in_emit = False
+        self._num_buffered += 1
+        if record.levelno >= self.flush_level or self._num_buffered >= self.flush_records or time.time() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """
+        Flushes the buffer, except for the flush that ``logging.StreamHandler.emit`` does after every record
+        """
+        if not self._in_emit:
+            logging.FileHandler.flush(self)
+            self._num_buffered = 0
+            self._last_flush = time.time()
+
+
+def _flush_buffered_handlers():
+    """
+    Flushes every `BufferedFileHandler`; runs before the process forks, so that the child process does not inherit records that the parent has not written yet
+    """
+    for handler in list(_buffered_handlers):
+        handler.acquire()
+        try:
+            handler.flush()
+        finally:
+            handler.release()
+
+if hasattr(os, 'register_at_fork'): # Python 3.7+
+    os.register_at_fork(before = _flush_buffered_handlers)
 
 
 # ~~~~~ FUNCTIONS ~~~~~ #
-def timestamp():
+def _cached_timestamp(timestamp_format):
+    """
+    Returns a timestamp string for the current time. The timestamp formats only have a resolution of one second, so the string is only built once per second and then reused
+    """
+    second = int(time.time())
+    cached = _timestamp_cache.get(timestamp_format)
+    if cached and cached[0] == second:
+        return(cached[1])
+    ts = _datetime.fromtimestamp(second).strftime(timestamp_format)
+    _timestamp_cache[timestamp_format] = (second, ts)
+    return(ts)
+
+def timestamp(cached = True):
     """
     Return a timestamp string
+
+    Use ``cached = False`` to always build a new timestamp from ``datetime.now()``
     """
-    return('{:%Y-%m-%d-%H-%M-%S}'.format(datetime.datetime.now()))
+    if cached:
+        return(_cached_timestamp(_timestamp_format))
+    return(_datetime.now().strftime(_timestamp_format))
 
-def timestamp2():
+def timestamp2(cached = True):
     """
     Returns a timestamp string
+
+    Use ``cached = False`` to always build a new timestamp from ``datetime.now()``
+    """
+    if cached:
+        return(_cached_timestamp(_timestamp2_format))
+    return(_datetime.now().strftime(_timestamp2_format))
+
+def get_formatter(log_format, datefmt = "%Y-%m-%d %H:%M:%S"):
+    """
+    Gets a ``logging.Formatter`` for the log format and date format. Formatters are created once and shared between all the handlers that use the same formats
+
+    Parameters
+    ----------
+    log_format: str
+        the format for the log messages
+    datefmt: str
+        the format for the dates in the log messages
+
+    Returns
+    -------
+    logging.Formatter
     """
-    return('{:%Y-%m-%d_%H-%M-%S}'.format(datetime.datetime.now()))
+    key = (log_format, datefmt)
+    if key not in _formatter_cache:
+        formatter = logging.Formatter(log_format)
+        formatter.datefmt = datefmt
+        _formatter_cache[key] = formatter
+    return(_formatter_cache[key])
 
 def _logpath():
     """
@@ -117,24 +280,89 @@ def logpath(logfile = 'log.txt'):
     """
     return(logging.FileHandler(logfile))
 
+def _config_cache_path(config_yaml):
+    """
+    Returns the path to the JSON cache file for a YAML config file, e.g. ``.logging.yml.cache.json`` for ``logging.yml``
+    """
+    dirname, basename = os.path.split(os.path.abspath(config_yaml))
+    return(os.path.join(dirname, '.{0}.cache.json'.format(basename)))
+
+def _load_config(config_yaml, stat):
+    """
+    Loads a YAML config file, using the JSON cache file saved next to it if the cache was made from the same version of the file. Otherwise, the YAML is parsed and the cache file is written for next time
+
+    Parameters
+    ----------
+    config_yaml: str
+        path to YAML config file
+    stat: os.stat_result
+        the result of ``os.stat(config_yaml)``
+
+    Returns
+    -------
+    dict
+        the parsed config
+
+    Notes
+    -----
+    The cache is JSON so that loading it can not run any code, even if someone else can write to the config dir; logging configs only hold plain dicts, lists, strings, and numbers
+    """
+    version = [stat.st_mtime, stat.st_size]
+    cache_path = _config_cache_path(config_yaml)
+    try:
+        with open(cache_path, 'r') as f:
+            cached = json.load(f)
+        if cached['version'] == version:
+            return(cached['config'])
+    except Exception:
+        # missing, stale, or unreadable cache file
+        pass
+    # yaml is only imported when a config actually needs to be parsed
+    import yaml
+    # use the faster libyaml based loader if PyYAML was built with it
+    Loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+    with open(config_yaml, 'r') as loggingConf:
+        config = yaml.load(loggingConf, Loader = Loader)
+    try:
+        text = json.dumps({'version': version, 'config': config})
+        with open(cache_path, 'w') as f:
+            f.write(text)
+    except (OSError, IOError, TypeError, ValueError):
+        # the config dir might not be writeable, or the config has values that JSON can not hold
+        pass
+    return(config)
+
 def log_setup(config_yaml, logger_name):
     """
     Set up the logger for the script using a YAML config file
     config = path to YAML config file
+
+    The parsed config is cached for as long as the file's modification time and size do not change, so that loading the same config from several modules only parses it once. The parsed config is also saved to a JSON file next to the YAML file (see `_load_config`), which is much faster to load than the YAML in later runs of the program
     """
-    # Config file relative to this file
-    loggingConf = open(config_yaml, 'r')
-    logging.config.dictConfig(yaml.load(loggingConf))
-    loggingConf.close()
+    import logging.config
+    stat = os.stat(config_yaml)
+    key = (os.path.abspath(config_yaml), stat.st_mtime, stat.st_size)
+    if key not in _config_cache:
+        _config_cache[key] = _load_config(config_yaml = config_yaml, stat = stat)
+    # dictConfig modifies the config it is given, so pass it a copy
+    logging.config.dictConfig(copy.deepcopy(_config_cache[key]))
     return(logging.getLogger(logger_name))
 
+def _is_handler_type(h, types, subclasses = False):
+    """
+    Checks if a handler's class is one of the ``types``, by class name. With ``subclasses = True``, handlers that inherit from one of the ``types`` also match, e.g. a ``BufferedFileHandler`` for ``'FileHandler'``
+    """
+    if subclasses:
+        return(any(cls.__name__ in types for cls in type(h).__mro__))
+    return(h.__class__.__name__ in types)
+
 def logger_filepath(logger, handler_name):
     """
-    Get the path to the filehander log file
+    Get the path to the filehander log file; subclasses of ``FileHandler`` such as `BufferedFileHandler` are included
     """
     log_file = None
     for h in logger.__dict__['handlers']:
-        if h.__class__.__name__ == 'FileHandler':
+        if _is_handler_type(h, types = ('FileHandler',), subclasses = True):
             logname = h.get_name()
             if handler_name == logname:
                 log_file = h.baseFilename
@@ -144,45 +372,48 @@ def log_all_handler_filepaths(logger):
     """
     Adds Info log messages for all filepaths for all file handlers
     """
+    info = logger.info
     for h in logger.__dict__['handlers']:
-        if h.__class__.__name__ == 'FileHandler':
-            logname = h.get_name()
-            log_file = h.baseFilename
-            logger.info('Path to {0} log file: {1}'.format(logname, log_file))
+        if _is_handler_type(h, types = ('FileHandler',)):
+            info('Path to %s log file: %s', h.get_name(), h.baseFilename)
 
-def get_logger_handler(logger, handler_name, handler_type = 'FileHandler'):
+def get_logger_handler(logger, handler_name, handler_type = 'FileHandler', subclasses = False):
     """
     Get the filehander object from a logger
+    Use ``subclasses = True`` to also find handlers that are subclasses of the ``handler_type``
     """
     for h in logger.__dict__['handlers']:
-        if h.__class__.__name__ == handler_type:
+        if _is_handler_type(h, types = (handler_type,), subclasses = subclasses):
             logname = h.get_name()
             if handler_name == logname:
                 return(h)
 
-def get_all_handlers(logger, types = ('FileHandler',)):
+def get_all_handlers(logger, types = ('FileHandler',), subclasses = False):
     """
     Get all logger handlers of the given types from the logger
     types = ['FileHandler', 'StreamHandler']
     x = [h for h in get_all_handlers(logger)]
+    Use ``subclasses = True`` to also get handlers that are subclasses of the types
     """
     for h in logger.__dict__['handlers']:
-        if h.__class__.__name__ in types:
+        if _is_handler_type(h, types = types, subclasses = subclasses):
             yield(h)
 
 def remove_handlers(logger, handlers):
     """
-    Removes all the handlers from a logger
+    Removes the given handlers from a logger
     """
-    for h in logger.__dict__['handlers']:
+    # iterate over a copy, in case the logger's own list of handlers was passed
+    for h in list(handlers):
         logger.removeHandler(h)
     return(logger)
 
-def remove_all_handlers(logger, types = ('FileHandler', 'StreamHandler')):
+def remove_all_handlers(logger, types = ('FileHandler', 'StreamHandler'), subclasses = False):
     """
     Remove all of the handlers from a logger object
+    Use ``subclasses = True`` to also remove handlers that are subclasses of the types
     """
-    handlers = [h for h in get_all_handlers(logger = logger, types = types)]
+    handlers = [h for h in get_all_handlers(logger = logger, types = types, subclasses = subclasses)]
     logger = remove_handlers(logger = logger, handlers = handlers)
     return(logger)
 
@@ -191,12 +422,12 @@ def add_handlers(logger, handlers):
     Add filehandlers to the logger
     """
     # handlers = None
-    if handlers == None:
+    if handlers is None:
         return(logger)
-    # handlers is assumed to be a single handler if its not a list
-    if not isinstance(handlers, list):
+    # a single handler
+    if isinstance(handlers, logging.Handler):
         logger.addHandler(handlers)
-    # otherwise its assumed to be a list of handlers
+    # otherwise its assumed to be a list, tuple, or other iterable of handlers
     else:
         for h in handlers:
             logger.addHandler(h)
@@ -207,16 +438,51 @@ def print_filehandler_filepaths_to_log(logger):
     """
     Make a log entry with the paths to each filehanlder in the logger
     """
+    info = logger.info
     for h in logger.__dict__['handlers']:
-        if h.__class__.__name__ == 'FileHandler':
-            logname = h.get_name()
-            log_file = h.baseFilename
-            logger.info('"{0}" log filepath: {1}'.format(logname, log_file))
+        if _is_handler_type(h, types = ('FileHandler',)):
+            info('"%s" log filepath: %s', h.get_name(), h.baseFilename)
+
+def build_async_logger(name, handlers, level = logging.DEBUG):
+    """
+    Creates a logger that passes its log records through a queue to the handlers, which run in a background thread. Logging calls only have to put the record on the queue, and do not wait on writes to the console or log files
+
+    Parameters
+    ----------
+    name: str
+        the name of the logger
+    handlers: list
+        a list of handlers to send the log records to
+    level: int
+        the logging level for the logger
+
+    Returns
+    -------
+    logging.Logger
+        the logger, with a single ``QueueHandler`` named "queue"
+
+    Notes
+    -----
+    The ``QueueListener`` that runs the handlers is saved as the ``listener`` attribute of the ``QueueHandler``, and is stopped when the program exits, after writing out any queued records. On Python 2, which does not have ``QueueHandler``, the handlers are added to the logger directly instead.
+    """
+    logger = logging.getLogger(name)
+    logger.setLevel(level)
+    if QueueHandler is None:
+        return(add_handlers(logger = logger, handlers = list(handlers)))
+    log_queue = Queue()
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.set_name("queue")
+    queue_handler.listener = QueueListener(log_queue, *handlers, respect_handler_level = True)
+    queue_handler.listener.start()
+    atexit.register(queue_handler.listener.stop)
+    logger.addHandler(queue_handler)
+    return(logger)
 
-def build_logger(name, level = logging.DEBUG, log_format = '[%(asctime)s] %(levelname)s (%(name)s:%(funcName)s:%(lineno)d) %(message)s'):
+def build_logger(name, level = logging.DEBUG, log_format = '[%(asctime)s] %(levelname)s (%(name)s:%(funcName)s:%(lineno)d) %(message)s', async_io = False):
     """
     Create a basic logger instance
     Only add console handler by default
+    Use ``async_io = True`` to write to the console from a background thread, with `build_async_logger`
     """
     # create logger instance
     logger = logging.getLogger(name)
@@ -228,27 +494,32 @@ def build_logger(name, level = logging.DEBUG, log_format = '[%(asctime)s] %(leve
     consolelog.set_name("console")
 
     # create formatter and add it to the handlers
-    formatter = logging.Formatter(log_format)
-    formatter.datefmt = "%Y-%m-%d %H:%M:%S"
+    formatter = get_formatter(log_format = log_format)
     consolelog.setFormatter(formatter)
 
+    if async_io:
+        return(build_async_logger(name = name, handlers = [consolelog], level = level))
+
     # add the handlers to logger
     logger.addHandler(consolelog)
     # logger.addHandler(create_main_filehandler())
     return(logger)
 
-def create_main_filehandler(log_file, name = "main", level = logging.DEBUG, log_format = '%(asctime)s:%(name)s:%(module)s:%(funcName)s:%(lineno)d:%(levelname)s:%(message)s'):
+def create_main_filehandler(log_file, name = "main", level = logging.DEBUG, log_format = '%(asctime)s:%(name)s:%(module)s:%(funcName)s:%(lineno)d:%(levelname)s:%(message)s', buffered = False):
     """
     Return the 'main' file handler using globally set variables
+    Use ``buffered = True`` to write the log through a `BufferedFileHandler`, which is faster, but loses the records still in its buffer if the program is killed
     """
     # global scriptdir
     # global scriptname
     # global logdir
     # file_timestamp = timestamp()
     # log_file = os.path.join(scriptdir, logdir, '{0}.{1}.log'.format(scriptname, file_timestamp))
-    formatter = logging.Formatter(log_format)
-    formatter.datefmt = "%Y-%m-%d %H:%M:%S"
-    mainhandler = logging.FileHandler(log_file)
+    formatter = get_formatter(log_format = log_format)
+    if buffered:
+        mainhandler = BufferedFileHandler(log_file)
+    else:
+        mainhandler = logging.FileHandler(log_file)
     mainhandler.setLevel(level)
     mainhandler.set_name(name)
     mainhandler.setFormatter(formatter)
@@ -258,8 +529,7 @@ def email_log_filehandler(log_file, name = "emaillog", level = logging.INFO, log
     """
     Return a fileHandler for a log meant to be used as the body of an email
     """
-    formatter = logging.Formatter(log_format)
-    formatter.datefmt = datefmt
+    formatter = get_formatter(log_format = log_format, datefmt = datefmt)
     emailhandler = logging.FileHandler(log_file)
     emailhandler.setLevel(level)
     emailhandler.set_name(name)
@@ -282,10 +552,10 @@ def has_console_handler(logger):
         a ``logging.Logger`` object
     """
     # make sure there are handlers
-    if len(logger.handlers) < 1:
+    if not logger.handlers:
         return(False)
-    # check if one of the handlers is named 'console'
-    return(any([h.name == 'console' for h in logger.handlers]))
+    # check if one of the handlers is named 'console'; stops at the first match
+    return(any(h.name == 'console' for h in logger.handlers))
 
 def build_console_handler(name = "console", level = logging.DEBUG, log_format = '[%(asctime)s] %(levelname)s (%(name)s:%(funcName)s:%(lineno)d) %(message)s', datefmt = "%Y-%m-%d %H:%M:%S"):
     """
@@ -298,8 +568,7 @@ def build_console_handler(name = "console", level = logging.DEBUG, log_format =
     consolelog.set_name(name)
 
     # create formatter and add it to the handlers
-    formatter = logging.Formatter(log_format)
-    formatter.datefmt = datefmt
+    formatter = get_formatter(log_format = log_format, datefmt = datefmt)
     consolelog.setFormatter(formatter)
 
     return(consolelog)
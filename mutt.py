@@ -23,14 +23,22 @@ import argparse
 import getpass
 
 # ~~~~ CUSTOM FUNCTIONS ~~~~~~ #
-def subprocess_cmd(command):
+def subprocess_cmd(command, input = None, env = None):
     """
-    Runs a terminal command with stdout piping enabled
+    Runs a terminal command; the command's stdout goes straight to the terminal
+    command = a list of args, which is run directly without a shell, or a string which is run with a shell
+    input = string to write to the command's stdin
+    env = dict of environment variables for the command
+    Returns the command's exit code
     """
-    import subprocess as sp
-    process = sp.Popen(command,stdout=sp.PIPE, shell=True)
-    proc_stdout = process.communicate()[0].strip()
-    print(proc_stdout)
+    shell = not isinstance(command, (list, tuple))
+    stdin = None
+    if input is not None:
+        stdin = sp.PIPE
+    # universal_newlines=True required for Python 2 3 compatibility with string input
+    process = sp.Popen(command, stdin = stdin, shell = shell, env = env, universal_newlines = True)
+    process.communicate(input)
+    return(process.returncode)
 
 def make_attachement_string(attachment_files):
     """
@@ -38,23 +46,14 @@ def make_attachement_string(attachment_files):
     ex:
     -a "$attachment_file" -a "$summary_file" -a "$zipfile"
     """
-    attachment_strings = []
-    if len(attachment_files) > 0:
-        for file in attachment_files:
-            file_string = '-a "{0}" '.format(file)
-            attachment_strings.append(file_string)
-    attachment_string = ''.join(attachment_strings)
-    return(attachment_string)
+    return(''.join('-a "{0}" '.format(file) for file in attachment_files))
 
 def get_file_contents(file):
     """
     Return a string containing all lines in the file
     """
-    lines_list = []
     with open(file) as f:
-        for line in f:
-            lines_list.append(line)
-    return(''.join(lines_list))
+        return(f.read())
 
 def get_reply_to_address(server):
     """
@@ -75,6 +74,7 @@ def mutt_mail(recipient_list, reply_to = '', subject_line = '[mutt.py]', message
     if message_file != None:
         message = get_file_contents(message_file)
     attachment_string = make_attachement_string(attachment_files)
+    # the equivalent shell command, for printing
     command = """
 export EMAIL="{0}"
 
@@ -84,7 +84,14 @@ E0F""".format(reply_to, subject_line, attachment_string, recipient_list, message
     if quiet == False: print('Email command is:\n{0}\n'.format(command))
     if return_only_mode == False:
         if quiet == False: print('Running command, sending email...')
-        subprocess_cmd(command)
+        # run mutt directly instead of through a shell, with the message on stdin in place of the heredoc
+        mutt_command = ['mutt', '-s', subject_line]
+        for file in attachment_files:
+            mutt_command.extend(['-a', file])
+        mutt_command.extend(['--', recipient_list])
+        env = dict(os.environ)
+        env['EMAIL'] = reply_to
+        subprocess_cmd(mutt_command, input = message + '\n', env = env)
     elif return_only_mode == True:
         return(command)
 
@@ -12,24 +12,24 @@ logger.debug("loading qsub module")
 
 import os
 from collections import defaultdict
+from collections import OrderedDict
 import subprocess as sp
 import re
 import time
 import datetime
+import math
 from time import sleep
 import sys
+import io
 import getpass
 import json
-try:
-    from sh import qstat
-except:
-    logger.error("qstat could not be loaded, using dummy function instead")
-    print("WARNING: qstat could not be loaded, using dummy function instead")
-    def qstat():
-        """
-        Dummy function for ``qstat`` in the module
-        """
-        return("")
+import shlex
+import itertools
+import sqlite3
+import threading
+import mmap
+from multiprocessing.pool import ThreadPool
+import xml.etree.ElementTree as ET
 import tools
 
 # ~~~~ GLOBALS ~~~~~~ #
@@ -57,6 +57,167 @@ job_state_key['qw'] = 'Waiting'
 job_state_key['t'] = None
 job_state_key['dr'] = None
 
+qstat_max_age = 30
+"""
+number of seconds that a `qstat` result is reused for by `Job` objects before `qstat` is queried again
+"""
+
+_qstat_cache = {}
+"""
+the most recent `qstat -xml` stdout for each user, shared by all `Job` objects, with the time it was queried at and its number from `_qstat_queries`, in the format `{user: (stdout, time, query)}`
+"""
+
+_qstat_queries = itertools.count(1)
+"""
+numbers each `qstat` query in `_qstat_cache`, so that a `Job` can tell whether it has already been updated from a query; the stdout alone cannot tell, since separate queries can give the same output
+"""
+
+_submitted_jobs = set()
+"""
+the base ID's of the jobs submitted by this process; `Job.present` queries `qstat` again for any other job, since the cached result could be from before that job was submitted or before it left the queue
+"""
+
+_parsed_qstat_cache = {'parsed': None}
+"""
+the last stdout parsed by `parse_qstat` and its parsed entries, in the format `{'parsed': (stdout, entries)}`
+"""
+
+min_poll_interval = 5
+"""
+number of seconds to wait between checks of a newly submitted job; see `Job.next_poll`
+"""
+
+max_poll_interval = 300
+"""
+the maximum number of seconds to wait between checks of a job, no matter how long it has been running; see `Job.next_poll`
+"""
+
+done_flag_tolerance = 60
+"""
+number of seconds that a job's `done_flag` file can appear to have been modified before its `Job` was created, e.g. because of clock differences between the compute nodes and the file server; older files were left by a previous job with the same name and ID, and are ignored
+"""
+
+submit_delay = 0
+"""
+default number of seconds for `submit_job` and `submit_many` to sleep after submitting jobs; `submit`, `submit_array`, and `submit_many` instead wait for the new jobs to be listed in `qstat` with `wait_until_listed`
+"""
+
+listed_tries = 2
+"""
+the number of times that `wait_until_listed` queries `qstat` for newly submitted jobs before giving up
+"""
+
+listed_interval = 0.5
+"""
+number of seconds that `wait_until_listed` waits between `qstat` queries
+"""
+
+_qstat_entry_regex = re.compile(r'^[ \t]*(\d+)[ \t]+\S+[ \t]+\S+[ \t]+\S+[ \t]+([a-zA-Z]+)(?:[ \t].*)?$', re.MULTILINE)
+"""
+regex for the lines for each job in the `qstat` output; the groups are the job ID and its status, from the "job-ID" and "state" columns. Only spaces and tabs are matched between the columns, so a match can not run on into the next line
+"""
+
+_qstat_entry_regex_bytes = re.compile(_qstat_entry_regex.pattern.encode(), re.MULTILINE)
+"""
+`_qstat_entry_regex` for searching bytes
+"""
+
+_qstat_missing = False
+"""
+set to `True` once `qstat` has been found to be unavailable, so that the warning is only given once
+"""
+
+qdel_batch_size = 500
+"""
+the maximum number of job ID's passed to a single ``qdel`` command by `qdel`
+"""
+
+_submit_message_regex = re.compile(r'^[ \t]*Your[ \t]+job(?:-array)?[ \t]+(\S+)[ \t]+(\S+)[ \t]+has[ \t]+been[ \t]+submitted(?=\s|$)', re.MULTILINE)
+"""
+regex for the job submission messages from `qsub`; the groups are the job ID and the quoted job name
+"""
+
+_sync_exit_regex = re.compile(r'exited with exit code (\d+)')
+"""
+regex for the exit status message from `qsub -sync y`
+"""
+
+_qacct_item_regex = re.compile(r'^[ \t]*(\S+)[ \t]+(\S.*?)[ \t\r]*$', re.MULTILINE)
+"""
+regex for the `key value` items on each line of a `qacct` record; lines without a value are skipped
+"""
+
+qacct_cache_db = os.path.join(os.path.expanduser('~'), '.qsub_qacct_cache.sqlite')
+"""
+path to the SQLite database used by `get_qacct` to keep `qacct` output between program runs; set to `None` to only cache `qacct` output in memory
+"""
+
+_qacct_cache = {}
+"""
+cache of the stdout from `qacct` for completed jobs and the time it was queried, in the format `{job_id: (qacct_stdout, time)}`; array job tasks use keys in the format `job_id.task_id`
+"""
+
+accounting_file = os.path.join(os.environ['SGE_ROOT'], os.environ.get('SGE_CELL', 'default'), 'common', 'accounting') if 'SGE_ROOT' in os.environ else None
+"""
+path to the SGE accounting file that `qacct` reads its records from; `get_qacct` reads the records from it directly when it can. Set to `None` to always run `qacct`
+"""
+
+_accounting_cache = {'path': None, 'inode': None, 'offset': 0, 'records': OrderedDict()}
+"""
+the current user's records read from the `accounting_file` by this process, in the format `{job_id: [record, ...]}` in the order they were read, along with the file's inode and the byte offset that has been read up to, so that only new records need to be read the next time. The offset and the records are also saved in the `qacct_cache_db`, so that the next program run carries on from the same offset
+"""
+_accounting_lock = threading.Lock()
+
+accounting_max_jobs = 5000
+"""
+the maximum number of jobs to keep records for in the `_accounting_cache` and the `qacct_cache_db`; the records of the oldest jobs are removed first, and `get_qacct` runs `qacct` for jobs that are no longer cached
+"""
+
+_accounting_fields = ('qname', 'hostname', 'group', 'owner', 'jobname', 'jobnumber', 'account', 'priority', 'qsub_time', 'start_time', 'end_time', 'failed', 'exit_status', 'ru_wallclock')
+"""
+the names used by `qacct` for the first fields of each line in the `accounting_file`; the task ID is field 35
+"""
+
+_current_user = None
+"""
+the current user's username, as returned by `current_user`
+"""
+
+_qacct_time_cache = {}
+"""
+cache of the timestamps parsed by `_parse_qacct_time`, in the format `{timestamp_str: datetime}`
+"""
+
+_qacct_time_regex = re.compile(r'^\s*[A-Za-z]{3}\s+([A-Za-z]{3})\s+(\d{1,2})\s+(\d{1,2}):(\d{2}):(\d{2})\s+(\d{4})\s*$')
+"""
+regex for the timestamps in the `qacct` output, e.g. 'Wed Jun  5 14:03:22 2024'; the groups are the month, day, hours, minutes, seconds, and year
+"""
+
+_qacct_months = dict((month, i) for i, month in enumerate(('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'), 1))
+"""
+the month numbers for the month names used in the `qacct` timestamps, in the format `{'Jan': 1, ...}`
+"""
+
+
+# time.monotonic is only available in Python 3.3+
+_monotonic = getattr(time, 'monotonic', time.time)
+
+_monitor_service = None
+"""
+the `JobMonitorService` shared by every call to `monitor_jobs` with `use_service = True`, as returned by `get_monitor_service`
+"""
+_monitor_service_lock = threading.Lock()
+
+_qstat_poller = None
+"""
+the `QstatPoller` started by `start_qstat_poller`
+"""
+
+_status_flags = {}
+"""
+the `state`, `is_running`, and `is_error` values for each `qstat` status seen so far, shared by all `Job` objects, in the format `{status: (state, is_running, is_error)}`; see `Job._status_flags`
+"""
+
 
 # ~~~~ CUSTOM CLASSES ~~~~~~ #
 class Job(object):
@@ -77,7 +238,12 @@ class Job(object):
         x.running()
         x.present()
     """
-    def __init__(self, id, name = None, log_dir = None, debug = False):
+    # fixed set of attributes, so that each Job does not need its own __dict__; there can be thousands of Jobs being monitored at once
+    __slots__ = ('id', 'name', 'log_dir', 'log_paths', 'completions', 'done_flag', 'exit_status', 'submit_time', 'task_id',
+    'qstat_stdout', 'entry', 'status', 'state', 'is_running', 'is_error', 'is_present',
+    'qacct_stdout', 'qacct_dict', 'completion_validations', 'validations', '_terminal', '_since', '_qstat_query')
+
+    def __init__(self, id, name = None, log_dir = None, debug = False, done_flag = None, task_id = None, since = None):
         """
         Parameters
         ----------
@@ -89,11 +255,15 @@ class Job(object):
             path to the directory used to hold log output by the compute job
         debug: bool
             intialize the job without immediately querying `qstat` to determine job status
+        done_flag: str
+            path to the file that the compute job writes its exit status to when it exits, as set up by `submit_job`
+        task_id: int
+            the task ID, for a task of an array job submitted with `submit_array`
+        since: float
+            the `_monotonic` time from which the job is known to be in `qstat`, e.g. right after it was submitted; a cached `qstat` result from before then might not list the job yet, so it does not mark the job as finished. Defaults to the time that the Job object is created
 
         Attributes
         ----------
-        job_state_key: dict
-            the module's `job_state_key` object
         id: int
             a numeric ID for the Job object
         name: str
@@ -104,13 +274,26 @@ class Job(object):
             dictionary containing the types and paths to the job's output logs
         completions: str
             character string used to describe the job and its completion states
+        done_flag: str
+            path to the file that the compute job writes its exit status to when it exits
+        exit_status: int
+            the job's exit status, if it was reported by `qsub -sync y` (see `submit`), or read from its `done_flag` by `done` or `validate_completion`
+        submit_time: float
+            the time that the Job object was created, usually right after the job was submitted; used by `next_poll`
         """
-        global job_state_key
-        self.job_state_key = job_state_key
         self.id = id
         self.name = name
         self.log_dir = log_dir
         self.log_paths = {}
+        self.done_flag = done_flag
+        self.task_id = task_id
+        self.exit_status = None
+        self.submit_time = time.time()
+        # set once the job is known to have left the qstat queue
+        self._terminal = False
+        self._since = since if since is not None else _monotonic()
+        # the number of the cached qstat query the job was last updated from
+        self._qstat_query = None
         if log_dir:
             self.update_log_files()
         # hold a character string of completion validation information
@@ -120,6 +303,8 @@ class Job(object):
         if not debug:
             self._update()
     def __repr__(self):
+        if self.task_id is not None:
+            return('Job(id = {0}, task_id = {1}, name = {2}, log_dir = {3})'.format(self.id, self.task_id, self.name, self.log_dir))
         return('Job(id = {0}, name = {1}, log_dir = {2})'.format(self.id, self.name, self.log_dir))
 
     # ~~~~~ Methods for determining running job state from qstat ~~~~~ #
@@ -141,7 +326,7 @@ class Job(object):
         log_path = self.get_log_file(_type = _type)
         self.log_paths.update({_type: log_path})
 
-    def get_log_file(self, _type = 'stdout'):
+    def get_log_file(self, _type = 'stdout', check = False):
         """
         Returns the expected path to the job's log file
 
@@ -149,21 +334,29 @@ class Job(object):
         ----------
         _type: str
             either 'stdout' or 'stderr', representing the type of log path to generate
+        check: bool
+            log a warning if the file does not exist; the file is not usually created until the job starts running, so this is not checked by default
 
         Notes
         -----
         A stdout log file basename for a compute job with an ID of `4088513` and a name of `python` would look like this: `python.o4088513`
         The corresponding stderr log name would look like: `python.e4088513`
+        For array job tasks, the task ID is added to the end, e.g. `python.o4088513.1`
         """
         if not self.log_dir:
-            logger.warning('log_dir attribute is not set for this qsub job: {0}'.format((self.id, self.name)))
+            logger.warning('log_dir attribute is not set for this qsub job: %s', (self.id, self.name))
             return(None)
         type_key = {'stdout': '.o', 'stderr': '.e'}
         type_char = type_key[_type]
         logfile = str(self.name) + type_char + str(self.id)
+        if self.task_id is not None:
+            logfile = '{0}.{1}'.format(logfile, self.task_id)
         log_path = os.path.join(str(self.log_dir), logfile)
-        if not tools.item_exists(log_path):
-            logger.warning('Log file does not appear to exist: {0}'.format(log_path))
+        if check:
+            try:
+                os.lstat(log_path)
+            except OSError:
+                logger.warning('Log file does not appear to exist: %s', log_path)
         return(log_path)
 
 
@@ -175,11 +368,10 @@ class Job(object):
         -------
         str
         """
-        import re
-        job_id_pattern = r"^\s*{0}\s.*$".format(id)
-        if not qstat_stdout:
+        # an empty qstat_stdout is a valid result when there are no jobs in the queue
+        if qstat_stdout is None:
             qstat_stdout = qstat()
-        entry = re.findall(str(job_id_pattern), str(qstat_stdout), re.MULTILINE)
+        entry = [match.group(0) for match in _qstat_matches(qstat_stdout = qstat_stdout, job_id = id)]
         return(entry)
 
     def get_status(self, id, entry = None, qstat_stdout = None):
@@ -190,16 +382,13 @@ class Job(object):
         -------
         str
         """
-        import re
-        # regex for the pattern matching https://docs.python.org/2/library/re.html
-        job_id_pattern = r"^.*\s*{0}.*\s([a-zA-Z]+)\s.*$".format(id)
-        if not entry:
-            entry = self.get_job(id = id, qstat_stdout = qstat_stdout)
-        status = re.search(str(job_id_pattern), str(entry), re.MULTILINE)
-        if status:
-            return(status.group(1))
-        else:
-            return(status)
+        if entry:
+            # the entry lines are searched in the same way as the full qstat output
+            newline = b'\n' if isinstance(entry[0], bytes) else '\n'
+            return(lookup(qstat_stdout = newline.join(entry), job_id = id))
+        if qstat_stdout is None:
+            qstat_stdout = qstat()
+        return(lookup(qstat_stdout = qstat_stdout, job_id = id))
 
     def get_state(self, status, job_state_key):
         """
@@ -254,17 +443,89 @@ class Job(object):
         else:
             return(False)
 
-    def _update(self):
+    def _update(self, qstat_stdout = None, force = False, max_age = None):
         """
         Update the object's status attributes based on `qstat` stdout messages
+
+        Parameters
+        ----------
+        qstat_stdout: str
+            the stdout from a `qstat` query that has already been run, e.g. by `refresh_all`; if `None`, the shared `cached_qstat` result is used
+        force: bool
+            query `qstat` again instead of using a cached result
+        max_age: int
+            the maximum age in seconds of a cached result that can be used; defaults to the module's `qstat_max_age`
+
+        Notes
+        -----
+        Once the job has left the `qstat` queue it cannot come back, so after that the job is not updated again
         """
-        self.qstat_stdout = qstat()
-        self.entry = self.get_job(id = self.id, qstat_stdout = self.qstat_stdout)
-        self.status = self.get_status(id = self.id, entry = self.entry, qstat_stdout = self.qstat_stdout)
-        self.state = self.get_state(status = self.status, job_state_key = self.job_state_key)
-        self.is_running = self.get_is_running(state = self.state, job_state_key = self.job_state_key)
-        self.is_error = self.get_is_error(state = self.state, job_state_key = self.job_state_key)
-        self.is_present = self.get_is_present(id = self.id, entry = self.entry, qstat_stdout = self.qstat_stdout)
+        if self._terminal:
+            return
+        if qstat_stdout is None:
+            qstat_stdout, queried, query = _cached_qstat_query(max_age = max_age, force = force)
+            # the status attributes only depend on the qstat output, so they are already up to date if the job was last updated from the same query; e.g. when `present()` and `error()` are called one after the other
+            if query == self._qstat_query:
+                return
+        else:
+            # output queried by the caller is taken to be current
+            queried = query = None
+        self._qstat_query = query
+        # the qstat output is only parsed once, no matter how many jobs are updated from it; the job's entry is shared with the parsed result instead of being copied
+        qstat_entry = _parsed_qstat(qstat_stdout = qstat_stdout).get(_base_job_id(self.id))
+        if not qstat_entry:
+            if queried is not None and queried < self._since:
+                # a cached result from before the job was known to be in the queue; a newer result might still list it
+                self._set_absent()
+                self.qstat_stdout = qstat_stdout
+            else:
+                # the job has left the queue, so the qstat output does not need to be kept
+                self._set_terminal()
+            return
+        self.qstat_stdout = qstat_stdout
+        self.entry = qstat_entry['entries']
+        status = qstat_entry['status']
+        # the other status attributes only change when the status does
+        if status == getattr(self, 'status', None):
+            return
+        self.status = status
+        self.state, self.is_running, self.is_error = self._status_flags(status = status)
+        self.is_present = True
+
+    def _status_flags(self, status):
+        """
+        Gets the `state`, `is_running`, and `is_error` values for a `qstat` status. These are the same for every job with the same status, so they are only worked out once per status and stored in `_status_flags`
+
+        Returns
+        -------
+        tuple
+            `(state, is_running, is_error)`
+        """
+        flags = _status_flags.get(status)
+        if flags is None:
+            state = self.get_state(status = status, job_state_key = job_state_key)
+            flags = (state, self.get_is_running(state = state, job_state_key = job_state_key), self.get_is_error(state = state, job_state_key = job_state_key))
+            _status_flags[status] = flags
+        return(flags)
+
+    def _set_absent(self):
+        """
+        Sets the status attributes for a job that is not listed in `qstat`
+        """
+        self.qstat_stdout = None
+        self.entry = []
+        self.status = None
+        self.state = None
+        self.is_running = False
+        self.is_error = False
+        self.is_present = False
+
+    def _set_terminal(self):
+        """
+        Sets the status attributes for a job that is known to have exited, e.g. from its `done_flag` or because it has left the `qstat` queue
+        """
+        self._set_absent()
+        self._terminal = True
 
     def _debug_update(self, qstat_stdout):
         """
@@ -273,54 +534,166 @@ class Job(object):
         self.qstat_stdout = qstat_stdout
         self.entry = self.get_job(id = self.id, qstat_stdout = self.qstat_stdout)
         self.status = self.get_status(id = self.id, entry = self.entry, qstat_stdout = self.qstat_stdout)
-        self.state = self.get_state(status = self.status, job_state_key = self.job_state_key)
-        self.is_running = self.get_is_running(state = self.state, job_state_key = self.job_state_key)
+        self.state = self.get_state(status = self.status, job_state_key = job_state_key)
+        self.is_running = self.get_is_running(state = self.state, job_state_key = job_state_key)
+        self.is_error = self.get_is_error(state = self.state, job_state_key = job_state_key)
         self.is_present = self.get_is_present(id = self.id, entry = self.entry, qstat_stdout = self.qstat_stdout)
 
-    def running(self):
+    def refresh(self, qstat_stdout = None):
+        """
+        Updates the job's `is_present`, `is_running` and `is_error` attributes from a single `qstat` query, so that they can all be read without checking `qstat` again
+
+        Parameters
+        ----------
+        qstat_stdout: str
+            the stdout from a `qstat` query to check the job against, e.g. one query shared by many jobs; if `None`, the shared `cached_qstat` result is used
+
+        Returns
+        -------
+        Job
+            the job itself
+        """
+        self._update(qstat_stdout = qstat_stdout)
+        return(self)
+
+    def running(self, qstat_stdout = None):
         """
         Returns `True` or `False` whether or not the job is currently considered to be running
 
+        Parameters
+        ----------
+        qstat_stdout: str
+            the stdout from a `qstat` query to check the job against, e.g. one query shared by many jobs; if `None`, the shared `cached_qstat` result is used
+
         Returns
         -------
         bool
             `True` if running, otherwise `False`
         """
-        self._update()
+        self._update(qstat_stdout = qstat_stdout)
         return(self.is_running)
 
-    def error(self):
+    def error(self, qstat_stdout = None):
         """
         Returns `True` or `False`  whether or not the job is currently considered to be in an error state
 
+        Parameters
+        ----------
+        qstat_stdout: str
+            the stdout from a `qstat` query to check the job against, e.g. one query shared by many jobs; if `None`, the shared `cached_qstat` result is used
+
         Returns
         -------
         bool
             `True` if in error, otherwise `False`
         """
-        self._update()
+        self._update(qstat_stdout = qstat_stdout)
         return(self.is_error)
 
-    def present(self):
+    def present(self, qstat_stdout = None):
         """
         Returns `True` or `False`  whether or not the job is currently in the `qstat` queue
 
+        Parameters
+        ----------
+        qstat_stdout: str
+            the stdout from a `qstat` query to check the job against, e.g. one query shared by many jobs; if `None`, the shared `cached_qstat` result is used for jobs submitted by this process, and `qstat` is queried again for any other job
+
         Returns
         -------
         bool
             `True` if present, otherwise `False`
+
+        Notes
+        -----
+        If the job's `done_flag` file exists then the job has already exited, and `qstat` is not queried
         """
-        self._update()
+        if self.done():
+            self._set_terminal()
+            return(self.is_present)
+        if qstat_stdout is None and _base_job_id(self.id) not in _submitted_jobs:
+            self._update(force = True)
+        else:
+            self._update(qstat_stdout = qstat_stdout)
         return(self.is_present)
 
+    def done(self):
+        """
+        Checks if the job has created its `done_flag` file, which it does when it exits, or if its exit status has already been reported by `qsub -sync y`
+
+        Returns
+        -------
+        bool
+            `True` if the job is known to have exited, otherwise `False`
+
+        Notes
+        -----
+        The first time the file is found, the exit status is read from it into `exit_status` and the file is removed, so that finished jobs do not leave their flags behind whether or not they are validated afterwards
+        """
+        if self.exit_status is not None:
+            return(True)
+        if not done_flag_exists(self.done_flag, min_time = self.submit_time):
+            return(False)
+        self.exit_status = read_done_flag(self.done_flag, min_time = self.submit_time)
+        # a file without an exit status might still be being written; it is read again by `validate_completion`
+        if self.exit_status is not None:
+            remove_done_flag(self.done_flag)
+        return(True)
+
+    def wait_until_done(self, poll = None):
+        """
+        Waits until the job is no longer present in the `qstat` queue, or is in an error state
+
+        Parameters
+        ----------
+        poll: int
+            number of seconds to wait between checks of the job; if `None`, the interval from `next_poll` is used, which increases as the job gets older
+
+        Returns
+        -------
+        Job
+            the Job object itself
+
+        Notes
+        -----
+        The job is checked with `cached_qstat`, so many jobs that are waited on at the same time, e.g. from separate threads, will share a single `qstat` query per polling interval
+        """
+        while True:
+            if self.done():
+                self._set_terminal()
+                return(self)
+            interval = poll or self.next_poll()
+            self._update(max_age = interval)
+            if not self.is_present or self.is_error:
+                return(self)
+            sleep(interval)
+
+    def next_poll(self):
+        """
+        Gets the number of seconds to wait before checking the job again. Jobs are checked often while they are new, so that short jobs are noticed quickly, and less often as they get older, so that long running jobs do not keep querying the scheduler
+
+        Returns
+        -------
+        int
+            the polling interval; starts at `min_poll_interval` and doubles as the job's age doubles, up to `max_poll_interval`
+        """
+        age = time.time() - self.submit_time
+        interval = min_poll_interval * 2 ** int(math.log(max(1, age / min_poll_interval), 2))
+        return(min(max_poll_interval, interval))
+
     # ~~~~~ Methods for querying qacct for job completion status ~~~~~ #
-    def get_qacct(self, job_id = None):
+    def get_qacct(self, job_id = None, force = False):
         """
         Gets the `qacct` entry for a completed qsub job, used to determine if the job completed successfully
 
+        Parameters
+        ----------
+        force: bool
+            ignore the cached results, and query `qacct` again
+
         Notes
         -----
-        This operation is extremely slow, takes about 10 - 30+ seconds to complete
+        This operation is extremely slow, takes about 10 - 30+ seconds to complete; results are cached by the module's `get_qacct`
 
         Returns
         -------
@@ -329,9 +702,7 @@ class Job(object):
         """
         if not job_id:
             job_id = self.id
-        qacct_command = 'qacct -j {0}'.format(job_id)
-        run_cmd = tools.SubprocessCmd(command = qacct_command).run()
-        return(run_cmd.proc_stdout)
+        return(get_qacct(job_id = job_id, task_id = self.task_id, min_time = self.submit_time, force = force))
 
     def qacct2dict(self, proc_stdout = None, entry_delim = None):
         """
@@ -339,6 +710,8 @@ class Job(object):
 
         Parameters
         ----------
+        proc_stdout: str
+            the stdout from `qacct`; if `None`, the job's `qacct` output is looked up with `get_qacct`
         entry_delim: str
             character string delimiter to split entries in the `qacct` output, defaults to '=============================================================='
 
@@ -352,26 +725,10 @@ class Job(object):
         `qacct` returns multiple entries per `job_id`, because the `job_id` wrap around. So multiple historic jobs with the same `job_id` number will also be returned, delimited by a long string of `===`
 
         """
-        if not proc_stdout:
+        # empty output means that qacct had no records for the job; querying it again would not find any either
+        if proc_stdout is None:
             proc_stdout = self.get_qacct()
-        # entries for jobs in the qacct stdout are split with this character string
-        if not entry_delim:
-            entry_delim = '=============================================================='
-        # dict to hold the items in each entry
-        entry_dict = {}
-        # split the large blob of stdout text into separate job entries; skip empty entries
-        entries = [c for c in proc_stdout.split(entry_delim) if c != '']
-        # each entry has one item per line, separated by a variable amount of whitespace
-        for i, entry in enumerate(entries):
-            # items in the entry
-            entry_stats = entry.split('\n')
-            entry_dict[i] = {}
-            for item in entry_stats:
-                # split on the first whitespace; make sure at least 2 entries are produced
-                if len(item.split(None, 1)) >=2:
-                    key, value = item.split(None, 1)
-                    entry_dict[i][key] = value.strip()
-        return(entry_dict)
+        return(qacct2dict(proc_stdout = proc_stdout, entry_delim = entry_delim))
 
     def filter_qacct(self, qacct_dict = None, days_limit = 7, username = None):
         """
@@ -380,7 +737,7 @@ class Job(object):
         Parameters
         ----------
         qacct_dict: dict
-            dictionary containing job records which represent `qacct` entries
+            dictionary containing job records which represent `qacct` entries; if `None`, the job's `qacct` records are looked up
         days_limit: int or None
             Maximum allowed age of a job. Defaults to 7 days, change this to `None` to disable date filtering
         username: str
@@ -401,28 +758,17 @@ class Job(object):
 
         """
         if not username:
-            username = getpass.getuser()
+            username = current_user()
 
-        if not qacct_dict:
+        # an empty dict means that qacct had no records for the job; querying it again would not find any either
+        if qacct_dict is None:
             qacct_dict = self.qacct2dict()
 
-        for key, subdict in qacct_dict.items():
-            # only keep the entries that match the current user's username
-            job_owner = subdict['owner']
-            if job_owner != username:
-                qacct_dict.pop(key)
-                continue
-
-            # make sure the job was completed within the last 7 days
-            job_end_time = subdict['end_time']
-            # TODO: sometimes the timestamp is not in the correct format, need to have try/except here
-            job_end_time_obj = datetime.datetime.strptime(job_end_time, "%c")
-            time_now = datetime.datetime.now()
-            time_elapsed = time_now - job_end_time_obj
-            if days_limit:
-                if time_elapsed.days > days_limit:
-                    qacct_dict.pop(key)
-                    continue
+        cutoff = _qacct_cutoff(days_limit = days_limit)
+        # only keep the entries that match the current user's username, and were completed within the days_limit
+        qacct_dict = {key: subdict for key, subdict in qacct_dict.items()
+                        if subdict.get('owner') == username
+                        and _qacct_within_days(job_end_time = subdict.get('end_time'), cutoff = cutoff)}
         # more filter criteria here...
         return(qacct_dict)
 
@@ -476,6 +822,23 @@ class Job(object):
         # create a list of validations for the object
         self.completion_validations = {}
 
+        # the job might have written its exit status to its done flag file when it exited
+        if self.exit_status is None:
+            self.exit_status = read_done_flag(self.done_flag, min_time = self.submit_time)
+        # the exit status is kept on the Job, so the flag file is not needed anymore
+        if self.exit_status is not None:
+            remove_done_flag(self.done_flag)
+        # the exit status was already reported by 'qsub -sync y' or the done flag; qstat and qacct do not need to be checked
+        if self.exit_status is not None:
+            validation = {
+                'exit_status_0': {
+                'status': self.exit_status == 0,
+                'note': 'The exit status reported for the job was {0}; >0 means the job failed'.format(self.exit_status)
+                }
+            }
+            self.update_completion_validations(validation)
+            return(validation['exit_status_0']['status'])
+
         # make sure the job is not currently running or in queues
         validation = {
             'qtat_presence': {
@@ -487,7 +850,7 @@ class Job(object):
         if validation['qtat_presence']['status']:
             validation['qtat_presence']['note'] = 'The job is still present in qstat and has not completed yet; job cannot be validated'
             self.update_completion_validations(validation)
-            # logger.error('Job {0} is still running and cannot be validated for completion'.format(job_id))
+            # logger.error('Job %s is still running and cannot be validated for completion', job_id)
             return(False)
         else:
             validation['qtat_presence']['note'] = 'The job is not present in qstat and has completed'
@@ -515,7 +878,7 @@ class Job(object):
             validation['has_qacct_entries']['status'] = False
             validation['has_qacct_entries']['note'] = 'No entries were left in qacct job record output after filtering; job cannot be validated'
             self.update_completion_validations(validation)
-            # logger.error('No valid job entries found for job_id {0}'.format(job_id))
+            # logger.error('No valid job entries found for job_id %s', job_id)
             return(False)
         else:
             validation['has_qacct_entries']['status'] = True
@@ -529,11 +892,11 @@ class Job(object):
             'note': None
             }
         }
-        if len(self.qacct_dict.keys()) > 1:
+        if len(self.qacct_dict) > 1:
             validation['has_only_one_qacct_entry']['status'] = False
             validation['has_only_one_qacct_entry']['note'] = 'More than one entry was left in qacct job record output after filtering; job cannot be validated'
             self.update_completion_validations(validation)
-            # logger.debug('Multiple entries found for job_id {0};\n{1}'.format(job_id, qacct_dict))
+            # logger.debug('Multiple entries found for job_id %s;\n%s', job_id, qacct_dict)
             return(False)
         else:
             validation['has_only_one_qacct_entry']['status'] = True
@@ -552,8 +915,8 @@ class Job(object):
             }
         }
         # get the key index for the first entry inthe dict
-        first_entry_key = self.qacct_dict.keys()[0]
-        status_code = self.get_qacct_job_failed_status(failed_entry = self.qacct_dict[first_entry_key]['failed'])
+        first_entry = next(iter(self.qacct_dict.values()))
+        status_code = self.get_qacct_job_failed_status(failed_entry = first_entry['failed'])
         if status_code > 0:
             validation['failed_status_0']['status'] = False
             validation['failed_status_0']['note'] = 'The "failed" qacct value for the job was {0}; >0 means the job failed'.format(status_code)
@@ -570,8 +933,7 @@ class Job(object):
             'note': None
             }
         }
-        first_entry_key = self.qacct_dict.keys()[0]
-        exit_status = int(self.qacct_dict[first_entry_key]['exit_status'])
+        exit_status = int(first_entry['exit_status'])
         if exit_status > 0:
             validation['exit_status_0']['status'] = False
             validation['exit_status_0']['note'] = 'The "exit_status" qacct value for the job was {0}; >0 means the job failed'.format(exit_status)
@@ -590,70 +952,537 @@ class Job(object):
 
         # check if not all validations are True...
         if not all(validations):
-            # logger.error('The job {0} is not valid'.format(job_id))
+            # logger.error('The job %s is not valid', job_id)
             # logger.error({'validate_failed_status': validate_failed_status, 'validate_exit_status': validate_exit_status})
             return(False)
         else:
-            # logger.debug('The job {0} is valid'.format(job_id))
+            # logger.debug('The job %s is valid', job_id)
             return(True)
 
 
+class JobMonitorService(threading.Thread):
+    """
+    A background thread that monitors `Job` objects for completion on behalf of any number of callers. All of the jobs subscribed to the service are checked against a single `qstat` query on each pass, so only one polling loop runs in the program no matter how many callers are waiting on jobs. Use `get_monitor_service` to get the service shared by the module instead of creating a new one.
 
+    Examples
+    --------
+    Example usage::
 
+        service = get_monitor_service()
+        event = service.subscribe(job)
+        event.wait()
+        state = service.pop_state(job)
 
-# ~~~~~~ JOB FUNCTIONS ~~~~~ #
-def submit(verbose = False, log_dir = None, monitor = False, validate = False, *args, **kwargs):
     """
-    Submits a shell command to be run as a `qsub` compute job. Returns a `Job` object. Passes args and kwargs to `submit_job`. Compute jobs are created by assembling a `qsub` shell command using a bash heredoc wrapped around the provided shell command to be executed. The numeric job ID and job name echoed by `qsub` on stdout will be captured and used to generate a 'Job' object.
+    def __init__(self, poll_interval_min = None, poll_interval_max = None):
+        """
+        Parameters
+        ----------
+        poll_interval_min: int
+            the minimum number of seconds to wait between checks; defaults to the module's `min_poll_interval`
+        poll_interval_max: int
+            the maximum number of seconds to wait between checks; defaults to the module's `max_poll_interval`
 
-    Parameters
-    ----------
-    verbose: bool
-        `True` or `False`, whether or not the generated `qsub` command should be printed in log output
-    log_dir: str
-        the directory to use for qsub job log output files, defaults to the current working directory
-    monitor: bool
-        whether the job should be immediately monitored until completion
-    validate: bool
-        whether or not the job should immediately be validated upon completion
-    *args: list
-        list of arguments to pass on to `submit_job`
-    **kwargs: dict
-        dictionary of args to pass on to `submit_job`
+        Attributes
+        ----------
+        subscribers: dict
+            the jobs being monitored, in the format `{job: threading.Event}`; each job's event is set when the job is finished
+        states: dict
+            the final states of the finished jobs that have not been collected with `pop_state` yet, in the format `{job: state}`, where the state is 'completed' or 'error'
+        """
+        threading.Thread.__init__(self)
+        # the thread should not keep the program running
+        self.daemon = True
+        self.poll_interval_min = poll_interval_min if poll_interval_min is not None else min_poll_interval
+        self.poll_interval_max = poll_interval_max if poll_interval_max is not None else max_poll_interval
+        self.subscribers = {}
+        self.states = {}
+        # the number of callers that have subscribed to each job and not collected its state yet
+        self._num_waiting = defaultdict(int)
+        self._lock = threading.Lock()
+        # set to wake the thread up early, when new jobs are subscribed
+        self._wakeup = threading.Event()
+
+    def subscribe(self, job):
+        """
+        Adds a job to be monitored by the service
 
-    Returns
-    -------
-    Job
-        a `Job` object, representing a `qsub` compute job that has been submitted to the HPC cluster
+        Returns
+        -------
+        threading.Event
+            an event that is set when the job has left `qstat`, or is in an error state; the job's final state can then be retrieved with `pop_state`
+        """
+        with self._lock:
+            event = self.subscribers.get(job)
+            if event is None and job in self.states:
+                # the job already finished for another caller
+                event = threading.Event()
+                event.set()
+            elif event is None:
+                event = threading.Event()
+                self.subscribers[job] = event
+            self._num_waiting[job] += 1
+        self._wakeup.set()
+        return(event)
+
+    def pop_state(self, job):
+        """
+        Gets the final state of a finished job. Each caller that subscribed to the job should call this once; the job is no longer tracked after they all have
+
+        Returns
+        -------
+        str
+            'completed' or 'error', or `None` if the job has not finished
+        """
+        with self._lock:
+            state = self.states.get(job)
+            if state is not None:
+                self._num_waiting[job] -= 1
+                if self._num_waiting[job] < 1:
+                    del self._num_waiting[job]
+                    del self.states[job]
+            return(state)
+
+    def check(self):
+        """
+        Checks all of the subscribed jobs once, in the same way as `monitor_jobs`, and sets the events for the jobs that have finished
+
+        Returns
+        -------
+        int
+            the number of jobs that finished
+        """
+        with self._lock:
+            jobs = list(self.subscribers)
+        finished = {}
+        # jobs that have created their done flag have exited and do not need to be checked in qstat
+        pending_jobs = []
+        for job in jobs:
+            if job.done():
+                job._set_terminal()
+                finished[job] = 'completed'
+            else:
+                pending_jobs.append(job)
+        if pending_jobs:
+            qstat_stdout = cached_qstat(force = True)
+            for job in pending_jobs:
+                job.refresh(qstat_stdout = qstat_stdout)
+                if not job.is_present:
+                    finished[job] = 'completed'
+                elif job.is_error:
+                    finished[job] = 'error'
+        with self._lock:
+            for job, state in finished.items():
+                self.states[job] = state
+                self.subscribers.pop(job).set()
+        return(len(finished))
+
+    def run(self):
+        """
+        Checks the subscribed jobs until the program exits, waiting between checks for as long as the newest job allows (see `Job.next_poll`); the thread sleeps while there are no jobs to monitor
+        """
+        while True:
+            self._wakeup.clear()
+            try:
+                num_finished = self.check()
+            except Exception:
+                # keep monitoring the jobs; the next pass might succeed
+                logger.exception('Error while checking the monitored jobs')
+                num_finished = 0
+            with self._lock:
+                jobs = list(self.subscribers)
+            if not jobs:
+                self._wakeup.wait()
+                continue
+            self._wakeup.wait(_poll_interval(jobs = jobs, finished = bool(num_finished), poll_interval_min = self.poll_interval_min, poll_interval_max = self.poll_interval_max))
+
+class QstatPoller(threading.Thread):
+    """
+    A background thread that queries `qstat` at a fixed interval and stores the result in the same cache as `cached_qstat`. While it is running, `Job` objects that check their status (e.g. with `present()`) read the latest result from the cache instead of each waiting on their own `qstat` query. Use `start_qstat_poller` to start the poller shared by the module.
 
     Examples
     --------
     Example usage::
 
-        job = submit(command = 'echo foo')
-        job = submit(command = 'echo foo', log_dir = "logs", print_verbose = True, monitor = True, validate = True)
+        poller = start_qstat_poller(poll_interval = 10)
+        entry = poller.get(job_id = '2495634')
+        poller.stop()
 
     """
-    # check if log_dir was passed
-    if log_dir:
-        # create the dir if it doesnt exist already
-        tools.mkdirs(log_dir)
-        # only continue if the log_dir exists now
-        if not tools.item_exists(item = log_dir, item_type = 'dir'):
-            logger.warning('log_dir does not exist and will not be used for qsub job submission; {0}'.format(log_dir))
-        else:
-            # resolve the path to the full, expanded, absolute, real path - bad log_dir paths break job submissions easily
-            log_dir = os.path.realpath(os.path.expanduser(log_dir))
-            stdout_log_dir = log_dir
-            stderr_log_dir = log_dir
-            kwargs.update({
-                'stdout_log_dir': stdout_log_dir,
-                'stderr_log_dir': stderr_log_dir
-                })
-
-    proc_stdout = submit_job(return_stdout = True, verbose = verbose, *args, **kwargs)
-    job_id, job_name = get_job_ID_name(proc_stdout)
-    job = Job(id = job_id, name = job_name, log_dir = log_dir)
+    def __init__(self, poll_interval = None, user = None):
+        """
+        Parameters
+        ----------
+        poll_interval: int
+            the number of seconds to wait between queries; defaults to the module's `min_poll_interval`. This should be less than `qstat_max_age`, or else the cached results will expire between queries
+        user: str
+            the user to list the jobs for; defaults to the current user
+        """
+        threading.Thread.__init__(self)
+        # the thread should not keep the program running
+        self.daemon = True
+        self.poll_interval = poll_interval if poll_interval is not None else min_poll_interval
+        self.user = user
+        self._stop_event = threading.Event()
+
+    def run(self):
+        """
+        Queries `qstat` until `stop` is called
+        """
+        while not self._stop_event.is_set():
+            try:
+                cached_qstat(force = True, user = self.user)
+            except Exception:
+                logger.exception('Error while polling qstat')
+            self._stop_event.wait(self.poll_interval)
+
+    def stop(self):
+        """
+        Stops the thread after its current query
+        """
+        self._stop_event.set()
+
+    def get(self, job_id):
+        """
+        Gets a job's entry from the latest `qstat` result
+
+        Returns
+        -------
+        dict
+            the job's entry from `parse_qstat`, in the format `{'status': status, 'entries': [entry, ...]}`, or `None` if the job is not in `qstat`
+        """
+        return(_parsed_qstat(qstat_stdout = cached_qstat(user = self.user)).get(_base_job_id(job_id)))
+
+
+
+
+
+# ~~~~~~ JOB FUNCTIONS ~~~~~ #
+def qstat(xml = False, user = None):
+    """
+    Runs `qstat` and returns its stdout
+
+    Parameters
+    ----------
+    xml: bool
+        run `qstat -xml` for the current user, which gives structured output that can be parsed by `parse_qstat` without relying on the column layout of the plain text output
+    user: str
+        only list the jobs for this user; defaults to the current user for XML output
+
+    Returns
+    -------
+    str
+        the stdout from `qstat`; an empty string is returned if `qstat` is not available, e.g. when not running on the cluster
+    """
+    global _qstat_missing
+    command = ['qstat']
+    if xml:
+        command.extend(['-xml', '-u', user or current_user()])
+    elif user:
+        command.extend(['-u', user])
+    try:
+        # universal_newlines=True required for Python 2 3 compatibility with stdout parsing
+        process = sp.Popen(command, stdout = sp.PIPE, universal_newlines = True)
+    except OSError:
+        if not _qstat_missing:
+            _qstat_missing = True
+            logger.error("qstat could not be run, no jobs will be found")
+            print("WARNING: qstat could not be run, no jobs will be found")
+        return("")
+    proc_stdout = process.communicate()[0]
+    return(proc_stdout)
+
+def qstat_xml():
+    """
+    Gets the state of each of the current user's jobs from `qstat -xml`
+
+    Returns
+    -------
+    dict
+        a dictionary in the format `{job_id: status}`, e.g. `{'2495634': 'r'}`
+    """
+    return(dict((job_id, job['status']) for job_id, job in parse_qstat(qstat(xml = True)).items()))
+
+def _qstat_matches(qstat_stdout, job_id):
+    """
+    Generator function which yields the regex matches for the job's lines in the `qstat` output, in a single pass over the output. Bytes are searched as-is, e.g. from a file opened in binary mode
+    """
+    if isinstance(qstat_stdout, bytes) and not isinstance(qstat_stdout, str):
+        regex = _qstat_entry_regex_bytes
+        job_id = _base_job_id(job_id).encode()
+    else:
+        regex = _qstat_entry_regex
+        qstat_stdout = str(qstat_stdout)
+        job_id = _base_job_id(job_id)
+    for match in regex.finditer(qstat_stdout):
+        if match.group(1) == job_id:
+            yield(match)
+
+def lookup(qstat_stdout, job_id):
+    """
+    Finds the status of a job in the `qstat` output, e.g. "Eqw", "r", etc.; stops searching at the job's first line
+
+    Parameters
+    ----------
+    qstat_stdout: str
+        the stdout from `qstat`
+    job_id: int or str
+        the job ID
+
+    Returns
+    -------
+    str
+        the job's status, or `None` if the job is not in the output
+    """
+    for match in _qstat_matches(qstat_stdout = qstat_stdout, job_id = job_id):
+        status = match.group(2)
+        if not isinstance(status, str):
+            status = status.decode()
+        return(status)
+    return(None)
+
+def cached_qstat(max_age = None, force = False, user = None):
+    """
+    Gets the stdout from `qstat -xml`, reusing the result of the last query for the same user if it is recent enough. This prevents many `Job` objects from each querying `qstat` in quick succession
+
+    Parameters
+    ----------
+    max_age: int
+        the maximum age in seconds of a cached result that can be reused; defaults to the module's `qstat_max_age`
+    force: bool
+        always query `qstat`, and update the cache with the result
+    user: str
+        the user to list the jobs for; defaults to the current user
+
+    Returns
+    -------
+    str
+        the stdout from `qstat -xml`
+    """
+    return(_cached_qstat_query(max_age = max_age, force = force, user = user)[0])
+
+def _cached_qstat_query(max_age = None, force = False, user = None):
+    """
+    Gets the `_qstat_cache` entry for a `cached_qstat` query
+
+    Returns
+    -------
+    tuple
+        the stdout from `qstat -xml`, the `_monotonic` time it was queried at, and the number of the query
+    """
+    if max_age is None:
+        max_age = qstat_max_age
+    if not user:
+        user = current_user()
+    now = _monotonic()
+    cached = _qstat_cache.get(user)
+    if force or cached is None or now - cached[1] > max_age:
+        cached = (qstat(xml = True, user = user), now, next(_qstat_queries))
+        _qstat_cache[user] = cached
+    return(cached)
+
+def clear_qstat_cache(user = None):
+    """
+    Clears the cached `qstat` results, so that the next query will run `qstat` again; e.g. after submitting a new job
+
+    Parameters
+    ----------
+    user: str
+        only clear the result for this user; by default all results are cleared
+    """
+    if user:
+        _qstat_cache.pop(user, None)
+    else:
+        _qstat_cache.clear()
+    _parsed_qstat_cache['parsed'] = None
+
+def parse_qstat(qstat_stdout):
+    """
+    Parses the stdout from `qstat` into a dictionary of the jobs it lists
+
+    Parameters
+    ----------
+    qstat_stdout: str
+        the stdout from `qstat`, or from `qstat -xml`
+
+    Returns
+    -------
+    dict
+        a dictionary in the format `{job_id: {'status': status, 'entries': [entry, ...]}}`, where `status` is the job's state, e.g. 'r' or 'Eqw', and `entries` are the lines from the `qstat` output for the job, or its `<job_list>` elements for XML output; array jobs can have more than one entry
+
+    Examples
+    --------
+    Example usage::
+
+        >>> parse_qstat(qstat())
+        {'2495634': {'status': 'r', 'entries': ['2495634 0.50500 python     kellys04     r     08/14/2017 10:57:39 all.q@node005.cm.cluster           1        ']}}
+    """
+    if isinstance(qstat_stdout, bytes) and not isinstance(qstat_stdout, str):
+        qstat_stdout = qstat_stdout.decode()
+    qstat_stdout = str(qstat_stdout)
+    if qstat_stdout.lstrip().startswith('<'):
+        return(_parse_qstat_xml(qstat_stdout))
+    jobs = {}
+    for match in _qstat_entry_regex.finditer(qstat_stdout):
+        job = jobs.setdefault(match.group(1), {'status': match.group(2), 'entries': []})
+        job['entries'].append(match.group(0))
+    return(jobs)
+
+def _parse_qstat_xml(qstat_stdout):
+    """
+    Parses the stdout from `qstat -xml` in the same format as `parse_qstat`. The XML is parsed incrementally, and each `<job_list>` element is cleared once it has been read, so the whole element tree is not kept in memory for a large queue
+    """
+    jobs = {}
+    if not isinstance(qstat_stdout, bytes):
+        qstat_stdout = qstat_stdout.encode('utf-8')
+    try:
+        for event, job_list in ET.iterparse(io.BytesIO(qstat_stdout), events = ('end',)):
+            if job_list.tag != 'job_list':
+                continue
+            job_id = job_list.findtext('JB_job_number', '').strip()
+            if job_id:
+                job = jobs.setdefault(job_id, {'status': job_list.findtext('state', '').strip(), 'entries': []})
+                job['entries'].append(ET.tostring(job_list).decode())
+            job_list.clear()
+    except ET.ParseError:
+        logger.error("Could not parse the qstat XML output")
+        return({})
+    return(jobs)
+
+def _parsed_qstat(qstat_stdout):
+    """
+    Returns the `parse_qstat` result for the stdout, reusing the last result if the same stdout is parsed again; e.g. when many jobs are updated from one query by `refresh_all`
+    """
+    parsed = _parsed_qstat_cache['parsed']
+    if parsed is not None and parsed[0] is qstat_stdout:
+        return(parsed[1])
+    entries = parse_qstat(qstat_stdout = qstat_stdout)
+    _parsed_qstat_cache['parsed'] = (qstat_stdout, entries)
+    return(entries)
+
+def wait_until_listed(job_ids, tries = None, interval = None):
+    """
+    Waits for newly submitted jobs to be listed in `qstat`, so that they are not mistaken for jobs that have already finished when they are first checked. This replaces a fixed sleep after each submission; the jobs are usually listed by the first query, and a batch of jobs only needs to be checked once
+
+    Parameters
+    ----------
+    job_ids: list
+        the ID's of the submitted jobs
+    tries: int
+        the maximum number of `qstat` queries; defaults to the module's `listed_tries`
+    interval: float
+        the number of seconds to wait between queries; defaults to the module's `listed_interval`
+
+    Returns
+    -------
+    bool
+        whether all of the jobs were listed. Jobs that finish very quickly might never be listed, so the jobs should still be checked afterwards
+
+    Notes
+    -----
+    The last `qstat` result is cached, so the jobs can be checked against it with `refresh_all` without another query
+    """
+    if tries is None:
+        tries = listed_tries
+    if interval is None:
+        interval = listed_interval
+    missing = set(_base_job_id(job_id) for job_id in job_ids if job_id)
+    for i in range(tries):
+        if not missing or _qstat_missing:
+            break
+        if i:
+            sleep(interval)
+        missing.difference_update(_parsed_qstat(cached_qstat(force = True)))
+    if missing:
+        logger.debug('Jobs not listed in qstat after submission: %s', sorted(missing))
+    return(not missing)
+
+def refresh_all(jobs, force = True):
+    """
+    Updates the status attributes of all the jobs from a single `qstat` query, instead of querying `qstat` separately for each job
+
+    Parameters
+    ----------
+    jobs: list
+        a list of `Job` objects
+    force: bool
+        query `qstat` again instead of using a recent cached result
+
+    Returns
+    -------
+    list
+        the same list of `Job` objects, with updated status attributes
+
+    Examples
+    --------
+    Example usage::
+
+        jobs = [qsub.Job('2379768'), qsub.Job('2379769')]
+        qsub.refresh_all(jobs)
+        [job.is_present for job in jobs]
+    """
+    for job in jobs:
+        job._update(force = force)
+        # the other jobs share the new query
+        force = False
+    return(jobs)
+
+def submit(verbose = False, log_dir = None, monitor = False, validate = False, sync = False, *args, **kwargs):
+    """
+    Submits a shell command to be run as a `qsub` compute job. Returns a `Job` object. Passes args and kwargs to `submit_job`. Compute jobs are created by assembling a `qsub` shell command using a bash heredoc wrapped around the provided shell command to be executed. The numeric job ID and job name echoed by `qsub` on stdout will be captured and used to generate a 'Job' object.
+
+    Parameters
+    ----------
+    verbose: bool
+        `True` or `False`, whether or not the generated `qsub` command should be printed in log output
+    log_dir: str
+        the directory to use for qsub job log output files, defaults to the current working directory
+    monitor: bool
+        whether the job should be immediately monitored until completion
+    validate: bool
+        whether or not the job should immediately be validated upon completion
+    sync: bool
+        submit the job with `qsub -sync y`, which waits for the job to finish and reports its exit status; the job does not need to be monitored, and is validated from the reported exit status instead of with `qacct`
+    *args: list
+        list of arguments to pass on to `submit_job`
+    **kwargs: dict
+        dictionary of args to pass on to `submit_job`
+
+    Returns
+    -------
+    Job
+        a `Job` object, representing a `qsub` compute job that has been submitted to the HPC cluster
+
+    Examples
+    --------
+    Example usage::
+
+        job = submit(command = 'echo foo')
+        job = submit(command = 'echo foo', log_dir = "logs", print_verbose = True, monitor = True, validate = True)
+        job = submit(command = 'echo foo', sync = True, validate = True)
+
+    """
+    log_dir = _setup_log_dir(log_dir = log_dir, kwargs = kwargs)
+
+    proc_stdout = submit_job(return_stdout = True, verbose = verbose, sync = sync, *args, **kwargs)
+    # qstat results from after this time will list the job until it finishes
+    submitted = _monotonic()
+    job_id, job_name = get_job_ID_name(proc_stdout)
+    done_flag = None
+    if kwargs.get('done_flag', True):
+        done_flag = get_done_flag(log_dir = kwargs.get('stdout_log_dir') or os.getcwd(), name = job_name, id = job_id)
+
+    if sync:
+        # the job has already finished, so qstat does not need to be checked
+        job = Job(id = job_id, name = job_name, log_dir = log_dir, debug = True, done_flag = done_flag)
+        job.exit_status = get_sync_exit_status(proc_stdout)
+        job._set_terminal()
+        if validate:
+            job.validate_completion()
+        return(job)
+
+    wait_until_listed([job_id])
+    job = Job(id = job_id, name = job_name, log_dir = log_dir, done_flag = done_flag, since = submitted)
 
     # optionally, monitor the job to completion
     if monitor:
@@ -664,23 +1493,298 @@ def submit(verbose = False, log_dir = None, monitor = False, validate = False, *
     return(job)
 
 
-def subprocess_cmd(command, return_stdout = False):
+def submit_array(commands, verbose = False, log_dir = None, monitor = False, validate = False, params = '-j y', *args, **kwargs):
+    """
+    Submits a list of shell commands to be run as a single `qsub` array job, with one array task per command. This only needs one `qsub` submission, instead of one per command with `submit`. Passes args and kwargs to `submit_job`
+
+    Parameters
+    ----------
+    commands: list
+        a list of shell commands; each command is run by its own array task
+    verbose: bool
+        `True` or `False`, whether or not the generated `qsub` command should be printed in log output
+    log_dir: str
+        the directory to use for qsub job log output files, defaults to the current working directory
+    monitor: bool
+        whether the jobs should be immediately monitored until completion
+    validate: bool
+        whether or not the jobs should immediately be validated upon completion
+    params: str
+        extra params to be passed to `qsub`; the `-t` param for the array tasks is added to these
+
+    Returns
+    -------
+    list
+        a list of `Job` objects, one for each command, in the same order as the commands. The jobs all have the same `id`, and their `task_id` attributes are the array task ID's
+
+    Examples
+    --------
+    Example usage::
+
+        jobs = submit_array(commands = ['echo foo', 'echo bar'], log_dir = "logs", monitor = True)
+
+    """
+    if not commands:
+        logger.error('No commands to submit')
+        return([])
+    log_dir = _setup_log_dir(log_dir = log_dir, kwargs = kwargs)
+    # each task runs the command matching its task ID
+    task_commands = ''.join('{0})\n{1}\n;;\n'.format(i, command) for i, command in enumerate(commands, 1))
+    command = 'case "$SGE_TASK_ID" in\n{0}esac'.format(task_commands)
+    params = '{0} -t 1-{1}'.format(params, len(commands))
+    # the tasks need their own done flags, since they all share the same $JOB_ID
+    use_done_flag = kwargs.pop('done_flag', True)
+    stdout_log_dir = kwargs.get('stdout_log_dir') or os.getcwd()
+    name = kwargs.get('name', 'python')
+    if use_done_flag:
+        kwargs['pre_commands'] = '{0}\n{1}'.format(done_flag_trap(get_done_flag(log_dir = stdout_log_dir, name = name, id = '$JOB_ID.$SGE_TASK_ID')), kwargs.get('pre_commands', 'set -x'))
+
+    proc_stdout = submit_job(command = command, params = params, return_stdout = True, verbose = verbose, done_flag = False, *args, **kwargs)
+    submitted = _monotonic()
+    job_id, job_name = get_job_ID_name(proc_stdout)
+    job_id = _base_job_id(job_id)
+    jobs = []
+    for task_id in range(1, len(commands) + 1):
+        done_flag = None
+        if use_done_flag:
+            done_flag = get_done_flag(log_dir = stdout_log_dir, name = job_name, id = '{0}.{1}'.format(job_id, task_id))
+        jobs.append(Job(id = job_id, name = job_name, log_dir = log_dir, done_flag = done_flag, task_id = task_id, debug = True, since = submitted))
+    # all of the tasks have the same qstat entry, so they only need one query
+    wait_until_listed([job_id])
+    refresh_all(jobs, force = False)
+
+    # optionally, monitor the jobs to completion
+    if monitor:
+        # monitor_jobs depletes the list that it is given
+        monitor_jobs(jobs = list(jobs), **kwargs)
+    # optionally, validate the job completions
+    if validate:
+        _validate_jobs(jobs)
+    return(jobs)
+
+def _setup_log_dir(log_dir, kwargs):
+    """
+    Creates the `log_dir` for `submit` and `submit_array`, and adds it to the kwargs for `submit_job` as the `stdout_log_dir` and `stderr_log_dir`
+
+    Returns
+    -------
+    str
+        the full path to the `log_dir`
+    """
+    # check if log_dir was passed
+    if log_dir:
+        # create the dir if it doesnt exist already
+        tools.mkdirs(log_dir)
+        # only continue if the log_dir exists now
+        if not tools.item_exists(item = log_dir, item_type = 'dir'):
+            logger.warning('log_dir does not exist and will not be used for qsub job submission; %s', log_dir)
+        else:
+            # resolve the path to the full, expanded, absolute, real path - bad log_dir paths break job submissions easily
+            log_dir = os.path.realpath(os.path.expanduser(log_dir))
+            stdout_log_dir = log_dir
+            stderr_log_dir = log_dir
+            kwargs.update({
+                'stdout_log_dir': stdout_log_dir,
+                'stderr_log_dir': stderr_log_dir
+                })
+    return(log_dir)
+
+def subprocess_cmd(command, return_stdout = False, input = None, env = None):
     """
     Runs a terminal command with stdout piping enabled
 
+    Parameters
+    ----------
+    command: str or list
+        a list of args, which is run directly without a shell, or a string which is run with a shell
+    return_stdout: bool
+        return the command's stdout instead of logging it
+    input: str
+        text to write to the command's stdin
+    env: dict
+        environment variables for the command
+
+    Returns
+    -------
+    str
+        the command's stdout, if `return_stdout` is `True`
+
     Notes
     -----
     `universal_newlines=True` required for Python 2 3 compatibility with stdout parsing
 
     """
-    process = sp.Popen(command,stdout=sp.PIPE, shell=True, universal_newlines=True)
-    proc_stdout = process.communicate()[0].strip()
+    shell = not isinstance(command, (list, tuple))
+    stdin = None
+    if input is not None:
+        stdin = sp.PIPE
+    process = sp.Popen(command, stdin = stdin, stdout = sp.PIPE, shell = shell, env = env, close_fds = True, universal_newlines = True)
+    proc_stdout = process.communicate(input)[0].strip()
     if return_stdout == True:
         return(proc_stdout)
     elif return_stdout == False:
         logger.debug(proc_stdout)
 
 
+def qsub_cmd(args, script):
+    """
+    Runs a `qsub` command, passing the job script to it on stdin
+
+    Parameters
+    ----------
+    args: list
+        the `qsub` command and its arguments
+    script: str
+        the shell commands to be run inside the compute job
+
+    Returns
+    -------
+    str
+        the stdout from `qsub`; an empty string if `qsub` could not be run
+    """
+    try:
+        return(subprocess_cmd(command = args, return_stdout = True, input = script))
+    except OSError:
+        logger.error('qsub could not be run; %s', args[0])
+        return('')
+
+def get_sync_exit_status(proc_stdout):
+    """
+    Parses the stdout from a job submitted with `qsub -sync y` to find the job's exit status
+
+    Returns
+    -------
+    int
+        the exit status, or `None` if it was not reported, e.g. if the job was killed
+
+    Examples
+    --------
+    Example usage::
+
+        >>> get_sync_exit_status('Your job 1245023 ("python") has been submitted\nJob 1245023 exited with exit code 0.')
+        0
+    """
+    match = _sync_exit_regex.search(str(proc_stdout))
+    if match:
+        return(int(match.group(1)))
+    return(None)
+
+def get_done_flag(log_dir, name, id):
+    """
+    Gets the path to the file that a compute job submitted with `submit_job` creates when it exits
+
+    Parameters
+    ----------
+    log_dir: str
+        the job's stdout log directory
+    name: str
+        the name of the job
+    id: int or str
+        the job's ID; use '$JOB_ID' to get the path from inside the job itself
+
+    Returns
+    -------
+    str
+        the path to the file
+    """
+    return(os.path.join(log_dir, '.{0}.{1}.done'.format(name, id)))
+
+def done_flag_trap(done_flag):
+    """
+    Gets the shell command that makes a compute job write its exit status to its `done_flag` file when it exits
+
+    Parameters
+    ----------
+    done_flag: str
+        the path to the file, from `get_done_flag`; variables such as '$JOB_ID' are expanded inside the job
+
+    Returns
+    -------
+    str
+        a bash ``trap`` command, preceded by a command that removes any file left at the same path by a previous job with the same name and ID; job ID's wrap around, so an old file would make the new job look finished
+    """
+    return("""rm -f "{0}"\ntrap 'echo $? > "{0}"' EXIT""".format(done_flag))
+
+def done_flag_exists(done_flag, min_time = None):
+    """
+    Checks if a compute job has created its `done_flag` file
+
+    Parameters
+    ----------
+    done_flag: str
+        the path to the file, from `get_done_flag`
+    min_time: float
+        ignore a file that was last modified before this time, e.g. the `Job.submit_time`, allowing for `done_flag_tolerance`; an older file was left by a previous job with the same ID
+
+    Returns
+    -------
+    bool
+    """
+    if not done_flag:
+        return(False)
+    try:
+        return(_done_flag_current(os.stat(done_flag), min_time = min_time))
+    except OSError:
+        return(False)
+
+def _done_flag_current(stat, min_time = None):
+    """
+    Checks that a `done_flag` file was not left by a previous job, from the result of `os.stat` for the file
+    """
+    return(min_time is None or stat.st_mtime >= min_time - done_flag_tolerance)
+
+def remove_done_flag(done_flag):
+    """
+    Removes a compute job's `done_flag` file once its exit status is no longer needed, so that it can not be mistaken for the flag of a later job with the same name and ID
+    """
+    if not done_flag:
+        return
+    try:
+        os.remove(done_flag)
+    except OSError:
+        pass
+
+def read_done_flag(done_flag, min_time = None):
+    """
+    Reads the exit status that a compute job wrote to its `done_flag` file when it exited
+
+    Parameters
+    ----------
+    done_flag: str
+        the path to the file, from `get_done_flag`
+    min_time: float
+        ignore a file that was last modified before this time; see `done_flag_exists`
+
+    Returns
+    -------
+    int
+        the job's exit status, or `None` if the file does not exist or does not contain an exit status, in which case `qacct` has to be checked instead
+
+    Notes
+    -----
+    The file will not have an exit status if the job was killed before its ``trap`` could run, or if it is still being written
+    """
+    if not done_flag:
+        return(None)
+    try:
+        with open(done_flag) as f:
+            if not _done_flag_current(os.fstat(f.fileno()), min_time = min_time):
+                return(None)
+            return(int(f.read().strip()))
+    except (IOError, OSError, ValueError):
+        return(None)
+
+def _base_job_id(job_id):
+    """
+    Gets the ID that a job is listed under in `qstat`. Array job ID's are given by `qsub` in the format '1245023.1-3:1', and a single task can be written as '1245023.7', but `qstat` lists all of the tasks under '1245023'
+
+    Returns
+    -------
+    str
+        the job ID, without any array task ID's
+    """
+    return(str(job_id).split('.', 1)[0])
+
 def get_job_ID_name(proc_stdout):
     """
     Parses stdout text to find lines that match the output message from a `qsub` job submission
@@ -698,15 +1802,14 @@ def get_job_ID_name(proc_stdout):
         job_id, job_name = get_job_ID_name(proc_stdout)
 
     """
-    proc_stdout_list = proc_stdout.split()
+    # only the first four words are needed
+    proc_stdout_list = proc_stdout.split(None, 4)
     job_id = proc_stdout_list[2]
-    job_name = proc_stdout_list[3]
-    job_name = re.sub(r'^\("', '', str(job_name))
-    job_name = re.sub(r'"\)$', '', str(job_name))
+    job_name = proc_stdout_list[3].strip('()"')
     return((job_id, job_name))
 
 
-def submit_job(command = 'echo foo', params = '-j y', queue_arg = '-q all.q', name = "python", stdout_log_dir = None, stderr_log_dir = None, return_stdout = False, verbose = False, pre_commands = 'set -x', post_commands = 'set +x', sleeps = 0.5, print_verbose = False, **kwargs):
+def submit_job(command = 'echo foo', params = '-j y', queue_arg = '-q all.q', name = "python", stdout_log_dir = None, stderr_log_dir = None, return_stdout = False, verbose = False, pre_commands = 'set -x', post_commands = 'set +x', sleeps = None, print_verbose = False, done_flag = True, sync = False, **kwargs):
     """
     Internal function for submitting compute jobs to the HPC cluster running SGE by using the `qsub` shell command. Call this function with `submit` instead; args and kwargs will be evaluated here. Creates a `qsub` shell command to be run in a subprocess, submitting the cluster job with a bash heredoc wrapper.
     Basic format for job submission to the SGE cluster with qsub
@@ -735,9 +1838,13 @@ def submit_job(command = 'echo foo', params = '-j y', queue_arg = '-q all.q', na
     post_commands: str
         commands to run after the `command` inside the qsub job; defaults to 'set +x'
     sleeps: int
-        number of seconds to `sleep` after submitting a `qsub` job; it is recommened to leave this set to a value >0 in order to avoid overwhelming the job scheduler with requests
+        number of seconds to `sleep` after submitting a `qsub` job; defaults to the module's `submit_delay`. Set this to a value >0 when submitting many jobs in a loop, in order to avoid overwhelming the job scheduler with requests
     print_verbose: bool
         print the generated `qsub` command to the console with the Python `print` function (as opposed to logger output)
+    done_flag: bool
+        whether the job should write its exit status to a file in the `stdout_log_dir` when it exits, which is used to check if the job has finished without querying `qstat`, and if it succeeded without querying `qacct`; see `get_done_flag`
+    sync: bool
+        add `-sync y` to the `qsub` params, so that `qsub` waits for the job to finish before returning; its stdout will include the job's exit status, see `get_sync_exit_status`
 
     Returns
     -------
@@ -752,9 +1859,9 @@ def submit_job(command = 'echo foo', params = '-j y', queue_arg = '-q all.q', na
 
     Call this function with `submit` instead.
 
-    This function generates a `qsub` shell command in a format such as this::
+    This function generates a `qsub` command and job script equivalent to this::
 
-        qsub -j y -N "python" -o :"/ifs/data/molecpathlab/scripts/snsxt/snsxt/util/" -e :"/ifs/data/molecpathlab/scripts/snsxt/snsxt/util/" <<E0F
+        qsub -j y -N python -o :/ifs/data/molecpathlab/scripts/snsxt/snsxt/util/ -e :/ifs/data/molecpathlab/scripts/snsxt/snsxt/util/ -q all.q <<'E0F'
         set -x
 
             cat /etc/hosts
@@ -763,47 +1870,167 @@ def submit_job(command = 'echo foo', params = '-j y', queue_arg = '-q all.q', na
         set +x
         E0F
 
-    The generated shell command will be evaluated by Python `subprocess`, and its stdout messages returned.
-
-    """
-    if not stdout_log_dir:
-        stdout_log_dir = os.path.join(os.getcwd(), '')
-    if not stderr_log_dir:
-        stderr_log_dir = os.path.join(os.getcwd(), '')
-    qsub_command = """
-qsub {0} -N "{1}" -o :"{2}" -e :"{3}" {7} <<E0F
-{4}
-{5}
-{6}
-E0F
-""".format(
-params,  # 0
-name, # 1
-stdout_log_dir, # 2
-stderr_log_dir, # 3
-pre_commands, # 4
-command, # 5
-post_commands, # 6
-queue_arg #7
-)
-    if verbose == True:
-        logger.debug('qsub command is:\n{0}'.format(qsub_command))
-
-    if print_verbose:
-        print('qsub command is:\n{0}'.format(qsub_command))
+    The `qsub` command is run directly by Python `subprocess` without a shell, with the job script passed to it on stdin, and its stdout messages returned. Since no shell reads the job script before it is submitted, variables and backslashes in the `command` are evaluated when the job runs, the same as with a quoted heredoc.
+
+    """
+    qsub_args, job_script = _qsub_args_script(command = command, params = params, queue_arg = queue_arg, name = name, stdout_log_dir = stdout_log_dir, stderr_log_dir = stderr_log_dir, pre_commands = pre_commands, post_commands = post_commands, done_flag = done_flag, sync = sync)
+    if verbose == True or print_verbose:
+        qsub_command = _qsub_heredoc(qsub_args = qsub_args, job_script = job_script)
+        if verbose == True:
+            logger.debug('qsub command is:\n%s', qsub_command)
+        if print_verbose:
+            print('qsub command is:\n{0}'.format(qsub_command))
+
+    # submit the job
+    proc_stdout = qsub_cmd(args = qsub_args, script = job_script)
+    _submitted_jobs.update(_base_job_id(job_id) for job_id, job_name in find_all_job_id_names(proc_stdout))
+    # the new job will not be in any cached qstat result
+    clear_qstat_cache()
+
+    # sleep after submitting the job
+    if sleeps is None:
+        sleeps = submit_delay
+    if sleeps:
+        sleep(sleeps)
+    if return_stdout == True:
+        return(proc_stdout)
+    elif return_stdout == False:
+        logger.debug(proc_stdout)
+
+def _qsub_args_script(command = 'echo foo', params = '-j y', queue_arg = '-q all.q', name = "python", stdout_log_dir = None, stderr_log_dir = None, pre_commands = 'set -x', post_commands = 'set +x', done_flag = True, sync = False, **kwargs):
+    """
+    Builds the `qsub` command and the job script for `submit_job` and `submit_many`; see `submit_job` for the args
+
+    Returns
+    -------
+    tuple
+        `(qsub_args, job_script)`, where `qsub_args` is a list of the `qsub` command and its arguments, and `job_script` is the shell commands to pass to it on stdin
+    """
+    # the log dirs default to the current directory, with a trailing slash
+    if not stdout_log_dir or not stderr_log_dir:
+        cwd = os.getcwd() + os.sep
+        stdout_log_dir = stdout_log_dir or cwd
+        stderr_log_dir = stderr_log_dir or cwd
+    if sync:
+        params = '{0} -sync y'.format(params)
+    if done_flag:
+        # write the flag file when the job exits; $JOB_ID is expanded inside the job
+        pre_commands = '{0}\n{1}'.format(done_flag_trap(get_done_flag(log_dir = stdout_log_dir, name = name, id = '$JOB_ID')), pre_commands)
+    qsub_args = ['qsub'] + shlex.split(params) + ['-N', name, '-o', ':' + stdout_log_dir, '-e', ':' + stderr_log_dir] + shlex.split(queue_arg)
+    job_script = '\n'.join([pre_commands, command, post_commands, ''])
+    return((qsub_args, job_script))
+
+def _qsub_heredoc(qsub_args, job_script):
+    """
+    Formats a `qsub` command and its job script as a shell command, with the job script in a quoted heredoc so that it is not evaluated until the job runs
+    """
+    return("""
+{0} <<'E0F'
+{1}E0F
+""".format(tools.shell_join(qsub_args), job_script))
+
+def submit_many(specs, log_dir = None, verbose = False, sleeps = None):
+    """
+    Submits many jobs, then waits for all of them to be listed in `qstat` at once, instead of checking `qstat` after each submission
+
+    Parameters
+    ----------
+    specs: list
+        a list of dicts of the args for `submit_job` for each job, e.g. `{'command': 'echo foo', 'name': 'foo'}`
+    log_dir: str
+        the directory to use for the jobs' log output files, for the jobs that do not have a `stdout_log_dir` in their spec; defaults to the current working directory
+    verbose: bool
+        `True` or `False`, whether or not each `qsub` command should be printed in log output
+    sleeps: int
+        the number of seconds to sleep after submitting all of the jobs; defaults to the module's `submit_delay`. The jobs are not returned until they are listed in `qstat` (see `wait_until_listed`), so this is not usually needed
+
+    Returns
+    -------
+    list
+        a list of `Job` objects for the jobs that were submitted, in the same order as the specs. A spec that has `-t` in its `params` is submitted as an array job, and is tracked by a single `Job` without a `done_flag`, since all of its tasks have the same `$JOB_ID`; use `submit_array` to track the tasks separately
+
+    Notes
+    -----
+    Each job script is passed to its own `qsub` command on stdin by `submit_job`, and each job is found from the output of its own `qsub` command, so jobs with the same name can not be mixed up
+
+    Examples
+    --------
+    Example usage::
 
-    # submit the job
-    proc_stdout = subprocess_cmd(command = qsub_command, return_stdout = True)
+        jobs = submit_many([{'command': 'echo foo', 'name': 'foo'}, {'command': 'echo bar', 'name': 'bar'}], log_dir = "logs")
+        monitor_jobs(jobs = list(jobs))
 
-    # sleep after submitting the job
+    """
+    if not specs:
+        logger.error('No jobs to submit')
+        return([])
+    log_dir_kwargs = {}
+    _setup_log_dir(log_dir = log_dir, kwargs = log_dir_kwargs)
+    jobs = []
+    for spec in specs:
+        spec = dict(spec)
+        spec.setdefault('name', 'python')
+        spec.setdefault('verbose', verbose)
+        for key, value in log_dir_kwargs.items():
+            spec.setdefault(key, value)
+        # 'qsub -sync y' would wait for each job to finish before submitting the next one
+        spec.pop('sync', None)
+        # the tasks of an array job would all write the same done flag
+        if '-t' in shlex.split(spec.get('params', '-j y')):
+            spec['done_flag'] = False
+        spec.update({'return_stdout': True, 'sleeps': 0})
+        proc_stdout = submit_job(**spec)
+        submitted = _monotonic()
+        messages = list(find_all_job_id_names(proc_stdout))
+        if not messages:
+            logger.error('qsub job was not submitted: %s', spec['name'])
+            continue
+        job_id, job_name = messages[0]
+        job_id = _base_job_id(job_id)
+        done_flag = None
+        if spec.get('done_flag', True):
+            done_flag = get_done_flag(log_dir = spec.get('stdout_log_dir') or os.getcwd(), name = job_name, id = job_id)
+        jobs.append(Job(id = job_id, name = job_name, log_dir = spec.get('stdout_log_dir'), done_flag = done_flag, debug = True, since = submitted))
+    # all of the jobs can be checked with the query that found them
+    wait_until_listed([job.id for job in jobs])
+    refresh_all(jobs, force = False)
+    if sleeps is None:
+        sleeps = submit_delay
     if sleeps:
         sleep(sleeps)
-    if return_stdout == True:
-        return(proc_stdout)
-    elif return_stdout == False:
-        logger.debug(proc_stdout)
+    return(jobs)
+
+def _poll_interval(jobs, finished = False, poll_interval_min = None, poll_interval_max = None):
+    """
+    Gets the number of seconds to wait before checking a group of jobs again, used by `monitor_jobs` and `JobMonitorService`
+
+    Parameters
+    ----------
+    jobs: list
+        the `Job` objects that are still being monitored
+    finished: bool
+        whether some of the jobs finished in the last check; the other jobs might be about to finish too, so they are checked again as soon as possible
+    poll_interval_min: int
+        the minimum number of seconds to wait; defaults to the module's `min_poll_interval`
+    poll_interval_max: int
+        the maximum number of seconds to wait; defaults to the module's `max_poll_interval`
 
-def monitor_jobs(jobs = None, kill_err = True, print_verbose = False, **kwargs):
+    Returns
+    -------
+    int
+        the interval; otherwise it is the `Job.next_poll` interval of the newest job, which backs off as the job gets older
+    """
+    if poll_interval_min is None:
+        poll_interval_min = min_poll_interval
+    if poll_interval_max is None:
+        poll_interval_max = max_poll_interval
+    if finished or not jobs:
+        return(poll_interval_min)
+    # the newest job has the shortest interval
+    interval = max(jobs, key = lambda job: job.submit_time).next_poll()
+    return(max(poll_interval_min, min(poll_interval_max, interval)))
+
+def monitor_jobs(jobs = None, kill_err = True, print_verbose = False, poll_interval_min = None, poll_interval_max = None, use_service = False, **kwargs):
     """
     Monitors a list of qsub `Job` objects for completion. Job monitoring is accomplished by calling each job's `present()` and `error()` methods, then waiting for several seconds. Jobs that are no longer present in `qstat` or have an error state will be removed from the monitoring queue. The function will repeatedly check each job and then wait, removing absent or errored jobs, until no jobs remain in the monitoring queue. Optionally, jobs that had an error status will be killed with the `qdel` command, or else they will remain in `qstat` indefinitely.
 
@@ -817,6 +2044,12 @@ def monitor_jobs(jobs = None, kill_err = True, print_verbose = False, **kwargs):
         `True` or `False`, whether or not jobs left in error state should be automatically killed. Its recommened to leave this `True`
     print_verbose: bool
         whether or not descriptions of the steps being taken should be printed to the console with Python's `print` function
+    poll_interval_min: int
+        the minimum number of seconds to wait between checks; defaults to the module's `min_poll_interval`
+    poll_interval_max: int
+        the maximum number of seconds to wait between checks; defaults to the module's `max_poll_interval`
+    use_service: bool
+        whether the jobs should be checked by the background thread from `get_monitor_service` instead of by this function; use this when several threads are monitoring jobs at the same time, so that they all share one `qstat` polling loop. The poll intervals are then set by the service instead
 
     Returns
     -------
@@ -827,6 +2060,10 @@ def monitor_jobs(jobs = None, kill_err = True, print_verbose = False, **kwargs):
     -----
     This function will only check whether a job is present/absent in the `qstat` queue, or in an error state in the `qstat` queue; it does not actually check if a job is in a 'Running' state.
 
+    All of the jobs are checked against a single `qstat` query on each pass, which is passed to each job's `refresh()` method.
+
+    The wait between passes backs off as the jobs get older (see `Job.next_poll`), within the `poll_interval_min` and `poll_interval_max` limits; it is reset to `poll_interval_min` whenever a pass finds that some jobs have finished.
+
     If a job is present and not in error state, it is assumed to either be 'qw' (waiting to run), or 'r' (running). In both cases, it is assumed that the job will eventually finish and leave the `qstat` queue, and subsequently be removed from this function's monitoring queue.
 
     Jobs in 'Eqw' error state are stuck and will not leave on their own so must be removed automatically by this function, or killed manually by the end user.
@@ -866,42 +2103,180 @@ def monitor_jobs(jobs = None, kill_err = True, print_verbose = False, **kwargs):
         logger.error('"jobs" passed is not a list')
         return()
 
+    if poll_interval_min is None:
+        poll_interval_min = min_poll_interval
+    if poll_interval_max is None:
+        poll_interval_max = max_poll_interval
+
+    def _say(level, msg, *args):
+        """
+        Logs a message, and also prints it to the console if `print_verbose`; the message is formatted at most once, and only if it will be printed or is passed to a log handler
+        """
+        if print_verbose:
+            if args:
+                msg = msg % args
+                args = ()
+            print(msg)
+        logger.log(level, msg, *args)
+
     completed_jobs = []
     # jobs in error state; won't finish
     err_jobs = []
     num_jobs = len(jobs)
-    logger.debug('Monitoring jobs for completion. Number of jobs in queue: {0}'.format(num_jobs))
-    if print_verbose: print('Monitoring jobs for completion. Number of jobs in queue: {0}'.format(num_jobs))
-    while num_jobs > 0:
+    _say(logging.DEBUG, 'Monitoring jobs for completion. Number of jobs in queue: %s', num_jobs)
+    if use_service:
+        service = get_monitor_service()
+        # subscribe all of the jobs first, so they are all checked in the service's next pass
+        events = [(job, service.subscribe(job)) for job in jobs]
+        for job, event in events:
+            event.wait()
+            if service.pop_state(job) == 'error':
+                err_jobs.append(job)
+            else:
+                completed_jobs.append(job)
+            jobs.remove(job)
+            if jobs:
+                _say(logging.DEBUG, "Number of jobs in queue: %s", len(jobs))
+    while jobs:
         # check number of jobs in the list
         if num_jobs != len(jobs):
             num_jobs = len(jobs)
-            logger.debug("Number of jobs in queue: {0}".format(num_jobs))
-            if print_verbose: print("Number of jobs in queue: {0}".format(num_jobs))
-        # check each job for presence & error state
-        for i, job in enumerate(jobs):
-            if not job.present():
-                completed_jobs.append(jobs.pop(i)) # jobs.remove(job)
-            if job.error():
-                err_jobs.append(jobs.pop(i))
-        sleep(5)
-    logger.debug('No jobs remaining in the job queue')
-    if print_verbose: print('No jobs remaining in the job queue')
+            _say(logging.DEBUG, "Number of jobs in queue: %s", num_jobs)
+        # jobs that have created their done flag have exited and do not need to be checked in qstat
+        pending_jobs = []
+        for job in jobs:
+            if job.done():
+                job._set_terminal()
+                completed_jobs.append(job)
+            else:
+                pending_jobs.append(job)
+        # check all remaining jobs for presence & error state against one qstat query
+        remaining_jobs = []
+        if pending_jobs:
+            qstat_stdout = cached_qstat(force = True)
+            for job in pending_jobs:
+                job.refresh(qstat_stdout = qstat_stdout)
+                if not job.is_present:
+                    completed_jobs.append(job)
+                elif job.is_error:
+                    err_jobs.append(job)
+                else:
+                    remaining_jobs.append(job)
+        # update the list in place, in a single pass; the caller's list is depleted as jobs finish
+        jobs[:] = remaining_jobs
+        if jobs:
+            sleep(_poll_interval(jobs = jobs, finished = len(jobs) != num_jobs, poll_interval_min = poll_interval_min, poll_interval_max = poll_interval_max))
+    _say(logging.DEBUG, 'No jobs remaining in the job queue')
 
     # check if there were any jobs left in error state
     if err_jobs:
-        logger.error('{0} jobs left were left in error state. Jobs: {1}'.format(len(err_jobs), [job.id for job in err_jobs]))
-        if print_verbose: print('{0} jobs left were left in error state. Jobs: {1}'.format(len(err_jobs), [job.id for job in err_jobs]))
+        err_job_ids = [job.id for job in err_jobs]
+        _say(logging.ERROR, '%s jobs left were left in error state. Jobs: %s', len(err_job_ids), err_job_ids)
         # kill the error jobs with the 'qdel' command
         if kill_err:
-            logger.debug('Killing jobs left in error state')
-            if print_verbose: print('Killing jobs left in error state')
-            qdel_command = 'qdel {0}'.format(' '.join([job.id for job in err_jobs]))
-            cmd = tools.SubprocessCmd(command = qdel_command).run()
-            logger.debug(cmd.proc_stdout)
-            if print_verbose: print(cmd.proc_stdout)
+            _say(logging.DEBUG, 'Killing jobs left in error state')
+            for cmd in qdel(err_job_ids):
+                if print_verbose: print(cmd.proc_stdout)
     return((completed_jobs, err_jobs))
 
+def monitor_jobs_async(jobs = None, **kwargs):
+    """
+    Runs `monitor_jobs` in a background thread, so that the program can continue while the jobs are running. All of the jobs are monitored by the same thread. Passes kwargs to `monitor_jobs`
+
+    Parameters
+    ----------
+    jobs: list
+        a list of `Job` objects
+
+    Returns
+    -------
+    multiprocessing.pool.AsyncResult
+        the pending result of `monitor_jobs`; call its `get()` method to wait for the jobs to finish and retrieve the `(completed_jobs, err_jobs)` tuple, or `ready()` to check if they are finished without waiting
+
+    Examples
+    --------
+    Example usage::
+
+        jobs = [submit(command = 'sleep 20') for i in range(5)]
+        result = monitor_jobs_async(jobs = jobs)
+        # do other things here...
+        completed_jobs, err_jobs = result.get()
+
+    """
+    kwargs['jobs'] = jobs
+    pool = ThreadPool(processes = 1)
+    result = pool.apply_async(monitor_jobs, kwds = kwargs)
+    # the thread will exit after monitor_jobs has finished
+    pool.close()
+    return(result)
+
+def start_qstat_poller(poll_interval = None):
+    """
+    Starts the `QstatPoller` shared by the module, if it is not running already; stop it with its `stop` method
+
+    Parameters
+    ----------
+    poll_interval: int
+        the number of seconds to wait between `qstat` queries, for a newly started poller
+
+    Returns
+    -------
+    QstatPoller
+        the poller
+    """
+    global _qstat_poller
+    with _monitor_service_lock:
+        if _qstat_poller is None or not _qstat_poller.is_alive():
+            _qstat_poller = QstatPoller(poll_interval = poll_interval)
+            _qstat_poller.start()
+        return(_qstat_poller)
+
+def get_monitor_service():
+    """
+    Gets the `JobMonitorService` shared by the module, starting its thread if it is not running yet
+
+    Returns
+    -------
+    JobMonitorService
+        the service
+    """
+    global _monitor_service
+    with _monitor_service_lock:
+        if _monitor_service is None or not _monitor_service.is_alive():
+            _monitor_service = JobMonitorService()
+            _monitor_service.start()
+        return(_monitor_service)
+
+def qdel(job_ids, batch_size = None):
+    """
+    Kills qsub jobs by issuing the ``qdel`` command, with many job ID's per command
+
+    Parameters
+    ----------
+    job_ids: iterable
+        the job ID numbers; can be a generator
+    batch_size: int
+        the maximum number of job ID's per ``qdel`` command, so that the command line does not get too long; defaults to the module's `qdel_batch_size`
+
+    Returns
+    -------
+    list
+        the `SubprocessCmd` object for each ``qdel`` command that was run
+    """
+    if not batch_size:
+        batch_size = qdel_batch_size
+    job_ids = iter(job_ids)
+    cmds = []
+    while True:
+        batch = [str(job_id) for job_id in itertools.islice(job_ids, batch_size)]
+        if not batch:
+            break
+        cmd = tools.SubprocessCmd(command = 'qdel {0}'.format(' '.join(batch))).run()
+        logger.debug(cmd.proc_stdout)
+        logger.debug(cmd.proc_stderr)
+        cmds.append(cmd)
+    return(cmds)
+
 def kill_jobs(jobs):
     """
     Kills qsub jobs by issuing the ``qdel`` command
@@ -912,11 +2287,9 @@ def kill_jobs(jobs):
         a list of ``Job`` objects
     """
     if jobs:
-        logger.debug('Killing jobs: {0}'.format(jobs))
-        qdel_command = 'qdel {0}'.format(' '.join([job.id for job in jobs]))
-        cmd = tools.SubprocessCmd(command = qdel_command).run()
-        logger.debug(cmd.proc_stdout)
-        logger.debug(cmd.proc_stderr)
+        job_ids = [job.id for job in jobs]
+        logger.debug('Killing jobs: %s', job_ids)
+        qdel(job_ids)
     else:
         logger.debug("No jobs passed")
 
@@ -939,11 +2312,8 @@ def kill_job_ids(job_ids):
 
     """
     if job_ids:
-        logger.debug('Killing jobs: {0}'.format(job_ids))
-        qdel_command = 'qdel {0}'.format(' '.join([job_id for job_id in job_ids]))
-        cmd = tools.SubprocessCmd(command = qdel_command).run()
-        logger.debug(cmd.proc_stdout)
-        logger.debug(cmd.proc_stderr)
+        logger.debug('Killing jobs: %s', job_ids)
+        qdel(job_ids)
     else:
         logger.debug("No jobs passed")
 
@@ -962,6 +2332,10 @@ def find_all_job_id_names(text):
 
         Your job 3947957 ("sns.wes.SeraCare-1to1-Positive") has been submitted
 
+    or like this for array jobs, where the job ID includes the task range::
+
+        Your job-array 3947957.1-3:1 ("sns.wes.SeraCare-1to1-Positive") has been submitted
+
     Examples
     --------
     Example usage::
@@ -971,68 +2345,556 @@ def find_all_job_id_names(text):
         [('3947957', 'sns.wes.SeraCare-1to1-Positive')]
 
     """
-    # split the lines
-    text_lines = text.split('\n')
-    for line in text_lines:
-        # Your job 3947957 ("sns.wes.SeraCare-1to1-Positive") has been submitted
-        parts = line.split()
-        # ['Your', 'job', '3947957', '("sns.wes.SeraCare-1to1-Positive")', 'has', 'been', 'submitted']
-        if len(parts) >= 7:
-            if parts[0] == 'Your' and parts[1] == 'job' and parts[4] == 'has' and parts[5] == 'been' and parts[6] == 'submitted':
-                job_id, job_name = get_job_ID_name(proc_stdout = line)
-                # job = Job(id = job_id, name = job_name)
-                yield(job_id, job_name)
+    # Your job 3947957 ("sns.wes.SeraCare-1to1-Positive") has been submitted
+    # a plain substring search skips text without any submission messages much faster than the regex can
+    if 'Your job' not in text:
+        return
+    for match in _submit_message_regex.finditer(text):
+        yield(match.group(1), match.group(2).strip('()"'))
 
 
 # ~~~~~~ COMPLETED JOB VALIDATION ~~~~~ #
-def get_qacct(job_id):
+def get_qacct(job_id, task_id = None, min_time = None, force = False):
     """
     Gets the qacct entry for a completed qsub job
+
+    Parameters
+    ----------
+    job_id: int or str
+        the job ID
+    task_id: int
+        only get the entry for this task of an array job
+
+    min_time: float
+        ignore cached output from before this time, e.g. the time the job was submitted; job ID's wrap around, so older output might only hold the records of a previous job with the same ID
+    force: bool
+        ignore any cached output and read the job's records again; the new output replaces the cached output
+
+    Notes
+    -----
+    `qacct` is very slow, so its output is cached for each job ID, both in memory and in the `qacct_cache_db` file so that it is kept between program runs. Empty output is not cached, since the job's record might not have been written yet
+
+    If the `accounting_file` can be read, the current user's records for the job are taken from it with `get_accounting_entries` instead, in the same format as the `qacct` output; `qacct` is only run if there are none
     """
+    job_id = str(job_id)
     qacct_command = 'qacct -j {0}'.format(job_id)
+    if task_id is not None:
+        job_id = '{0}.{1}'.format(job_id, task_id)
+        qacct_command = '{0} -t {1}'.format(qacct_command, task_id)
+    if not force:
+        cached = _qacct_cache.get(job_id)
+        if cached is None:
+            cached = _qacct_db_get(job_id)
+        if cached is not None and (min_time is None or cached[1] >= min_time):
+            _qacct_cache[job_id] = cached
+            return(cached[0])
+    # reading the new records from the accounting file is much faster than running qacct, which reads the whole file
+    entries = get_accounting_entries(job_id = _base_job_id(job_id), task_id = task_id)
+    if entries:
+        proc_stdout = _format_qacct(entries)
+        _qacct_cache[job_id] = (proc_stdout, time.time())
+        return(proc_stdout)
     run_cmd = tools.SubprocessCmd(command = qacct_command).run()
+    if run_cmd.proc_stdout:
+        _qacct_cache[job_id] = (run_cmd.proc_stdout, time.time())
+        _qacct_db_put(job_id, *_qacct_cache[job_id])
     return(run_cmd.proc_stdout)
 
-def qacct2dict(proc_stdout):
+def get_accounting_entries(job_id, task_id = None):
+    """
+    Gets the current user's records for a job from the `accounting_file`, which `qacct` reads its output from. Only the part of the file that was added since the last call is read, so this is much faster than running `qacct`
+
+    Parameters
+    ----------
+    job_id: int or str
+        the job ID
+    task_id: int
+        only get the record for this task of an array job
+
+    Returns
+    -------
+    list
+        a list of dicts for the job's records, with the same keys as the `qacct` output; `None` if the `accounting_file` could not be read
+
+    Notes
+    -----
+    The file is memory mapped, and the inode and byte offset that it was read up to are kept in `_accounting_cache` and the `qacct_cache_db`. The file is read from the start again if it was replaced or truncated while the program is running, e.g. by log rotation. Records of other users are skipped, since `filter_qacct` would remove them anyway
+
+    The first time the file is read, without an offset saved by an earlier run, it is only read from its current end; the file holds the whole history of the cluster, which is slower to read than running `qacct` for the few jobs that finished before then
+    """
+    job_id = str(job_id)
+    with _accounting_lock:
+        records = _read_accounting()
+        if records is None:
+            return(None)
+        # records saved by earlier runs are only in the database; the records read by this run are in both
+        lines = _accounting_db_lines(job_id)
+        if lines:
+            records = OrderedDict()
+            for line in lines:
+                _add_accounting_record(records = records, fields = line.split(':'))
+        entries = list(records.get(job_id, []))
+    if task_id is not None:
+        entries = [entry for entry in entries if entry['taskid'] == str(task_id)]
+    return(entries)
+
+def _read_accounting():
+    """
+    Reads the records that were added to the `accounting_file` since it was last read into the `_accounting_cache`, and saves them to the `qacct_cache_db`; must be called with the `_accounting_lock` held
+
+    Returns
+    -------
+    dict
+        the records in the `_accounting_cache`, or `None` if the file could not be read
+
+    Notes
+    -----
+    The file can be several GB, so it is read one line at a time from the offset; lines that do not contain the current user's name are skipped without being split, only the current user's lines are decoded, and only the records of the last `accounting_max_jobs` jobs are kept
+    """
+    if not accounting_file:
+        return(None)
+    cache = _accounting_cache
+    username = current_user().encode('utf-8')
+    owner = b':' + username + b':'
+    new_lines = []
+    try:
+        stat = os.stat(accounting_file)
+        if cache['path'] != accounting_file or cache['inode'] != stat.st_ino or stat.st_size < cache['offset']:
+            # a file that was replaced while this process was reading it only has new records, so it can be read from the start
+            rotated = cache['path'] == accounting_file
+            cache.update({'path': accounting_file, 'inode': stat.st_ino, 'offset': 0 if rotated else _accounting_start(stat), 'records': OrderedDict()})
+        records = cache['records']
+        if stat.st_size <= cache['offset']:
+            return(records)
+        with open(accounting_file, 'rb') as f:
+            mm = mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ)
+            try:
+                mm.seek(cache['offset'])
+                for line in iter(mm.readline, b''):
+                    # stop before an incomplete line; the record might still be being written
+                    if not line.endswith(b'\n'):
+                        break
+                    start = cache['offset']
+                    cache['offset'] = mm.tell()
+                    # most lines are for other users, and are skipped before they are split
+                    if owner not in line or line.startswith(b'#'):
+                        continue
+                    fields = line.rstrip(b'\n').split(b':')
+                    if len(fields) < len(_accounting_fields) or fields[3] != username:
+                        continue
+                    fields = [field.decode('utf-8', 'replace') for field in fields]
+                    _add_accounting_record(records = records, fields = fields)
+                    new_lines.append((start, fields[5], ':'.join(fields)))
+            finally:
+                mm.close()
+    except (IOError, OSError, ValueError) as e:
+        logger.debug('Could not read the accounting file %s: %s', accounting_file, e)
+        return(None)
+    while len(records) > accounting_max_jobs:
+        records.popitem(last = False)
+    _accounting_db_put(path = accounting_file, inode = stat.st_ino, offset = cache['offset'], lines = new_lines)
+    return(records)
+
+def _accounting_start(stat):
+    """
+    Gets the byte offset to start reading the `accounting_file` from in a new program run; the offset saved in the `qacct_cache_db` by the last run if it is for the same file, otherwise the end of the file. Jobs that finished before then are left to `qacct`
+    """
+    saved = _accounting_db_state(path = accounting_file)
+    if saved is not None and saved[0] == stat.st_ino and saved[1] <= stat.st_size:
+        return(saved[1])
+    return(stat.st_size)
+
+def _add_accounting_record(records, fields):
+    """
+    Adds a line from the `accounting_file` to the records from `_read_accounting`, in the same format as the `qacct` output
+
+    Parameters
+    ----------
+    records: OrderedDict
+        the records, in the format `{job_id: [record, ...]}`
+    fields: list
+        the fields from the line
+    """
+    entry = dict(zip(_accounting_fields, fields))
+    # times are in seconds since the epoch; qacct shows them with the same format as `_parse_qacct_time` reads
+    for key in ('qsub_time', 'start_time', 'end_time'):
+        entry[key] = _format_accounting_time(entry[key])
+    task_id = fields[35] if len(fields) > 35 else '0'
+    entry['taskid'] = task_id if task_id not in ('0', '') else 'undefined'
+    job_id = entry['jobnumber']
+    if job_id in records:
+        records[job_id].append(entry)
+    else:
+        records[job_id] = [entry]
+
+def _format_accounting_time(value):
+    """
+    Converts a time from the `accounting_file` into the format shown by `qacct`
+    """
+    try:
+        seconds = float(value)
+    except ValueError:
+        return(value)
+    if not seconds:
+        return('-/-')
+    # some versions of Grid Engine write the times in milliseconds
+    if seconds > 1e11:
+        seconds = seconds / 1000
+    # asctime always uses the C locale format, the same as qacct
+    return(time.asctime(time.localtime(seconds)))
+
+def _format_qacct(entries):
+    """
+    Formats `qacct` records, e.g. from `get_accounting_entries` or `iter_qacct_entries`, as text in the same format as the `qacct` output
+    """
+    delim = '=============================================================='
+    return('\n'.join(delim + '\n' + '\n'.join('{0:<13}{1}'.format(key, value) for key, value in entry.items()) for entry in entries))
+
+def _qacct_db_connect():
+    """
+    Connects to the `qacct_cache_db`, creating its table if needed
+
+    Returns
+    -------
+    sqlite3.Connection
+        the connection to the database, or `None` if `qacct_cache_db` is not set
+    """
+    if not qacct_cache_db:
+        return(None)
+    conn = sqlite3.connect(qacct_cache_db)
+    with conn:
+        conn.execute('CREATE TABLE IF NOT EXISTS qacct (id TEXT PRIMARY KEY, stdout TEXT, ts REAL)')
+        conn.execute('CREATE TABLE IF NOT EXISTS accounting (path TEXT PRIMARY KEY, inode INTEGER, offset INTEGER)')
+        conn.execute('CREATE TABLE IF NOT EXISTS accounting_records (job_id TEXT, line TEXT)')
+        conn.execute('CREATE INDEX IF NOT EXISTS accounting_records_job_id ON accounting_records (job_id)')
+    return(conn)
+
+def _qacct_db_get(job_id):
+    """
+    Gets the cached `qacct` output for a job from the `qacct_cache_db`
+
+    Returns
+    -------
+    tuple
+        the `(stdout, time)` that was saved for the job, or `None` if there was none
+    """
+    # don't create the database just to find out that it is empty
+    if not qacct_cache_db or not os.path.exists(qacct_cache_db):
+        return(None)
+    try:
+        conn = _qacct_db_connect()
+        try:
+            row = conn.execute('SELECT stdout, ts FROM qacct WHERE id = ?', (job_id,)).fetchone()
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        logger.warning('Could not read from the qacct cache %s: %s', qacct_cache_db, e)
+        return(None)
+    if row:
+        return((row[0], row[1]))
+    return(None)
+
+def _qacct_db_put(job_id, stdout, ts):
+    """
+    Saves the `qacct` output for a job to the `qacct_cache_db`
+    """
+    try:
+        conn = _qacct_db_connect()
+        if conn is None:
+            return
+        try:
+            with conn:
+                conn.execute('INSERT OR REPLACE INTO qacct (id, stdout, ts) VALUES (?, ?, ?)', (job_id, stdout, ts))
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        logger.warning('Could not write to the qacct cache %s: %s', qacct_cache_db, e)
+
+def _accounting_db_state(path):
+    """
+    Gets the inode and byte offset that the `accounting_file` was read up to by the last program run, from the `qacct_cache_db`
+
+    Returns
+    -------
+    tuple
+        `(inode, offset)`, or `None` if there was none
+    """
+    if not qacct_cache_db or not os.path.exists(qacct_cache_db):
+        return(None)
+    try:
+        conn = _qacct_db_connect()
+        try:
+            row = conn.execute('SELECT inode, offset FROM accounting WHERE path = ?', (path,)).fetchone()
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        logger.warning('Could not read from the qacct cache %s: %s', qacct_cache_db, e)
+        return(None)
+    if row:
+        return((row[0], row[1]))
+    return(None)
+
+def _accounting_db_lines(job_id):
+    """
+    Gets the current user's lines for a job from the `accounting_file` that were saved in the `qacct_cache_db`
+
+    Returns
+    -------
+    list
+        the lines in the order they were read, or `None` if there is no database
+    """
+    if not qacct_cache_db or not os.path.exists(qacct_cache_db):
+        return(None)
+    try:
+        conn = _qacct_db_connect()
+        try:
+            rows = conn.execute('SELECT line FROM accounting_records WHERE job_id = ? ORDER BY rowid', (job_id,)).fetchall()
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        logger.warning('Could not read from the qacct cache %s: %s', qacct_cache_db, e)
+        return(None)
+    return([row[0] for row in rows])
+
+def _accounting_db_put(path, inode, offset, lines):
+    """
+    Saves the byte offset that the `accounting_file` was read up to, and the current user's lines that were read, to the `qacct_cache_db`
+
+    Parameters
+    ----------
+    path: str
+        the path to the accounting file
+    inode: int
+        the inode of the file
+    offset: int
+        the byte offset that the file was read up to
+    lines: list
+        the lines that were read, in the format `[(byte offset, job_id, line), ...]`
+
+    Notes
+    -----
+    Another program run might have read some of the same lines, so only the lines past the offset that is already saved are added
+    """
+    try:
+        conn = _qacct_db_connect()
+        if conn is None:
+            return
+        try:
+            # take the write lock before reading the saved offset, so that another run cannot save the same lines in between
+            conn.isolation_level = None
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = conn.execute('SELECT inode, offset FROM accounting WHERE path = ?', (path,)).fetchone()
+                saved = row[1] if row and row[0] == inode else 0
+                if not row or row[0] != inode or offset > saved:
+                    lines = [(job_id, line) for start, job_id, line in lines if start >= saved]
+                    conn.executemany('INSERT INTO accounting_records (job_id, line) VALUES (?, ?)', lines)
+                    conn.execute('INSERT OR REPLACE INTO accounting (path, inode, offset) VALUES (?, ?, ?)', (path, inode, offset))
+                    if lines:
+                        conn.execute('DELETE FROM accounting_records WHERE job_id NOT IN (SELECT job_id FROM accounting_records GROUP BY job_id ORDER BY MAX(rowid) DESC LIMIT ?)', (accounting_max_jobs,))
+                conn.execute('COMMIT')
+            except sqlite3.Error:
+                conn.execute('ROLLBACK')
+                raise
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        logger.warning('Could not write to the qacct cache %s: %s', qacct_cache_db, e)
+
+def qacct_batch(job_ids, processes = 4):
+    """
+    Gets the qacct entries for many completed qsub jobs, running several `qacct` queries at once
+
+    Parameters
+    ----------
+    job_ids: list
+        a list of job ID's
+    processes: int
+        the number of `qacct` queries to run at the same time
+
+    Returns
+    -------
+    dict
+        a dictionary in the format `{job_id: qacct_stdout}`
+
+    Notes
+    -----
+    The results are stored in the same cache as `get_qacct`, so `Job.validate_completion` will not query `qacct` again for these jobs
+    """
+    job_ids = [str(job_id) for job_id in job_ids]
+    if not job_ids:
+        return({})
+    pool = ThreadPool(min(processes, len(job_ids)))
+    try:
+        # cached results are returned right away, without running qacct
+        results = pool.map(get_qacct, job_ids)
+    finally:
+        pool.close()
+        pool.join()
+    return(dict(zip(job_ids, results)))
+
+def _validate_jobs(jobs, processes = 4):
+    """
+    Runs `Job.validate_completion` for many jobs, with several jobs being validated at the same time
+
+    Parameters
+    ----------
+    jobs: list
+        a list of `Job` objects
+    processes: int
+        the number of jobs to validate at the same time
+
+    Returns
+    -------
+    list
+        a list of `True` or `False` values, whether or not each job completed successfully, in the same order as the jobs
+
+    Notes
+    -----
+    Most of the time spent validating a job is spent waiting for its `qacct` query to finish, so running the validations in threads lets the queries overlap. The results are stored on each `Job`, the same as calling `validate_completion` for each job
+    """
+    jobs = list(jobs)
+    if not jobs:
+        return([])
+    pool = ThreadPool(min(processes, len(jobs)))
+    try:
+        validations = pool.map(lambda job: job.validate_completion(), jobs)
+    finally:
+        pool.close()
+        pool.join()
+    return(validations)
+
+def qacct2dict(proc_stdout, entry_delim = None):
     """
-    Converts text output from qacct into a dictionary for parsing
+    Converts text output from qacct into a dictionary for parsing, in the format `{index: {key: value}}`
     """
-    entry_dict = {}
-    entry_delim = '=============================================================='
-    entries = [c for c in proc_stdout.split(entry_delim) if c != '']
-    for i, entry in enumerate(entries):
-        entry_stats = entry.split('\n')
-        entry_dict[i] = {}
-        for item in entry_stats:
-            if len(item.split(None, 1)) >=2:
-                key, value = item.split(None, 1)
-                entry_dict[i][key] = value.strip()
-    return(entry_dict)
+    return(dict(enumerate(iter_qacct_entries(proc_stdout = proc_stdout, entry_delim = entry_delim))))
 
+def iter_qacct_entries(proc_stdout, entry_delim = None):
+    """
+    Generator function which yields each record in the text output from qacct as a dictionary of its `key value` items
 
-def filter_qacct(qacct_dict, days_limit = 7):
+    Parameters
+    ----------
+    proc_stdout: str
+        the stdout from `qacct`
+    entry_delim: str
+        character string delimiter between the records, defaults to '=============================================================='
+    """
+    # entries for jobs in the qacct stdout are split with this character string
+    if not entry_delim:
+        entry_delim = '=============================================================='
+    start = 0
+    while start <= len(proc_stdout):
+        end = proc_stdout.find(entry_delim, start)
+        if end < 0:
+            end = len(proc_stdout)
+        # each entry has one item per line, separated by a variable amount of whitespace; skip empty entries
+        items = _qacct_item_regex.findall(proc_stdout, start, end)
+        if items:
+            yield(dict(items))
+        start = end + len(entry_delim)
+
+
+def filter_qacct(qacct_dict, days_limit = 7, time_now = None):
     """
-    Filters out 'bad' entries from the dict
+    Filters out 'bad' entries from the dict; `time_now` defaults to the current time
     """
-    username = getpass.getuser()
     if qacct_dict:
-        for key, subdict in qacct_dict.items():
-            # only keep the entries that match the current user's username
-            job_owner = subdict['owner']
-            if job_owner != username:
-                qacct_dict.pop(key)
-                continue
-            # make sure the job was completed within the last 7 days
-            job_end_time = subdict['end_time']
-            job_end_time_obj = datetime.datetime.strptime(job_end_time, "%c")
-            time_now = datetime.datetime.now()
-            time_elapsed = time_now - job_end_time_obj
-            if time_elapsed.days > days_limit:
-                qacct_dict.pop(key)
-                continue
+        username = current_user()
+        cutoff = _qacct_cutoff(days_limit = days_limit, time_now = time_now)
+        # only keep the entries that match the current user's username, and were completed within the days_limit
+        qacct_dict = {key: subdict for key, subdict in qacct_dict.items()
+                        if subdict.get('owner') == username
+                        and _qacct_within_days(job_end_time = subdict.get('end_time'), cutoff = cutoff)}
     # more filter criteria here...
     return(qacct_dict)
 
+def current_user():
+    """
+    Gets the current user's username. The username is only looked up once, since `getpass.getuser` can be slow on some systems
+    """
+    global _current_user
+    if _current_user is None:
+        _current_user = getpass.getuser()
+    return(_current_user)
+
+def _parse_qacct_time(timestamp):
+    """
+    Parses a timestamp from the `qacct` output into a `datetime` object. Results are cached, since the same timestamps are often repeated across `qacct` records
+
+    Returns
+    -------
+    datetime.datetime
+        the parsed time, or `None` if the timestamp could not be parsed
+
+    Notes
+    -----
+    `qacct` uses the C locale format, e.g. 'Wed Jun  5 14:03:22 2024', which is parsed with `_qacct_time_regex` instead of `strptime`; this is faster, and does not depend on the locale of the program. Other timestamps are parsed with the locale's '%c' format
+    """
+    if timestamp not in _qacct_time_cache:
+        parsed = None
+        match = _qacct_time_regex.match(timestamp) if isinstance(timestamp, str) else None
+        try:
+            if match and match.group(1) in _qacct_months:
+                month, day, hour, minute, second, year = match.groups()
+                parsed = datetime.datetime(int(year), _qacct_months[month], int(day), int(hour), int(minute), int(second))
+            else:
+                parsed = datetime.datetime.strptime(timestamp, "%c")
+        except (TypeError, ValueError):
+            pass
+        _qacct_time_cache[timestamp] = parsed
+    return(_qacct_time_cache[timestamp])
+
+def _qacct_cutoff(days_limit, time_now = None):
+    """
+    Gets the earliest end time allowed for a job in the `qacct` output, so that it only needs to be calculated once when filtering many jobs
+
+    Parameters
+    ----------
+    days_limit: int or None
+        the maximum allowed age of the job in days, where a job that ended 7.5 days ago is 7 days old; `None` disables the check
+    time_now: datetime.datetime
+        the current time
+
+    Returns
+    -------
+    datetime.datetime
+        jobs must have ended after this time; `None` if there is no limit
+    """
+    if not days_limit:
+        return(None)
+    if time_now is None:
+        time_now = datetime.datetime.now()
+    return(time_now - datetime.timedelta(days = days_limit + 1))
+
+def _qacct_within_days(job_end_time, cutoff):
+    """
+    Checks if a job in the `qacct` output was completed after the `cutoff` from `_qacct_cutoff`
+
+    Parameters
+    ----------
+    job_end_time: str
+        the 'end_time' value from the `qacct` output for the job
+    cutoff: datetime.datetime or None
+        jobs must have ended after this time; `None` disables the check
+
+    Returns
+    -------
+    bool
+        `True` if the job is recent enough, or its end time could not be parsed, otherwise `False`
+
+    Notes
+    -----
+    The timestamp format used in the `qacct` output is not always consistent; jobs with timestamps that cannot be parsed are kept instead of raising an error
+    """
+    if cutoff is None:
+        return(True)
+    job_end_time_obj = _parse_qacct_time(job_end_time)
+    if job_end_time_obj is None:
+        return(True)
+    return(job_end_time_obj > cutoff)
+
 def get_qacct_job_failed_status(failed_entry):
     """
     Special parsing for the 'failed' entry in qacct output
@@ -1049,10 +2911,13 @@ def get_qacct_job_failed_status(failed_entry):
     value = int(value)
     return(value)
 
-def validate_job_completion(job_id):
+def validate_job_completion(job_id, done_flag = None):
     """
-    Checks if a qsub job completed successfully
+    Checks if a qsub job completed successfully. If the path to the job's `done_flag` file is given and the job wrote its exit status there, `qacct` does not need to be checked
     """
+    exit_status = read_done_flag(done_flag)
+    if exit_status is not None:
+        return(exit_status == 0)
     # get the results of the qacct query command
     proc_stdout = get_qacct(job_id = job_id)
     # convert it into a dict
@@ -1064,19 +2929,18 @@ def validate_job_completion(job_id):
         print('ERROR: no valid job entries found for job_id {0}'.format(job_id))
         return()
     # make sure only one entry is left!
-    if len(qacct_dict.keys()) > 1:
+    if len(qacct_dict) > 1:
         print('ERROR: multiple entries found for job_id {0};\n{1}'.format(job_id, qacct_dict))
         return()
     # check the 'failed' status; >0 = failed !!
     validate_failed_status = True
-    first_entry_key = qacct_dict.keys()[0]
-    status_code = get_qacct_job_failed_status(failed_entry = qacct_dict[first_entry_key]['failed'])
+    first_entry = next(iter(qacct_dict.values()))
+    status_code = get_qacct_job_failed_status(failed_entry = first_entry['failed'])
     if status_code > 0:
         validate_failed_status = False
     # check the 'exit_status'
     validate_exit_status = True
-    first_entry_key = qacct_dict.keys()[0]
-    if int(qacct_dict[first_entry_key]['exit_status']) > 0:
+    if int(first_entry['exit_status']) > 0:
         validate_exit_status = False
     # add more criteria here...
     # aggregate the validations
@@ -1093,6 +2957,98 @@ def validate_job_completion(job_id):
         print('The job {0} is valid'.format(job_id))
         return(True)
 
+def validate_job_completions(job_ids, days_limit = 7):
+    """
+    Checks if many qsub jobs completed successfully, from their job ID's; runs `validate_completions` for a `Job` made for each ID
+
+    Parameters
+    ----------
+    job_ids: list
+        a list of job ID's
+    days_limit: int
+        only look up the jobs that started within this many days in the single `qacct` query
+
+    Returns
+    -------
+    dict
+        a dictionary in the format `{job_id: bool}`
+
+    Examples
+    --------
+    Example usage::
+
+        validations = validate_job_completions(job_ids = [job.id for job in jobs])
+        all(validations.values())
+    """
+    job_ids = [str(job_id) for job_id in job_ids]
+    jobs = [Job(id = job_id, debug = True) for job_id in job_ids]
+    return(dict(zip(job_ids, validate_completions(jobs = jobs, days_limit = days_limit))))
+
+def validate_completions(jobs, days_limit = 7):
+    """
+    Runs `Job.validate_completion` for many jobs, getting the `qacct` records for all of them from a single `qacct` query for the current user's jobs from the last `days_limit` days, instead of one `qacct -j` query per job
+
+    Parameters
+    ----------
+    jobs: list
+        a list of `Job` objects
+    days_limit: int
+        only look up the jobs that started within this many days in the single query
+
+    Returns
+    -------
+    list
+        a list of `True` or `False` values, whether or not each job completed successfully, in the same order as the jobs
+
+    Notes
+    -----
+    Jobs whose exit status is already known, from `qsub -sync y` or their `done_flag`, do not need `qacct`. Jobs that are not found by the single query, e.g. because they are older than `days_limit`, are looked up on their own by `validate_completion` as usual
+
+    Examples
+    --------
+    Example usage::
+
+        completed_jobs, err_jobs = monitor_jobs(jobs = jobs)
+        validate_completions(completed_jobs)
+    """
+    jobs = list(jobs)
+    pending_jobs = []
+    for job in jobs:
+        if job.exit_status is None:
+            job.exit_status = read_done_flag(job.done_flag, min_time = job.submit_time)
+        if job.exit_status is None and not hasattr(job, 'qacct_stdout'):
+            pending_jobs.append(job)
+    if pending_jobs:
+        job_entries = _qacct_user_entries(days_limit = days_limit)
+        for job in pending_jobs:
+            entries = job_entries.get(str(job.id), [])
+            if job.task_id is not None:
+                entries = [entry for entry in entries if entry.get('taskid') == str(job.task_id)]
+            if entries:
+                job.qacct_stdout = _format_qacct(entries)
+    # jobs that were not found still need their own qacct queries, which can run at the same time
+    return(_validate_jobs(jobs))
+
+def _qacct_user_entries(days_limit = 7):
+    """
+    Gets the current user's `qacct` records from the last `days_limit` days with a single `qacct` query
+
+    Returns
+    -------
+    dict
+        a dictionary in the format `{job_id: [entry, ...]}`, with the records for each job ID as dicts of their `key value` items
+    """
+    time_now = datetime.datetime.now()
+    begin_time = time_now - datetime.timedelta(days = days_limit)
+    qacct_command = 'qacct -o {0} -b {1} -j'.format(current_user(), begin_time.strftime('%Y%m%d%H%M'))
+    run_cmd = tools.SubprocessCmd(command = qacct_command).run()
+    qacct_dict = filter_qacct(qacct_dict = qacct2dict(proc_stdout = run_cmd.proc_stdout), days_limit = days_limit, time_now = time_now)
+    # index the records by their job ID
+    job_entries = defaultdict(list)
+    for entry in qacct_dict.values():
+        job_entries[entry.get('jobnumber')].append(entry)
+    return(job_entries)
+
 
 # ~~~~~~ DEMO FUNCTIONS ~~~~~ #
 def demo_qsub():
@@ -1157,18 +3113,20 @@ def demo_multi_qsub(job_num = 3):
         print('submitted job: {0} "{1}"'.format(job.id, job.name))
         jobs.append(job)
 
-    # wait for jobs to finish
+    # wait for jobs to finish; monitor_jobs depletes the list it is given
     print('waiting on jobs to finish')
-    monitor_jobs(jobs = jobs)
+    monitor_jobs(jobs = list(jobs))
     print('jobs have finished\n\n')
 
     print('validating job completions...')
 
-    if all([job.validate_completion() for job in jobs]):
+    # validate all of the jobs with a single qacct query
+    validations = validate_job_completions(job_ids = [job.id for job in jobs])
+    if all(validations.values()):
         print('All jobs completed successfully')
     else:
         for job in jobs:
-            if not job.validate_completion():
+            if not validations[str(job.id)]:
                 print('Job {0} did not complete successfully!'.format(job.id))
 
 
@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+unit tests for the annotate module
+"""
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+def _missing_vcf2annovar(vcf_file, **kwargs):
+    """
+    Stands in for `vcf2annovar` when ANNOVAR does not create its output file
+    """
+    sys.exit()
+
+def _fake_vcf2annovar(vcf_file, **kwargs):
+    """
+    Stands in for `vcf2annovar`; the .vcf file is used as the .avinput file
+    """
+    return(vcf_file)
+
+def _fake_table_annovar(avinput_file, **kwargs):
+    """
+    Stands in for `table_annovar`; writes a multianno file with a header line and one line per entry
+    """
+    multianno_output = avinput_file + '.multianno.txt'
+    with open(avinput_file) as fin, open(multianno_output, 'w') as fout:
+        fout.write('Chr\tStart\n')
+        for line in fin:
+            if not line.startswith('#') and line.strip():
+                fout.write('\t'.join(line.split('\t')[:2]) + '\n')
+    return(multianno_output)
+
+@unittest.skipIf(yaml is None, "the annotate module needs pyyaml to set up logging")
+class TestAnnotateChunks(unittest.TestCase):
+    def setUp(self):
+        import annotate
+        self.annotate = annotate
+        self.vcf2annovar = annotate.vcf2annovar
+        self.table_annovar = annotate.table_annovar
+        annotate.vcf2annovar = _fake_vcf2annovar
+        annotate.table_annovar = _fake_table_annovar
+        self.scriptdir = os.path.dirname(os.path.realpath(__file__))
+        self.tmpdir = tempfile.mkdtemp()
+        self.vcf_file = os.path.join(self.tmpdir, "small.vcf")
+        shutil.copy(os.path.join(self.scriptdir, "fixtures", "small.vcf"), self.vcf_file)
+
+    def tearDown(self):
+        self.annotate.vcf2annovar = self.vcf2annovar
+        self.annotate.table_annovar = self.table_annovar
+        shutil.rmtree(self.tmpdir)
+
+    def test_merge_multianno(self):
+        """
+        Test that only the first file's header is kept, and the files are merged in order
+        """
+        input_files = []
+        for i, rows in enumerate([['1\t100\n', '1\t200\n'], ['2\t300\n']]):
+            input_file = os.path.join(self.tmpdir, "{0}.txt".format(i))
+            with open(input_file, "w") as f:
+                f.writelines(['Chr\tStart\n'] + rows)
+            input_files.append(input_file)
+        output_file = os.path.join(self.tmpdir, "merged.txt")
+        self.annotate.merge_multianno(input_files = input_files, output_file = output_file)
+        with open(output_file) as f:
+            self.assertTrue(f.readlines() == ['Chr\tStart\n', '1\t100\n', '1\t200\n', '2\t300\n'])
+
+    def test_annotate_chunks(self):
+        """
+        Test that the chunks are annotated and merged back in the order of the original file, and that the chunks are removed
+        """
+        annotated_file = self.annotate.annotate_chunks(input_file = self.vcf_file, num_chunks = 2, processes = 2)
+        expected_output = os.path.join(self.tmpdir, "small.{0}_multianno.txt".format(self.annotate.configs['ANNOVAR_buildver']))
+        self.assertTrue(annotated_file == {'file': self.vcf_file, 'multianno_output': expected_output})
+        with open(expected_output) as f:
+            lines = f.readlines()
+        self.assertTrue(lines == ['Chr\tStart\n', '1\t100\n', '1\t200\n', '2\t300\n', '3\t400\n', 'X\t500\n'])
+        self.assertTrue(sorted(os.listdir(self.tmpdir)) == sorted(["small.vcf", os.path.basename(expected_output)]))
+
+@unittest.skipIf(yaml is None, "the annotate module needs pyyaml to set up logging")
+class TestAnnotateFiles(unittest.TestCase):
+    def setUp(self):
+        import annotate
+        self.annotate = annotate
+        self.vcf2annovar = annotate.vcf2annovar
+
+    def tearDown(self):
+        self.annotate.vcf2annovar = self.vcf2annovar
+
+    def test_annotate_files_empty(self):
+        self.assertTrue(self.annotate._annotate_files(input_files = []) == [])
+
+    def test_annotate_one_exit(self):
+        """
+        Test that a worker that calls sys.exit() raises an ordinary exception
+        """
+        self.annotate.vcf2annovar = _missing_vcf2annovar
+        self.assertRaises(RuntimeError, self.annotate._annotate_one, 'foo.vcf')
+
+    def test_annotate_files_exit(self):
+        """
+        Test that the program exits instead of waiting forever when a worker calls sys.exit()
+        """
+        self.annotate.vcf2annovar = _missing_vcf2annovar
+        self.assertRaises(SystemExit, self.annotate._annotate_files, input_files = ['foo.vcf', 'bar.vcf'], processes = 2, timeout = 30)
+
+
+if __name__ == '__main__':
+    unittest.main()
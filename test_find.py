@@ -5,8 +5,13 @@
 unit tests for the find module
 """
 import unittest
+import os
+import shutil
+import tempfile
 from find import multi_filter
 from find import super_filter
+from find import find
+from find import walklevel
 
 class TestSuperFilter(unittest.TestCase):
     def test_true(self):
@@ -30,5 +35,39 @@ class TestSuperFilter(unittest.TestCase):
 
 
 
+class TestFind(unittest.TestCase):
+    def setUp(self):
+        # tmpdir/a/b/c, with a file in each dir
+        self.tmpdir = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.tmpdir, 'a', 'b', 'c'))
+        for path in ['f0.txt', 'a/f1.txt', 'a/b/f2.txt', 'a/b/c/f3.txt']:
+            open(os.path.join(self.tmpdir, path), 'w').close()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def relpaths(self, paths):
+        return(sorted(os.path.relpath(path, self.tmpdir) for path in paths))
+
+    def test_find_files(self):
+        files = find(search_dir = self.tmpdir, inclusion_patterns = ('*.txt',), search_type = 'file')
+        self.assertTrue(self.relpaths(files) == ['a/b/c/f3.txt', 'a/b/f2.txt', 'a/f1.txt', 'f0.txt'])
+
+    def test_find_level_limit(self):
+        self.assertTrue(self.relpaths(find(search_dir = self.tmpdir, level_limit = 0)) == ['a', 'f0.txt'])
+        self.assertTrue(self.relpaths(find(search_dir = self.tmpdir, level_limit = 1)) == ['a', 'a/b', 'a/f1.txt', 'f0.txt'])
+
+    def test_find_dirs(self):
+        dirs = find(search_dir = self.tmpdir + os.path.sep, search_type = 'dir', level_limit = 1)
+        self.assertTrue(self.relpaths(dirs) == ['a', 'a/b'])
+
+    def test_walklevel(self):
+        self.assertTrue(self.relpaths(walklevel(self.tmpdir, level = 1)) == ['a', 'a/b', 'a/f1.txt', 'f0.txt'])
+        self.assertTrue(self.relpaths(walklevel(self.tmpdir + os.path.sep, level = 2)) == ['a', 'a/b', 'a/b/c', 'a/b/f2.txt', 'a/f1.txt', 'f0.txt'])
+
+    def test_find_num_limit(self):
+        self.assertTrue(len(find(search_dir = self.tmpdir, num_limit = 2)) == 2)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+unit tests for the log module
+"""
+import unittest
+import os
+import shutil
+import tempfile
+import logging
+import json
+import log
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+class TestHandlers(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.logger = logging.getLogger("test_log.handlers")
+        self.file_handler = logging.FileHandler(os.path.join(self.tmpdir, "main1.log"))
+        self.file_handler.set_name("main")
+        self.file_handler2 = logging.FileHandler(os.path.join(self.tmpdir, "main2.log"))
+        self.file_handler2.set_name("main")
+        self.stream_handler = logging.StreamHandler()
+        self.stream_handler.set_name("console")
+        self.buffered_handler = log.BufferedFileHandler(os.path.join(self.tmpdir, "buffered.log"))
+        self.buffered_handler.set_name("buffered")
+        self.handlers = [self.file_handler, self.file_handler2, self.stream_handler, self.buffered_handler]
+        log.add_handlers(logger = self.logger, handlers = self.handlers)
+
+    def tearDown(self):
+        log.remove_handlers(logger = self.logger, handlers = self.logger.handlers)
+        for h in self.handlers:
+            h.close()
+        shutil.rmtree(self.tmpdir)
+
+    def test_get_logger_handler(self):
+        self.assertTrue(log.get_logger_handler(logger = self.logger, handler_name = "main") is self.file_handler)
+        self.assertTrue(log.get_logger_handler(logger = self.logger, handler_name = "main", handler_type = "StreamHandler") is None)
+
+    def test_get_logger_handler_subclasses(self):
+        self.assertTrue(log.get_logger_handler(logger = self.logger, handler_name = "buffered") is None)
+        self.assertTrue(log.get_logger_handler(logger = self.logger, handler_name = "buffered", subclasses = True) is self.buffered_handler)
+
+    def test_logger_filepath(self):
+        """
+        Test that the last handler with the name is used, and that subclasses of FileHandler are included
+        """
+        self.assertTrue(log.logger_filepath(logger = self.logger, handler_name = "main") == self.file_handler2.baseFilename)
+        self.assertTrue(log.logger_filepath(logger = self.logger, handler_name = "buffered") == self.buffered_handler.baseFilename)
+
+    def test_get_all_handlers_stream(self):
+        """
+        Test that FileHandlers are not included in the StreamHandlers, even though FileHandler is a subclass of StreamHandler
+        """
+        handlers = [h for h in log.get_all_handlers(logger = self.logger, types = ('StreamHandler',))]
+        self.assertTrue(handlers == [self.stream_handler])
+
+    def test_log_all_handler_filepaths(self):
+        """
+        Test that only the paths of plain FileHandlers are logged, the same as ``get_logger_handler``
+        """
+        messages = []
+        self.logger.info = lambda msg, *args: messages.append(msg % args)
+        try:
+            log.log_all_handler_filepaths(logger = self.logger)
+            log.print_filehandler_filepaths_to_log(logger = self.logger)
+        finally:
+            del self.logger.info
+        self.assertTrue(len(messages) == 4)
+        self.assertFalse(any(self.buffered_handler.baseFilename in message for message in messages))
+        self.assertTrue(messages[0] == 'Path to main log file: {0}'.format(self.file_handler.baseFilename))
+
+    def test_remove_all_handlers_stream(self):
+        log.remove_all_handlers(logger = self.logger, types = ('StreamHandler',))
+        self.assertTrue(self.logger.handlers == [self.file_handler, self.file_handler2, self.buffered_handler])
+
+
+class TestBufferedFileHandler(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.log_file = os.path.join(self.tmpdir, "buffered.log")
+        self.logger = logging.getLogger("test_log.buffered")
+        self.logger.setLevel(logging.DEBUG)
+        self.logger.propagate = False
+        self.handler = log.BufferedFileHandler(self.log_file, flush_records = 3, flush_interval = 3600)
+        self.logger.addHandler(self.handler)
+
+    def tearDown(self):
+        self.logger.removeHandler(self.handler)
+        self.handler.close()
+        shutil.rmtree(self.tmpdir)
+
+    def num_lines(self):
+        with open(self.log_file) as f:
+            return(len(f.readlines()))
+
+    def test_flush_records(self):
+        """
+        Test that the buffer is flushed after every ``flush_records`` records
+        """
+        self.logger.debug("foo")
+        self.logger.debug("bar")
+        self.assertTrue(self.num_lines() == 0)
+        self.logger.debug("baz")
+        self.assertTrue(self.num_lines() == 3)
+
+    def test_flush_level(self):
+        self.logger.debug("foo")
+        self.logger.error("bar")
+        self.assertTrue(self.num_lines() == 2)
+
+    def test_flush_before_fork(self):
+        self.logger.debug("foo")
+        log._flush_buffered_handlers()
+        self.assertTrue(self.num_lines() == 1)
+
+    def test_main_filehandler_not_buffered(self):
+        handler = log.create_main_filehandler(log_file = os.path.join(self.tmpdir, "main.log"))
+        self.assertTrue(type(handler) is logging.FileHandler)
+        handler.close()
+        handler = log.create_main_filehandler(log_file = os.path.join(self.tmpdir, "main.log"), buffered = True)
+        self.assertTrue(isinstance(handler, log.BufferedFileHandler))
+        handler.close()
+
+
+@unittest.skipIf(yaml is None, "parsing the YAML config needs pyyaml")
+class TestConfigCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.config_yaml = os.path.join(self.tmpdir, "logging.yml")
+        with open(self.config_yaml, "w") as f:
+            f.write("version: 1\nloggers:\n  test_log.config:\n    level: INFO\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_config_cache_json(self):
+        """
+        Test that the parsed config is saved to a JSON file, and loaded from it the next time
+        """
+        stat = os.stat(self.config_yaml)
+        config = log._load_config(config_yaml = self.config_yaml, stat = stat)
+        cache_path = log._config_cache_path(self.config_yaml)
+        with open(cache_path) as f:
+            cached = json.load(f)
+        self.assertTrue(cached['config'] == config)
+        # change the cached config, to make sure that the cache is used
+        cached['config']['loggers']['test_log.config']['level'] = 'DEBUG'
+        with open(cache_path, "w") as f:
+            json.dump(cached, f)
+        config = log._load_config(config_yaml = self.config_yaml, stat = stat)
+        self.assertTrue(config['loggers']['test_log.config']['level'] == 'DEBUG')
+
+    def test_config_cache_stale(self):
+        """
+        Test that the cache is not used after the YAML file changes
+        """
+        log._load_config(config_yaml = self.config_yaml, stat = os.stat(self.config_yaml))
+        with open(self.config_yaml, "a") as f:
+            f.write("disable_existing_loggers: False\n")
+        config = log._load_config(config_yaml = self.config_yaml, stat = os.stat(self.config_yaml))
+        self.assertTrue(config['disable_existing_loggers'] is False)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -9,6 +9,19 @@ import os
 from qsub import Job
 import qsub
 import collections
+import tempfile
+import shutil
+import time
+
+def qstat_xml(entries):
+    """
+    Makes `qstat -xml` output listing the `(job_id, state, task_id)` entries
+    """
+    job_lists = []
+    for job_id, state, task_id in entries:
+        tasks = '<tasks>{0}</tasks>'.format(task_id) if task_id else ''
+        job_lists.append('<job_list state="running"><JB_job_number>{0}</JB_job_number><JB_name>python</JB_name><state>{1}</state>{2}</job_list>'.format(job_id, state, tasks))
+    return('<?xml version=\'1.0\'?>\n<job_info><queue_info>{0}</queue_info><job_info></job_info></job_info>\n'.format(''.join(job_lists)))
 
 class TestJob(unittest.TestCase):
     def setUp(self):
@@ -130,6 +143,75 @@ class TestJob(unittest.TestCase):
         expected_list = [('3947949', 'sns.wes.HapMap-B17-1267'), ('3947956', 'sns.wes.NTC-H2O'), ('3947957', 'sns.wes.SeraCare-1to1-Positive')]
         self.assertTrue(compare(jobs_id_list, expected_list))
 
+    def test_stale_qstat_not_terminal(self):
+        """
+        Test that a cached qstat result from before a job was created does not mark the job as finished
+        """
+        qsub._qstat_cache[qsub.current_user()] = ('', qsub._monotonic() - 1, 0)
+        try:
+            x = Job(id = '2495634')
+            self.assertFalse(x.is_present)
+            x.refresh(qstat_stdout = self.qstat_stdout_r_Eqw_str)
+            self.assertTrue(x.is_present)
+        finally:
+            qsub.clear_qstat_cache()
+
+    def test_fresh_qstat_terminal(self):
+        """
+        Test that a job missing from a qstat result queried after it was created is marked as finished
+        """
+        x = Job(id = '2495634', debug = True, since = qsub._monotonic() - 1)
+        x.refresh(qstat_stdout = '')
+        x.refresh(qstat_stdout = self.qstat_stdout_r_Eqw_str)
+        self.assertFalse(x.is_present)
+
+    def test_present_queries_unsubmitted_job(self):
+        """
+        Test that a job not submitted by this process is checked against a new qstat query instead of the cached result
+        """
+        qsub._qstat_cache[qsub.current_user()] = ('', qsub._monotonic() - 1, 0)
+        qstat = qsub.qstat
+        qsub.qstat = lambda *args, **kwargs: self.qstat_stdout_r_Eqw_str
+        try:
+            x = Job(id = '2495634')
+            self.assertFalse(x.is_present)
+            self.assertTrue(x.present())
+        finally:
+            qsub.qstat = qstat
+            qsub.clear_qstat_cache()
+
+    def test_present_submitted_job_cached(self):
+        """
+        Test that a job submitted by this process is checked against the cached qstat result
+        """
+        qsub._qstat_cache[qsub.current_user()] = (self.qstat_stdout_r_Eqw_str, qsub._monotonic(), 0)
+        qsub._submitted_jobs.add('2495634')
+        qstat = qsub.qstat
+        qsub.qstat = lambda *args, **kwargs: self.fail('qstat was queried')
+        try:
+            x = Job(id = '2495634', since = qsub._monotonic() - 1)
+            self.assertTrue(x.present())
+        finally:
+            qsub.qstat = qstat
+            qsub._submitted_jobs.discard('2495634')
+            qsub.clear_qstat_cache()
+
+    def test_new_query_same_output(self):
+        """
+        Test that a job is updated from a new qstat query even when the output is the same as the last query's
+        """
+        qsub._qstat_cache[qsub.current_user()] = ('', qsub._monotonic() - 1, 0)
+        qstat = qsub.qstat
+        qsub.qstat = lambda *args, **kwargs: ''
+        try:
+            x = Job(id = '2495634')
+            self.assertFalse(x._terminal)
+            x._update(force = True)
+            self.assertTrue(x._terminal)
+        finally:
+            qsub.qstat = qstat
+            qsub.clear_qstat_cache()
+
     def test_validate_qacct_normal1(self):
         """
         Test that a job can be validated from qacct stdout
@@ -175,5 +257,523 @@ class TestJob(unittest.TestCase):
         self.assertFalse(validation)
 
 
+class TestDoneFlag(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.done_flag = qsub.get_done_flag(log_dir = self.tmpdir, name = 'python', id = '123')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def write_flag(self, exit_status, age = 0):
+        with open(self.done_flag, 'w') as f:
+            f.write('{0}\n'.format(exit_status))
+        if age:
+            mtime = time.time() - age
+            os.utime(self.done_flag, (mtime, mtime))
+
+    def test_done_flag_exit_status(self):
+        """
+        Test that a job is validated from the exit status in its done flag, which is then removed
+        """
+        job = Job(id = '123', debug = True, done_flag = self.done_flag)
+        self.assertFalse(job.done())
+        self.write_flag(0)
+        self.assertTrue(job.done())
+        self.assertTrue(job.validate_completion())
+        self.assertTrue(job.exit_status == 0)
+        self.assertFalse(os.path.exists(self.done_flag))
+
+    def test_monitor_jobs_removes_done_flag(self):
+        """
+        Test that monitoring a job to completion removes its done flag, without the job being validated
+        """
+        job = Job(id = '123', debug = True, done_flag = self.done_flag)
+        self.write_flag(2)
+        qsub.monitor_jobs(jobs = [job])
+        self.assertFalse(os.path.exists(self.done_flag))
+        self.assertTrue(job.exit_status == 2)
+        self.assertFalse(job.validate_completion())
+
+    def test_wait_until_done_removes_done_flag(self):
+        job = Job(id = '123', debug = True, done_flag = self.done_flag)
+        self.write_flag(0)
+        job.wait_until_done()
+        self.assertFalse(os.path.exists(self.done_flag))
+        self.assertTrue(job.exit_status == 0)
+
+    def test_done_flag_failed(self):
+        job = Job(id = '123', debug = True, done_flag = self.done_flag)
+        self.write_flag(1)
+        self.assertFalse(job.validate_completion())
+
+    def test_stale_done_flag(self):
+        """
+        Test that a done flag left by an older job with the same name and ID is ignored
+        """
+        self.write_flag(1, age = 7 * 24 * 60 * 60)
+        job = Job(id = '123', debug = True, done_flag = self.done_flag)
+        self.assertFalse(job.done())
+        self.assertTrue(qsub.read_done_flag(self.done_flag, min_time = job.submit_time) is None)
+        self.assertTrue(qsub.read_done_flag(self.done_flag) == 1)
+
+    def test_done_flag_trap_removes_old_flag(self):
+        """
+        Test that the job removes an old done flag before it sets up the trap that writes its own
+        """
+        self.assertTrue(qsub.done_flag_trap(self.done_flag).startswith('rm -f "{0}"\n'.format(self.done_flag)))
+
+
+class TestAccountingFile(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.accounting_file = os.path.join(self.tmpdir, "accounting")
+        self.old_accounting_file = qsub.accounting_file
+        self.old_max_jobs = qsub.accounting_max_jobs
+        self.old_cache_db = qsub.qacct_cache_db
+        qsub.accounting_file = self.accounting_file
+        qsub.qacct_cache_db = None
+        self.user = qsub.current_user()
+        self.now = int(time.time())
+        # the file is only read from where it ended when it was first read
+        self.write('')
+        qsub._read_accounting()
+
+    def tearDown(self):
+        qsub.accounting_file = self.old_accounting_file
+        qsub.accounting_max_jobs = self.old_max_jobs
+        qsub.qacct_cache_db = self.old_cache_db
+        self.reset()
+        shutil.rmtree(self.tmpdir)
+
+    def reset(self):
+        """
+        Clears the records that were read, the same as in a new program run
+        """
+        qsub._accounting_cache.update({'path': None, 'inode': None, 'offset': 0, 'records': collections.OrderedDict()})
+
+    def line(self, job_id, task_id = 0, exit_status = 0, owner = None):
+        """
+        Makes a line in the format of the SGE accounting file
+        """
+        fields = ['all.q', 'node1', 'grp', owner or self.user, 'python', str(job_id), 'sge', '0', str(self.now - 100), str(self.now - 50), str(self.now), '0', str(exit_status), '50'] + ['0'] * 21 + [str(task_id)] + ['0'] * 5
+        return(':'.join(fields) + '\n')
+
+    def write(self, text, mode = 'a'):
+        with open(self.accounting_file, mode) as f:
+            f.write(text)
+
+    def test_accounting_entries(self):
+        """
+        Test that the current user's records are read from the accounting file
+        """
+        self.write('# header\n' + self.line(11) + self.line(12, owner = 'someone_else') + self.line(13, task_id = 1) + self.line(13, task_id = 2, exit_status = 1))
+        self.assertTrue(len(qsub.get_accounting_entries(11)) == 1)
+        self.assertTrue(qsub.get_accounting_entries(12) == [])
+        self.assertTrue(len(qsub.get_accounting_entries(13)) == 2)
+        self.assertTrue(qsub.get_accounting_entries(13, task_id = 2)[0]['exit_status'] == '1')
+        self.assertTrue(qsub.get_accounting_entries(11)[0]['taskid'] == 'undefined')
+
+    def test_accounting_new_records(self):
+        """
+        Test that records added to the file are read, but not an incomplete line that is still being written
+        """
+        self.write(self.line(11))
+        qsub.get_accounting_entries(11)
+        offset = os.path.getsize(self.accounting_file)
+        self.write(self.line(14, exit_status = 3) + 'all.q:node1')
+        self.assertTrue(qsub.get_accounting_entries(14)[0]['exit_status'] == '3')
+        self.assertTrue(qsub._accounting_cache['offset'] == offset + len(self.line(14)))
+
+    def test_accounting_replaced(self):
+        """
+        Test that the file is read again from the start after it is replaced
+        """
+        self.write(self.line(11) + self.line(12))
+        qsub.get_accounting_entries(11)
+        self.write(self.line(15), mode = 'w')
+        self.assertTrue(len(qsub.get_accounting_entries(15)) == 1)
+        self.assertTrue(qsub.get_accounting_entries(11) == [])
+
+    def test_accounting_max_jobs(self):
+        """
+        Test that only the records of the newest jobs are kept
+        """
+        qsub.accounting_max_jobs = 3
+        self.write(''.join(self.line(job_id) for job_id in range(100, 110)))
+        self.assertTrue(list(qsub._read_accounting().keys()) == ['107', '108', '109'])
+
+    def test_accounting_qacct_format(self):
+        """
+        Test that the records are given in the same format as the qacct output
+        """
+        self.write(self.line(16, exit_status = 2))
+        qacct_dict = qsub.qacct2dict(proc_stdout = qsub._format_qacct(qsub.get_accounting_entries(16)))
+        entry = next(iter(qacct_dict.values()))
+        self.assertTrue(entry['exit_status'] == '2')
+        self.assertTrue(entry['jobnumber'] == '16')
+
+    def test_accounting_history_skipped(self):
+        """
+        Test that the records from before the file was first read are left to qacct, instead of reading the whole file
+        """
+        self.reset()
+        self.write(self.line(11))
+        self.assertTrue(qsub.get_accounting_entries(11) == [])
+        self.assertTrue(qsub._accounting_cache['offset'] == os.path.getsize(self.accounting_file))
+        self.write(self.line(12))
+        self.assertTrue(len(qsub.get_accounting_entries(12)) == 1)
+
+    def test_accounting_other_owner(self):
+        """
+        Test that a line is skipped when the user name is only in another field
+        """
+        line = self.line(11, owner = 'someone_else').replace(':python:', ':{0}:'.format(self.user))
+        self.write(line)
+        self.assertTrue(qsub.get_accounting_entries(11) == [])
+
+    def test_accounting_db(self):
+        """
+        Test that the next program run carries on from the offset saved in the database, and still finds the records read before then
+        """
+        qsub.qacct_cache_db = os.path.join(self.tmpdir, "qacct_cache.sqlite")
+        self.reset()
+        qsub._read_accounting()
+        self.write(self.line(11) + self.line(12, owner = 'someone_else'))
+        self.assertTrue(len(qsub.get_accounting_entries(11)) == 1)
+        offset = qsub._accounting_cache['offset']
+        self.assertTrue(qsub._accounting_db_state(self.accounting_file) == (os.stat(self.accounting_file).st_ino, offset))
+        self.reset()
+        self.write(self.line(13))
+        self.assertTrue(len(qsub.get_accounting_entries(13)) == 1)
+        self.assertTrue(qsub.get_accounting_entries(11)[0]['jobnumber'] == '11')
+        self.assertTrue(qsub.get_accounting_entries(12) == [])
+        self.assertTrue(qsub._accounting_db_lines('12') == [])
+
+    def test_accounting_db_same_lines(self):
+        """
+        Test that lines read by two program runs are only saved once
+        """
+        qsub.qacct_cache_db = os.path.join(self.tmpdir, "qacct_cache.sqlite")
+        self.reset()
+        qsub._read_accounting()
+        other_run = dict(qsub._accounting_cache, records = collections.OrderedDict())
+        self.write(self.line(13, task_id = 1) + self.line(13, task_id = 2))
+        self.assertTrue(len(qsub.get_accounting_entries(13)) == 2)
+        qsub._accounting_cache.update(other_run)
+        self.assertTrue(len(qsub.get_accounting_entries(13)) == 2)
+        self.assertTrue(len(qsub._accounting_db_lines('13')) == 2)
+
+
+class TestQstatXml(unittest.TestCase):
+    def setUp(self):
+        self.qstat_stdout = qstat_xml([('2495634', 'r', None), ('2495635', 'Eqw', None), ('1245023', 'r', 1), ('1245023', 'qw', '2-3:1')])
+
+    def tearDown(self):
+        qsub.clear_qstat_cache()
+
+    def test_parse_qstat_xml(self):
+        """
+        Test that each job's state and entries are parsed from the XML, with one entry per task listing of an array job
+        """
+        jobs = qsub.parse_qstat(self.qstat_stdout)
+        self.assertTrue(sorted(jobs.keys()) == ['1245023', '2495634', '2495635'])
+        self.assertTrue(jobs['2495634']['status'] == 'r')
+        self.assertTrue(jobs['2495635']['status'] == 'Eqw')
+        self.assertTrue(len(jobs['2495634']['entries']) == 1)
+        self.assertTrue('<JB_job_number>2495634</JB_job_number>' in jobs['2495634']['entries'][0])
+        self.assertTrue(jobs['1245023']['status'] == 'r')
+        self.assertTrue(len(jobs['1245023']['entries']) == 2)
+
+    def test_parse_qstat_xml_bytes(self):
+        self.assertTrue(qsub.parse_qstat(self.qstat_stdout.encode('utf-8')) == qsub.parse_qstat(self.qstat_stdout))
+
+    def test_parse_qstat_xml_empty(self):
+        self.assertTrue(qsub.parse_qstat(qstat_xml([])) == {})
+
+    def test_parse_qstat_xml_malformed(self):
+        """
+        Test that truncated XML output gives no jobs instead of raising an error
+        """
+        self.assertTrue(qsub.parse_qstat(self.qstat_stdout[:100]) == {})
+
+    def job(self, job_id):
+        """
+        Makes a Job updated from the test XML
+        """
+        job = Job(id = job_id, debug = True)
+        job._update(qstat_stdout = self.qstat_stdout)
+        return(job)
+
+    def test_job_update_xml(self):
+        running_job = self.job('2495634')
+        self.assertTrue(running_job.is_present and running_job.is_running and not running_job.is_error)
+        error_job = self.job('2495635')
+        self.assertTrue(error_job.is_present and error_job.is_error and not error_job.is_running)
+        self.assertFalse(self.job('2495636').is_present)
+
+    def test_qstat_xml(self):
+        old_qstat = qsub.qstat
+        qsub.qstat = lambda xml = False, user = None: self.qstat_stdout
+        try:
+            self.assertTrue(qsub.qstat_xml() == {'2495634': 'r', '2495635': 'Eqw', '1245023': 'r'})
+        finally:
+            qsub.qstat = old_qstat
+
+
+class TestSubmitArray(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.qsub_cmd = qsub.qsub_cmd
+        self.qstat = qsub.qstat
+        self.submitted = []
+        def qsub_cmd(args, script):
+            self.submitted.append((args, script))
+            return('Your job-array 1245023.1-3:1 ("python") has been submitted')
+        qsub.qsub_cmd = qsub_cmd
+        qsub.qstat = lambda xml = False, user = None: qstat_xml([('1245023', 'r', 1), ('1245023', 'qw', '2-3:1')])
+        qsub.clear_qstat_cache()
+
+    def tearDown(self):
+        qsub.qsub_cmd = self.qsub_cmd
+        qsub.qstat = self.qstat
+        qsub.clear_qstat_cache()
+        shutil.rmtree(self.tmpdir)
+
+    def test_submit_array(self):
+        """
+        Test that the commands are submitted as the tasks of one array job, with a Job for each task
+        """
+        jobs = qsub.submit_array(commands = ['echo foo', 'echo bar', 'echo baz'], log_dir = self.tmpdir)
+        self.assertTrue(len(self.submitted) == 1)
+        args, script = self.submitted[0]
+        self.assertTrue(args[args.index('-t') + 1] == '1-3')
+        self.assertTrue('case "$SGE_TASK_ID" in\n1)\necho foo\n;;\n2)\necho bar\n;;\n3)\necho baz\n;;\nesac' in script)
+        self.assertTrue(qsub.get_done_flag(log_dir = self.tmpdir, name = 'python', id = '$JOB_ID.$SGE_TASK_ID') in script)
+        self.assertTrue([job.id for job in jobs] == ['1245023'] * 3)
+        self.assertTrue([job.task_id for job in jobs] == [1, 2, 3])
+        self.assertTrue(all(job.is_present for job in jobs))
+        self.assertTrue(jobs[1].done_flag == qsub.get_done_flag(log_dir = self.tmpdir, name = 'python', id = '1245023.2'))
+
+    def test_submit_array_no_done_flag(self):
+        jobs = qsub.submit_array(commands = ['echo foo', 'echo bar'], log_dir = self.tmpdir, done_flag = False)
+        self.assertFalse('trap' in self.submitted[0][1])
+        self.assertTrue(all(job.done_flag is None for job in jobs))
+
+    def test_submit_array_empty(self):
+        self.assertTrue(qsub.submit_array(commands = [], log_dir = self.tmpdir) == [])
+        self.assertTrue(self.submitted == [])
+
+
+class TestQacctCache(unittest.TestCase):
+    def setUp(self):
+        """
+        Puts a fake `qacct` on the PATH, which logs its args and prints the `qacct_normal.txt` fixture
+        """
+        self.scriptdir = os.path.dirname(os.path.realpath(__file__))
+        self.qacct_normal_file = os.path.join(self.scriptdir, "fixtures", "qacct_normal.txt")
+        self.tmpdir = tempfile.mkdtemp()
+        self.calls_file = os.path.join(self.tmpdir, "calls")
+        fake_qacct = os.path.join(self.tmpdir, "qacct")
+        with open(fake_qacct, "w") as f:
+            f.write('#!/bin/bash\necho "$@" >> "{0}"\ncat "{1}"\n'.format(self.calls_file, self.qacct_normal_file))
+        os.chmod(fake_qacct, 0o755)
+        self.path = os.environ['PATH']
+        os.environ['PATH'] = self.tmpdir + os.pathsep + self.path
+        self.old_cache_db = qsub.qacct_cache_db
+        self.old_accounting_file = qsub.accounting_file
+        qsub.qacct_cache_db = os.path.join(self.tmpdir, "qacct_cache.sqlite")
+        qsub.accounting_file = None
+        qsub._qacct_cache.clear()
+        with open(self.qacct_normal_file) as f:
+            self.qacct_stdout = f.read().strip()
+
+    def tearDown(self):
+        os.environ['PATH'] = self.path
+        qsub.qacct_cache_db = self.old_cache_db
+        qsub.accounting_file = self.old_accounting_file
+        qsub._qacct_cache.clear()
+        shutil.rmtree(self.tmpdir)
+
+    def calls(self):
+        """
+        Gets the args of each run of the fake `qacct`
+        """
+        if not os.path.exists(self.calls_file):
+            return([])
+        with open(self.calls_file) as f:
+            return([line.strip() for line in f])
+
+    def test_qacct_db_put_get(self):
+        self.assertTrue(qsub._qacct_db_get('123') is None)
+        qsub._qacct_db_put('123', 'foo', 10.0)
+        self.assertTrue(qsub._qacct_db_get('123') == ('foo', 10.0))
+        qsub._qacct_db_put('123', 'bar', 20.0)
+        self.assertTrue(qsub._qacct_db_get('123') == ('bar', 20.0))
+
+    def test_qacct_db_not_created_by_get(self):
+        """
+        Test that looking up a job does not create the database file
+        """
+        qsub._qacct_db_get('123')
+        self.assertFalse(os.path.exists(qsub.qacct_cache_db))
+
+    def test_qacct_db_disabled(self):
+        qsub.qacct_cache_db = None
+        qsub._qacct_db_put('123', 'foo', 10.0)
+        self.assertTrue(qsub._qacct_db_get('123') is None)
+        self.assertTrue(qsub.get_qacct('123') == self.qacct_stdout)
+
+    def test_get_qacct_cached(self):
+        """
+        Test that qacct is only run once for a job, and that its output is kept in the database between program runs
+        """
+        self.assertTrue(qsub.get_qacct('123') == self.qacct_stdout)
+        self.assertTrue(qsub.get_qacct('123') == self.qacct_stdout)
+        self.assertTrue(self.calls() == ['-j 123'])
+        # a new program run starts with an empty memory cache
+        qsub._qacct_cache.clear()
+        self.assertTrue(qsub.get_qacct('123') == self.qacct_stdout)
+        self.assertTrue(self.calls() == ['-j 123'])
+        self.assertTrue(qsub._qacct_db_get('123')[0] == self.qacct_stdout)
+
+    def test_get_qacct_task(self):
+        """
+        Test that each task of an array job is cached separately
+        """
+        qsub.get_qacct('123', task_id = 1)
+        qsub.get_qacct('123', task_id = 2)
+        qsub.get_qacct('123', task_id = 1)
+        self.assertTrue(self.calls() == ['-j 123 -t 1', '-j 123 -t 2'])
+        self.assertTrue(qsub._qacct_db_get('123.2') is not None)
+
+    def test_get_qacct_min_time(self):
+        """
+        Test that output cached before `min_time` is not used, e.g. the records of an older job with the same ID
+        """
+        qsub._qacct_db_put('123', 'old output', time.time() - 100)
+        self.assertTrue(qsub.get_qacct('123') == 'old output')
+        self.assertTrue(qsub.get_qacct('123', min_time = time.time() - 10) == self.qacct_stdout)
+        self.assertTrue(self.calls() == ['-j 123'])
+        self.assertTrue(qsub._qacct_db_get('123')[0] == self.qacct_stdout)
+
+    def test_get_qacct_force(self):
+        qsub.get_qacct('123')
+        qsub.get_qacct('123', force = True)
+        self.assertTrue(self.calls() == ['-j 123', '-j 123'])
+
+
+class TestSubmitMany(unittest.TestCase):
+    def setUp(self):
+        """
+        Puts a fake `qsub` on the PATH, which saves each job script and prints a submission message with the next job ID; it fails for scripts that contain 'FAIL'
+        """
+        self.tmpdir = tempfile.mkdtemp()
+        self.bin_dir = os.path.join(self.tmpdir, "bin")
+        self.log_dir = os.path.join(self.tmpdir, "logs")
+        os.mkdir(self.bin_dir)
+        fake_qsub = os.path.join(self.bin_dir, "qsub")
+        with open(fake_qsub, "w") as f:
+            f.write("""#!/bin/bash
+name=""
+tasks=""
+while [ $# -gt 0 ]; do
+    [ "$1" = "-N" ] && name="$2"
+    [ "$1" = "-t" ] && tasks="$2"
+    shift
+done
+script="$(cat)"
+case "$script" in *FAIL*) echo "Unable to run job" >&2; exit 1;; esac
+id=$(( $(cat "{0}/next_id" 2>/dev/null || echo 100) + 1 ))
+echo $id > "{0}/next_id"
+printf '%s\\n' "$script" > "{0}/$id.sh"
+if [ -n "$tasks" ]; then
+    echo "Your job-array $id.$tasks:1 (\\"$name\\") has been submitted"
+else
+    echo "Your job $id (\\"$name\\") has been submitted"
+fi
+""".format(self.tmpdir))
+        os.chmod(fake_qsub, 0o755)
+        self.path = os.environ['PATH']
+        os.environ['PATH'] = self.bin_dir + os.pathsep + self.path
+        self.qstat = qsub.qstat
+        qsub.qstat = lambda xml = False, user = None: qstat_xml([('101', 'r', None), ('102', 'qw', None), ('103', 'qw', None)])
+        qsub.clear_qstat_cache()
+
+    def tearDown(self):
+        os.environ['PATH'] = self.path
+        qsub.qstat = self.qstat
+        qsub.clear_qstat_cache()
+        shutil.rmtree(self.tmpdir)
+
+    def script(self, job_id):
+        """
+        Gets the job script that the fake `qsub` got for a job
+        """
+        with open(os.path.join(self.tmpdir, "{0}.sh".format(job_id))) as f:
+            return(f.read())
+
+    def test_submit_many(self):
+        """
+        Test that the jobs are returned in the order of the specs
+        """
+        jobs = qsub.submit_many([{'command': 'echo "$HOME"', 'name': 'foo'}, {'command': 'echo bar', 'name': 'bar', 'done_flag': False}], log_dir = self.log_dir)
+        self.assertTrue([(job.id, job.name) for job in jobs] == [('101', 'foo'), ('102', 'bar')])
+        self.assertTrue(jobs[0].is_running)
+        self.assertTrue(jobs[1].is_present and not jobs[1].is_running)
+        self.assertTrue(jobs[0].done_flag == qsub.get_done_flag(log_dir = self.log_dir, name = 'foo', id = '101'))
+        self.assertTrue(jobs[1].done_flag is None)
+        # the job script is passed to qsub as-is, without being evaluated by the shell first
+        self.assertTrue('\necho "$HOME"\n' in self.script(101))
+        self.assertFalse('trap' in self.script(102))
+
+    def test_submit_many_heredoc_terminator(self):
+        """
+        Test that a job script with its own heredoc is passed to qsub in full
+        """
+        command = "cat <<'E0F'\nfoo\nE0F\necho bar"
+        jobs = qsub.submit_many([{'command': command, 'name': 'foo'}], log_dir = self.log_dir)
+        self.assertTrue(len(jobs) == 1)
+        self.assertTrue('\n' + command + '\n' in self.script(101))
+
+    def test_submit_many_failed(self):
+        """
+        Test that a job that failed to submit is skipped, without mixing up the ID's of the other jobs
+        """
+        jobs = qsub.submit_many([{'name': 'foo'}, {'name': 'bad', 'command': 'echo FAIL'}, {'name': 'bar'}], log_dir = self.log_dir)
+        self.assertTrue([(job.id, job.name) for job in jobs] == [('101', 'foo'), ('102', 'bar')])
+
+    def test_submit_many_same_name(self):
+        """
+        Test that jobs with the same name are matched to their own specs
+        """
+        jobs = qsub.submit_many([{'name': 'foo', 'command': 'echo FAIL'}, {'name': 'foo', 'command': 'echo one'}, {'name': 'foo', 'command': 'echo two'}], log_dir = self.log_dir)
+        self.assertTrue([(job.id, job.name) for job in jobs] == [('101', 'foo'), ('102', 'foo')])
+        self.assertTrue('\necho one\n' in self.script(101))
+        self.assertTrue('\necho two\n' in self.script(102))
+        self.assertTrue(jobs[0].done_flag != jobs[1].done_flag)
+
+    def test_submit_many_array(self):
+        """
+        Test that an array job is found from its submission message, and does not get a done flag that its tasks would share
+        """
+        jobs = qsub.submit_many([{'name': 'foo', 'params': '-j y -t 1-3'}, {'name': 'foo'}], log_dir = self.log_dir)
+        self.assertTrue([(job.id, job.name) for job in jobs] == [('101', 'foo'), ('102', 'foo')])
+        self.assertTrue(jobs[0].done_flag is None)
+        self.assertFalse('trap' in self.script(101))
+        self.assertTrue(jobs[1].done_flag == qsub.get_done_flag(log_dir = self.log_dir, name = 'foo', id = '102'))
+
+    def test_submit_many_empty(self):
+        self.assertTrue(qsub.submit_many([], log_dir = self.log_dir) == [])
+
+    def test_qsub_cmd(self):
+        """
+        Test that the job script is passed to qsub on stdin, and that a missing qsub gives no output instead of an error
+        """
+        self.assertTrue(qsub.qsub_cmd(args = ['qsub', '-N', 'foo'], script = 'echo foo\n') == 'Your job 101 ("foo") has been submitted')
+        self.assertTrue(self.script(101) == 'echo foo\n')
+        self.assertTrue(qsub.qsub_cmd(args = [os.path.join(self.tmpdir, 'missing')], script = 'echo foo\n') == '')
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+unit tests for the vcf module
+"""
+import unittest
+import os
+import gzip
+import shutil
+import tempfile
+import vcf
+
+class TestVcf(unittest.TestCase):
+    def setUp(self):
+        self.scriptdir = os.path.dirname(os.path.realpath(__file__))
+        self.fixture_dir = os.path.join(self.scriptdir, "fixtures")
+        self.vcf_file = os.path.join(self.fixture_dir, "small.vcf")
+        self.tmpdir = tempfile.mkdtemp()
+        with open(self.vcf_file) as f:
+            self.lines = f.readlines()
+        self.header = [line for line in self.lines if line.startswith('#')]
+        self.entries = [line for line in self.lines if not line.startswith('#') and line.strip()]
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_count_lines_entries(self):
+        """
+        Test that the blank line is counted as a line but not as an entry
+        """
+        self.assertTrue(vcf.count_lines_entries(vcf_file = self.vcf_file) == (9, 5))
+
+    def test_count_lines_entries_gz(self):
+        gz_file = os.path.join(self.tmpdir, "small.vcf.gz")
+        with open(self.vcf_file, 'rb') as fin:
+            with gzip.open(gz_file, 'wb') as fout:
+                shutil.copyfileobj(fin, fout)
+        self.assertTrue(vcf.count_lines_entries(vcf_file = gz_file) == (9, 5))
+
+    def test_num_entries(self):
+        self.assertTrue(vcf.num_entries(vcf_file = self.vcf_file) == 5)
+
+    def test_split_vcf(self):
+        """
+        Test that each chunk has the full header, and that the entries stay in their original order
+        """
+        chunk_files = vcf.split_vcf(vcf_file = self.vcf_file, num_chunks = 2, output_dir = self.tmpdir)
+        self.assertTrue([os.path.basename(f) for f in chunk_files] == ['small.0.vcf', 'small.1.vcf'])
+        entries = []
+        for chunk_file in chunk_files:
+            with open(chunk_file) as f:
+                lines = f.readlines()
+            self.assertTrue(lines[:len(self.header)] == self.header)
+            entries.extend(lines[len(self.header):])
+        self.assertTrue(entries == self.entries)
+        self.assertTrue(vcf.count_lines_entries(vcf_file = chunk_files[0])[1] == 3)
+        self.assertTrue(vcf.count_lines_entries(vcf_file = chunk_files[1])[1] == 2)
+
+    def test_split_vcf_more_chunks_than_entries(self):
+        """
+        Test that no empty chunks are made
+        """
+        chunk_files = vcf.split_vcf(vcf_file = self.vcf_file, num_chunks = 10, output_dir = self.tmpdir)
+        self.assertTrue(len(chunk_files) == 5)
+        self.assertTrue(all(vcf.count_lines_entries(vcf_file = f)[1] == 1 for f in chunk_files))
+
+
+if __name__ == '__main__':
+    unittest.main()
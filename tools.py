@@ -8,11 +8,17 @@ import sys
 import os
 import csv
 import json
+import errno
 import getpass
 import subprocess as sp
 import shutil
 import collections
 import logging
+from log import timestamp, timestamp2 # the timestamp functions are shared with the log module
+try:
+    from shlex import quote # Python 3.3+
+except ImportError:
+    from pipes import quote
 logger = logging.getLogger("tools")
 logger.debug("loading tools module")
 
@@ -36,21 +42,32 @@ class SubprocessCmd(object):
         logger.debug(run_cmd.proc_stdout)
         logger.debug(run_cmd.proc_stderr)
     """
-    def __init__(self, command):
+    def __init__(self, command, stdout_file = None):
         self.command = command
+        self.stdout_file = stdout_file
 
     def run(self, command = None):
         """
         Run the command, capture the process object
 
         # universal_newlines=True required for Python 2 3 compatibility with stdout parsing
+        # a command passed as a list of args is run directly, without a shell
+        # if stdout_file was passed, stdout is written to it instead of being captured
         """
         if not command:
             command = self.command
         if command:
-            self.process = sp.Popen(command, stdout = sp.PIPE, stderr = sp.PIPE, shell = True, universal_newlines = True)
-            self.proc_stdout, self.proc_stderr = self.process.communicate()
-            self.proc_stdout = self.proc_stdout.strip()
+            shell = not isinstance(command, (list, tuple))
+            stdout = sp.PIPE
+            if self.stdout_file:
+                stdout = open(self.stdout_file, 'w')
+            try:
+                self.process = sp.Popen(command, stdout = stdout, stderr = sp.PIPE, shell = shell, universal_newlines = True)
+                self.proc_stdout, self.proc_stderr = self.process.communicate()
+            finally:
+                if self.stdout_file:
+                    stdout.close()
+            self.proc_stdout = (self.proc_stdout or '').strip()
             self.proc_stderr = self.proc_stderr.strip()
         else:
             logger.error('No command supplied')
@@ -79,6 +96,12 @@ class DirHop(object):
 
 
 # ~~~~ CUSTOM FUNCTIONS ~~~~~~ #
+def shell_join(args):
+    """
+    Joins a list of command args into a single shell-escaped command string, e.g. for printing a command run with ``SubprocessCmd``
+    """
+    return(' '.join(quote(str(arg)) for arg in args))
+
 compare = lambda x, y: collections.Counter(x) == collections.Counter(y)
 # compare two obects
 
@@ -101,7 +124,6 @@ def my_debugger(vars):
 
 def subprocess_cmd(command, return_stdout = False):
     # run a terminal command with stdout piping enabled
-    import subprocess as sp
     process = sp.Popen(command,stdout=sp.PIPE, shell=True, universal_newlines=True)
      # universal_newlines=True required for Python 2 3 compatibility with stdout parsing
     proc_stdout = process.communicate()[0].strip()
@@ -110,20 +132,6 @@ def subprocess_cmd(command, return_stdout = False):
     elif return_stdout == False:
         logger.debug(proc_stdout)
 
-def timestamp():
-    """
-    Return a timestamp string
-    """
-    import datetime
-    return('{:%Y-%m-%d-%H-%M-%S}'.format(datetime.datetime.now()))
-
-def timestamp2():
-    """
-    Return a timestamp string
-    """
-    import datetime
-    return('{:%Y-%m-%d_%H-%M-%S}'.format(datetime.datetime.now()))
-
 def print_dict(mydict):
     """
     pretty printing for dict entries
@@ -135,9 +143,6 @@ def mkdirs(path, return_path=False):
     """
     Make a directory, and all parent dir's in the path
     """
-    import sys
-    import os
-    import errno
     try:
         os.makedirs(path)
     except OSError as exc:  # Python >2.5
@@ -152,7 +157,6 @@ def write_dicts_to_csv(dict_list, output_file):
     """
     write a list of dicts to a CSV file
     """
-    import csv
     with open(output_file, 'w') as outfile:
         fp = csv.DictWriter(outfile, dict_list[0].keys())
         fp.writeheader()
@@ -3,9 +3,17 @@
 """
 Module with functions for dealing with .vcf files
 """
+import os
 import csv
+import gzip
 import itertools
 
+# ~~~~~ GLOBALS ~~~~~ #
+_counts_cache = {}
+"""
+cache of the results from `count_lines_entries`, in the format `{(path, mtime, size): (num_lines, num_entries)}`
+"""
+
 # ~~~~~ FUNCTIONS ~~~~~ #
 def header_skip_num(vcf_file):
     """
@@ -51,3 +59,83 @@ def num_entries(vcf_file):
         for row in reader:
             num += 1
     return(num)
+
+
+def count_lines_entries(vcf_file):
+    """
+    Counts both the number of lines and the number of entries in a .vcf file, in a single pass over the file. Results are cached for as long as the file's modification time and size do not change.
+
+    Parameters
+    ----------
+    vcf_file: str
+        the path to a .vcf file; files ending in ``.gz`` are read with ``gzip``
+
+    Returns
+    -------
+    tuple
+        ``(num_lines, num_entries)``; the number of newline-terminated lines in the file, and the number of non-header, non-blank lines in the file
+    """
+    stat = os.stat(vcf_file)
+    key = (os.path.abspath(vcf_file), stat.st_mtime, stat.st_size)
+    if key not in _counts_cache:
+        num_lines = 0
+        num_entries = 0
+        opener = gzip.open if vcf_file.endswith('.gz') else open
+        with opener(vcf_file, 'rb') as f:
+            for line in f:
+                if line.endswith(b'\n'):
+                    num_lines += 1
+                if not line.startswith(b'#') and line.strip():
+                    num_entries += 1
+        _counts_cache[key] = (num_lines, num_entries)
+    return(_counts_cache[key])
+
+def split_vcf(vcf_file, num_chunks, output_dir):
+    """
+    Splits a .vcf file into smaller .vcf files, each with a copy of the original header. The entries are split into contiguous ranges, so the entries in each chunk stay in the same order as the original file.
+
+    Parameters
+    ----------
+    vcf_file: str
+        the path to a .vcf file
+    num_chunks: int
+        the number of chunks to split the file into; fewer chunks are created if there are not enough entries in the file
+    output_dir: str
+        the path to the directory to write the chunk files to
+
+    Returns
+    -------
+    list
+        a list of paths to the chunk files, in the order of the entries in the original file
+    """
+    num_entries = count_lines_entries(vcf_file = vcf_file)[1]
+    # ceiling division, so that no more than num_chunks files are created
+    chunk_size = max(1, -(-num_entries // max(1, int(num_chunks))))
+    base = os.path.splitext(os.path.basename(vcf_file))[0]
+    header = []
+    chunk_files = []
+    chunk = None
+    chunk_num_entries = 0
+    try:
+        with open(vcf_file) as f:
+            for line in f:
+                # the header is all of the comment lines before the first entry
+                if chunk is None and line.startswith('#'):
+                    header.append(line)
+                    continue
+                if not line.strip():
+                    continue
+                if chunk is None or chunk_num_entries >= chunk_size:
+                    if chunk is not None:
+                        chunk.close()
+                    chunk_file = os.path.join(output_dir, '{0}.{1}.vcf'.format(base, len(chunk_files)))
+                    chunk_files.append(chunk_file)
+                    chunk = open(chunk_file, 'w')
+                    chunk.writelines(header)
+                    chunk_num_entries = 0
+                chunk.write(line)
+                chunk_num_entries += 1
+    finally:
+        if chunk is not None:
+            chunk.close()
+    return(chunk_files)